@@ -1,7 +1,42 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.openapi.utils import get_openapi
+import os
+import sys
+import json
 import subprocess
-import shlex
+from contextlib import asynccontextmanager
+from typing import Optional
+from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+# api/ 디렉터리에서 실행하더라도 루트 모듈(database, embedder 등)을 import 할 수 있도록 경로 추가
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import OracleManager, DEFAULT_TENANT_ID
+from embedder import Embedder
+from chatbot_service import ChatbotService, TenantChatbots
+import metrics
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    프로세스 수명 동안 재사용할 DB 연결 풀, 임베딩 모델, 챗봇 서비스를 한 번만 생성.
+    요청마다 langchain import, Oracle 클라이언트 초기화, 풀 생성을 반복하지 않도록 한다.
+    챗봇 서비스는 테넌트(업체)별로 처음 요청될 때 만들어지며 모든 테넌트가 연결 풀과 임베딩 모델을 공유한다.
+    """
+    load_dotenv()
+    metrics.configure_logging()
+    metrics.configure_tracing()
+    db = OracleManager()
+    metrics.register_pool(db.pool)
+    embedder = Embedder()
+    app.state.db = db
+    app.state.embedder = embedder
+    app.state.chatbots = TenantChatbots(db, embedder)
+    try:
+        yield
+    finally:
+        db.close()
 
 app = FastAPI(
     title="Bullroh Chat API",
@@ -9,54 +44,200 @@ app = FastAPI(
     version="1.0.0",
     openapi_url="/openapi.json",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
+async def get_chatbot(chatbots: TenantChatbots, tenant_id: int) -> Optional[ChatbotService]:
+    """ 테넌트의 챗봇 서비스 (처음 요청된 테넌트는 DB에서 존재 여부를 확인하므로 스레드에서 실행). 없는 테넌트면 None """
+    return await run_in_threadpool(chatbots.get, tenant_id)
+
+def tenant_not_found(tenant_id: int) -> HTTPException:
+    return HTTPException(status_code=404, detail=f"Tenant {tenant_id} not found. Call /onboard first.")
+
 @app.get("/ask", summary="Ask a question", response_description="AI-generated response")
-async def ask_endpoint(query: str):
+async def ask_endpoint(query: str, request: Request, tenant_id: int = DEFAULT_TENANT_ID):
     """
     Get an AI-generated answer to a question about automotive topics.
     
     - **query**: Natural language question about automotive topics
-    - **returns**: JSON with AI-generated response
+    - **tenant_id**: Business (tenant) whose blog, FAQs and answer cache are used (default: 1)
+    - **returns**: JSON with the answer, cache hit flag/type (exact or semantic), retrieved chunk ids, per-stage timings (ms) and whether the answer was shared with a concurrent identical request (`coalesced`); 404 if the tenant has not been onboarded
+    """
+    chatbot = await get_chatbot(request.app.state.chatbots, tenant_id)
+    if chatbot is None:
+        raise tenant_not_found(tenant_id)
+    try:
+        # OpenAI 호출은 비동기로, DB 호출은 스레드에서 실행되어 이벤트 루프를 막지 않음
+        result = await chatbot.answer_question_async(query)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Answer generation failed: {e}")
+    return {
+        "response": result["answer"],
+        "cache_hit": result["cache_hit"],
+        "cache_type": result["cache_type"],
+        "matched_question": result["matched_question"],
+        "chunk_ids": result["chunk_ids"],
+        "timings_ms": result["timings_ms"],
+        "coalesced": result["coalesced"],
+    }
+
+@app.get("/ask/stream", summary="Ask a question (Server-Sent Events)", response_description="Token stream")
+async def ask_stream_endpoint(query: str, request: Request, tenant_id: int = DEFAULT_TENANT_ID):
+    """
+    Stream the answer as Server-Sent Events while the LLM generates it.
+    
+    - **query**: Natural language question about automotive topics
+    - **tenant_id**: Business (tenant) to answer for (default: 1)
+    - **returns**: `token` events carrying `{"content": ...}`, then one `done` event with the same fields as `/ask`; 404 if the tenant has not been onboarded
+    """
+    chatbot = await get_chatbot(request.app.state.chatbots, tenant_id)
+    if chatbot is None:
+        raise tenant_not_found(tenant_id)
+
+    async def event_stream():
+        try:
+            async for event in chatbot.astream_answer(query):
+                event_type = event.pop("type")
+                yield f"event: {event_type}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': f'Answer generation failed: {e}'}, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.websocket("/ws/ask")
+async def ask_websocket(websocket: WebSocket):
+    """
+    WebSocket 채팅: 질문(텍스트 또는 {"query": ...} JSON)을 받을 때마다
+    {"type": "token", "content": ...} 메시지들과 마지막 {"type": "done", ...} 메시지로 답변을 스트리밍.
+    테넌트는 연결 URL의 tenant_id 쿼리 파라미터로 지정 (기본값: 1).
     """
+    await websocket.accept()
+    try:
+        tenant_id = int(websocket.query_params.get("tenant_id", DEFAULT_TENANT_ID))
+    except ValueError:
+        await websocket.close(code=1008, reason="tenant_id must be an integer")
+        return
+    chatbot = await get_chatbot(websocket.app.state.chatbots, tenant_id)
+    if chatbot is None:
+        await websocket.close(code=1008, reason=f"Tenant {tenant_id} not found")
+        return
     try:
-        command = f"python ../main.py ask {shlex.quote(query)}"
-        result = subprocess.run(command, shell=True, capture_output=True, text=True, check=True)
-        return {"response": result.stdout}
-    except subprocess.CalledProcessError as e:
-        raise HTTPException(status_code=500, detail=f"Command failed: {e.stderr}")
+        while True:
+            message = await websocket.receive_text()
+            try:
+                query = json.loads(message).get("query", "")
+            except (json.JSONDecodeError, AttributeError):
+                query = message
+            if not query:
+                await websocket.send_json({"type": "error", "detail": "query is required"})
+                continue
+            try:
+                async for event in chatbot.astream_answer(query):
+                    await websocket.send_json(event)
+            except WebSocketDisconnect:
+                raise
+            except Exception as e:
+                await websocket.send_json({"type": "error", "detail": f"Answer generation failed: {e}"})
+    except WebSocketDisconnect:
+        pass
 
-@app.post("/crawl", summary="Trigger blog crawling", response_description="Crawling status")
-async def crawl_endpoint(max_posts: int = 5):
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@app.post("/crawl", summary="Start a blog crawling job", response_description="Crawling job id")
+async def crawl_endpoint(request: Request, max_posts: int = 5, tenant_id: int = DEFAULT_TENANT_ID):
     """
-    Initiate blog crawling process to gather automotive content.
+    Start a resumable blog crawling job in the background and return immediately.
     
     - **max_posts**: Maximum number of posts to crawl (default: 5)
-    - **returns**: JSON with crawling status
+    - **tenant_id**: Business (tenant) whose blog is crawled (default: 1)
+    - **returns**: JSON with the job id and the URL to poll for its progress
     """
+    db: OracleManager = request.app.state.db.for_tenant(tenant_id)
+
+    def start_job():
+        info = db.get_business_info()
+        if not info or not info.get('blog_url'):
+            raise HTTPException(status_code=400, detail="Blog URL is not configured. Call /onboard first.")
+        db.create_crawl_job_tables() # 테이블이 없는 기존 DB 대비 (이미 있으면 무시됨)
+        return db.create_crawl_job(info['blog_url'], max_posts)
+
     try:
-        command = f"python ../main.py crawl --max-posts {max_posts}"
-        result = subprocess.run(command, shell=True, capture_output=True, text=True, check=True)
-        return {"response": result.stdout}
-    except subprocess.CalledProcessError as e:
-        raise HTTPException(status_code=500, detail=f"Command failed: {e.stderr}")
+        job_id = await run_in_threadpool(start_job)
+        # 크롤링은 별도 프로세스로 실행하고 기다리지 않음. 진행 상황은 GET /crawl/{job_id}로 확인
+        subprocess.Popen(
+            [sys.executable, os.path.join(REPO_ROOT, "main.py"), "--tenant", str(tenant_id),
+             "crawl", "--job-id", str(job_id), "--max-posts", str(max_posts)],
+            cwd=REPO_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to start crawling job: {e}")
+    return {"job_id": job_id, "status": "pending", "status_url": f"/crawl/{job_id}?tenant_id={tenant_id}"}
+
+@app.get("/crawl/{job_id}", summary="Get crawling job status", response_description="Crawling job progress")
+async def crawl_status_endpoint(job_id: int, request: Request, tenant_id: int = DEFAULT_TENANT_ID):
+    """
+    Get the status of a crawling job started with `POST /crawl` (or `main.py crawl`).
+    
+    - **job_id**: Id returned by `POST /crawl`
+    - **tenant_id**: Business (tenant) that owns the job (default: 1)
+    - **returns**: JSON with the job status, whether the post list was fully read, post counts per state and the last error
+    """
+    db: OracleManager = request.app.state.db.for_tenant(tenant_id)
+    try:
+        job = await run_in_threadpool(db.get_crawl_job, job_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to read crawling job: {e}")
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Crawling job {job_id} not found")
+    return job
 
 @app.post("/onboard", summary="Set up business information", response_description="Onboarding status")
-async def onboard_endpoint(business_name: str, blog_url: str, chatbot_personality: str):
+async def onboard_endpoint(business_name: str, blog_url: str, chatbot_personality: str, request: Request,
+                           tenant_id: int = DEFAULT_TENANT_ID):
     """
     Configure business details for the chatbot.
     
     - **business_name**: Name of the business
     - **blog_url**: URL of the automotive blog
     - **chatbot_personality**: Personality description for the chatbot
+    - **tenant_id**: Business (tenant) to create or update (default: 1)
     - **returns**: JSON with onboarding status
     """
+    db: OracleManager = request.app.state.db.for_tenant(tenant_id)
+    chatbots: TenantChatbots = request.app.state.chatbots
+
+    def save():
+        # FAQ와 마케팅 문구는 이 엔드포인트로 받지 않으므로 기존 값(FAQ 임베딩 포함)을 유지
+        existing = db.get_business_info() or {}
+        db.save_business_info({
+            'business_name': business_name,
+            'blog_url': blog_url,
+            'chatbot_personality': chatbot_personality,
+            'faqs': existing.get('faqs', []),
+            'faq_vectors': existing.get('faq_vectors'),
+            'marketing_info': existing.get('marketing_info', ''),
+        })
+        chatbots.invalidate_business_context(tenant_id)
+
+    try:
+        await run_in_threadpool(save)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Onboarding failed: {e}")
+    return {"response": "Business information saved."}
+
+@app.get("/metrics", summary="Prometheus metrics", include_in_schema=False)
+async def metrics_endpoint():
+    """
+    Prometheus text exposition: per-stage latency histograms (`bullroh_stage_seconds{component, stage}`),
+    stage error counts, answers by source and connection pool usage.
+    """
     try:
-        command = f"python ../main.py onboard --business-name {shlex.quote(business_name)} --blog-url {shlex.quote(blog_url)} --chatbot-personality {shlex.quote(chatbot_personality)}"
-        result = subprocess.run(command, shell=True, capture_output=True, text=True, check=True)
-        return {"response": result.stdout}
-    except subprocess.CalledProcessError as e:
-        raise HTTPException(status_code=500, detail=f"Command failed: {e.stderr}")
+        body, content_type = metrics.render_latest()
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=f"Metrics are unavailable: {e}")
+    return Response(content=body, media_type=content_type)
 
 # Add similar endpoints for other commands (etc.)
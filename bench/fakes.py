@@ -0,0 +1,507 @@
+# bench/fakes.py
+import os
+import copy
+import time
+import random
+import asyncio
+import hashlib
+import tempfile
+import threading
+import numpy as np
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import ConfigDict
+from database import OracleManager, DEFAULT_TENANT_ID, chunk_hash
+from embedder import Embedder
+from embedding_cache import EmbeddingCache
+
+
+def hash_vector(text: str, dim: int) -> np.ndarray:
+    """ 텍스트의 sha256을 시드로 만든 결정적 단위 벡터 (같은 텍스트 → 항상 같은 벡터) """
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+class HashEmbeddings:
+    """ OpenAIEmbeddings 대역: API 호출 대신 hash_vector를 반환하고, latency_seconds만큼 왕복 지연을 흉내냄 """
+
+    def __init__(self, dim: int, latency_seconds: float = 0.0):
+        self.dim = dim
+        self.latency_seconds = latency_seconds
+        self.calls = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return [hash_vector(text, self.dim) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        self.calls += 1
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        return hash_vector(text, self.dim)
+
+
+class FakeEmbedder(Embedder):
+    """
+    OpenAI 없이 동작하는 Embedder. 분할·캐시·토큰 계산은 실제 Embedder 코드를 그대로 쓰고 임베딩 모델만 HashEmbeddings로 바꾼다.
+    캐시는 메모리 계층만 사용 (디스크 캐시 파일을 건드리지 않음).
+    """
+
+    def __init__(self, dim: int = 1536, latency_seconds: float = 0.0, cache_size: int = 10000):
+        self.text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
+        self.model_name = "text-embedding-3-small"  # count_tokens가 같은 토크나이저를 쓰도록 실제 모델명 유지
+        self.embedding_model = HashEmbeddings(dim, latency_seconds)
+        self.cache = EmbeddingCache(f"fake-hash-{dim}", path=None, memory_size=cache_size)
+        self._encoding = None
+
+
+class FakeChatModel(BaseChatModel):
+    """ ChatOpenAI 대역: latency_seconds 뒤에 고정 답변을 반환. 스트리밍은 tokens_per_second 속도로 글자 단위 전송 """
+
+    model_config = ConfigDict(protected_namespaces=())  # model_name 필드 허용
+    model_name: str = "gpt-4o-mini"  # ContextBudgeter가 같은 토크나이저를 쓰도록 실제 모델명 유지
+    latency_seconds: float = 0.5
+    tokens_per_second: float = 0.0   # 0이면 스트리밍도 답변 전체를 한 번에 전송
+    answer: str = "안녕하세요! 문의하신 내용은 매장으로 연락 주시면 자세히 안내해 드리겠습니다."
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _result(self) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.answer))])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency_seconds)
+        return self._result()
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency_seconds)
+        return self._result()
+
+    def _pieces(self) -> List[str]:
+        return list(self.answer) if self.tokens_per_second > 0 else [self.answer]
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency_seconds)
+        for piece in self._pieces():
+            if self.tokens_per_second > 0:
+                time.sleep(1.0 / self.tokens_per_second)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency_seconds)
+        for piece in self._pieces():
+            if self.tokens_per_second > 0:
+                await asyncio.sleep(1.0 / self.tokens_per_second)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+
+
+class InMemoryOracleManager(OracleManager):
+    """
+    Oracle ATP 없이 동작하는 OracleManager. 테이블 대신 딕셔너리에 저장하고, SQL을 실행하는 메서드만 다시 구현한다.
+    벡터/키워드 인덱스 관리(get_vector_index, get_lexical_index, 증분 갱신)와 검색(find_similar_chunks, search_chunks)은
+    OracleManager의 코드를 그대로 사용하므로 실제 검색 경로를 측정할 수 있다.
+    latency_seconds를 주면 DB 호출마다 그만큼 대기하여 ATP 왕복 시간을 흉내낸다. 지원 벡터 백엔드: numpy | faiss
+    """
+
+    def __init__(self, embedding_dim: int = 1536, vector_search_backend: str = "numpy", hybrid_search_candidates: int = 20,
+                 latency_seconds: float = 0.0, index_dir: Optional[str] = None, tenant_id: int = DEFAULT_TENANT_ID):
+        self.tenant_id = tenant_id
+        self.pool = None
+        self.embedding_dim = embedding_dim
+        self.answer_cache_ttl_seconds = 0
+        self.vector_storage = "blob"
+        self.vector_search_backend = vector_search_backend
+        self.vector_index_backend = vector_search_backend
+        self.vector_index_dir = index_dir or tempfile.mkdtemp(prefix="bullroh_bench_")
+        self.vector_index_refresh_seconds = float(os.getenv("VECTOR_INDEX_REFRESH_SECONDS", "30"))
+        self.vector_index_key = f"bench_{tenant_id}"
+        self._index_checked_at = 0.0
+        self._index_lock = threading.Lock()
+        self.hybrid_search_candidates = hybrid_search_candidates
+        self.rrf_k = int(os.getenv("RRF_K", "60"))
+        self._lexical_checked_at = 0.0
+        self._lexical_lock = threading.Lock()
+        self._owns_pool = False
+        self._tenant_views: Dict[int, OracleManager] = {tenant_id: self}
+        self._tenant_views_lock = threading.Lock()
+
+        self.latency_seconds = latency_seconds
+        self._init_tables()
+
+    def _init_tables(self):
+        """ 이 테넌트의 테이블(딕셔너리)을 비운 상태로 만듦 """
+        self._lock = threading.Lock()
+        self._business_info: Optional[Dict[str, Any]] = None
+        self._content_version = 1
+        self._posts: Dict[str, Dict[str, Any]] = {}                 # post_url → {'id', 'title', 'content_hash', ...}
+        self._chunks: Dict[int, Tuple[int, str, str, np.ndarray]] = {}  # chunk_id → (post_id, 본문, 해시, 벡터)
+        self._post_chunks: Dict[int, Set[int]] = {}                 # post_id → chunk_id 집합 (posts.id 외래 키 인덱스 역할)
+        self._qa_cache: Dict[str, Dict[str, Any]] = {}              # question_hash → {'answer', 'question', 'vector', 'version', 'status'}
+        self._next_post_id = 1
+        self._next_chunk_id = 1
+        self._crawl_jobs: Dict[int, Dict[str, Any]] = {}              # job_id → crawl_jobs 행
+        self._crawl_job_posts: Dict[int, Dict[str, Dict[str, Any]]] = {}  # job_id → post_url → crawl_job_posts 행
+        self._next_job_id = 1
+
+    def for_tenant(self, tenant_id: int) -> "InMemoryOracleManager":
+        """ OracleManager.for_tenant와 같지만 테넌트마다 딕셔너리를 따로 두어 SQL의 tenant_id 조건처럼 다른 테넌트의 행이 보이지 않게 함 """
+        tenant_id = int(tenant_id)
+        with self._tenant_views_lock:
+            view = self._tenant_views.get(tenant_id)
+            if view is None:
+                view = copy.copy(self)
+                view.tenant_id = tenant_id
+                view.vector_index_key = f"bench_{tenant_id}"
+                view._index_checked_at = 0.0
+                view._index_lock = threading.Lock()
+                view._lexical_checked_at = 0.0
+                view._lexical_lock = threading.Lock()
+                view._init_tables()
+                self._tenant_views[tenant_id] = view
+            return view
+
+    def _add_chunk(self, post_id: int, text: str, hash_value: Optional[str], vector) -> int:
+        chunk_id = self._next_chunk_id
+        self._next_chunk_id += 1
+        self._chunks[chunk_id] = (post_id, text, hash_value or chunk_hash(text), np.asarray(vector, dtype=np.float32))
+        self._post_chunks.setdefault(post_id, set()).add(chunk_id)
+        return chunk_id
+
+    def _delete_chunk(self, chunk_id: int, post_id: int) -> int:
+        """ 청크를 지우고 삭제한 행 수(0 또는 1)를 반환 """
+        if self._chunks.get(chunk_id, (None,))[0] != post_id:
+            return 0
+        del self._chunks[chunk_id]
+        self._post_chunks[post_id].discard(chunk_id)
+        return 1
+
+    def _round_trip(self):
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+    def _acquire(self):
+        raise NotImplementedError("InMemoryOracleManager는 SQL을 실행하지 않습니다. 필요한 메서드를 재정의하세요.")
+
+    def close(self):
+        pass
+
+    # --- 합성 데이터 적재 ---
+    def load_corpus(self, posts: Iterator[Tuple[str, str, List[str], np.ndarray]]):
+        """ (post_url, 제목, 청크 본문 목록, 청크 벡터 행렬)을 upsert 경로를 거치지 않고 바로 적재 (대용량 말뭉치 준비용) """
+        with self._lock:
+            for post_url, title, texts, vectors in posts:
+                post_id = self._next_post_id
+                self._next_post_id += 1
+                self._posts[post_url] = {'id': post_id, 'title': title, 'content_hash': chunk_hash("".join(texts))}
+                for text, vector in zip(texts, vectors):
+                    self._add_chunk(post_id, text, None, vector)
+            self._content_version += 1
+
+    # --- 게시글/청크 ---
+    def get_post_crawl_states(self) -> Dict[str, Dict[str, Any]]:
+        self._round_trip()
+        with self._lock:
+            return {
+                url: {key: post.get(key) for key in ('title', 'content_hash') + self.POST_CRAWL_STATE_COLUMNS}
+                for url, post in self._posts.items()
+            }
+
+    def update_post_crawl_states(self, states: List[Dict[str, Any]]):
+        if not states:
+            return
+        self._round_trip()
+        with self._lock:
+            for state in states:
+                post = self._posts.get(state['post_url'])
+                if post is not None:
+                    post.update({'title': state['title'], **{column: state.get(column) for column in self.POST_CRAWL_STATE_COLUMNS}})
+
+    def get_post_chunk_hashes(self, post_url: str) -> Dict[Optional[str], List[int]]:
+        self._round_trip()
+        with self._lock:
+            post = self._posts.get(post_url)
+            chunk_ids_by_hash: Dict[Optional[str], List[int]] = {}
+            for chunk_id in sorted(self._post_chunks.get(post['id'], ())) if post is not None else ():
+                chunk_ids_by_hash.setdefault(self._chunks[chunk_id][2], []).append(chunk_id)
+            return chunk_ids_by_hash
+
+    def upsert_posts_with_chunks(self, posts: List[Dict[str, Any]]):
+        """ OracleManager.upsert_posts_with_chunks와 같은 의미(게시글 upsert, 청크 교체/증분 삭제, 콘텐츠 버전 증가)를 한 번의 왕복으로 처리 """
+        if not posts:
+            return
+        self._round_trip()
+        post_ids, chunk_params, chunk_ids = [], [], []
+        deleted_chunks = 0
+        with self._lock:
+            for post in posts:
+                existing = self._posts.get(post['post_url'])
+                post_id = existing['id'] if existing else self._next_post_id
+                if existing is None:
+                    self._next_post_id += 1
+                self._posts[post['post_url']] = {
+                    'id': post_id, 'title': post['title'], 'content_hash': post['content_hash'],
+                    **{column: post.get(column) for column in self.POST_CRAWL_STATE_COLUMNS}
+                }
+                stale_ids = (post['stale_chunk_ids'] or []) if 'stale_chunk_ids' in post else list(self._post_chunks.get(post_id, ()))
+                for chunk_id in stale_ids:
+                    deleted_chunks += self._delete_chunk(chunk_id, post_id)
+                post_ids.append(post_id)
+                for chunk in post['chunks']:
+                    chunk_ids.append(self._add_chunk(post_id, chunk['chunk_text'], chunk.get('chunk_hash'), chunk['embedding']))
+                    chunk_params.append({'post_id': post_id, 'chunk_text': chunk['chunk_text']})
+            self._content_version += 1
+
+        self._index_checked_at = 0.0
+        if self.hybrid_search_candidates:
+            self._update_lexical_index(posts, post_ids, chunk_params, chunk_ids, deleted_chunks)
+
+    def get_chunks_signature(self) -> str:
+        self._round_trip()
+        with self._lock:
+            return f"{len(self._chunks)}:{max(self._chunks, default=0)}"
+
+    def _fetch_all_chunk_vectors(self, batch_size: int = 1000) -> Tuple[np.ndarray, np.ndarray]:
+        self._round_trip()
+        with self._lock:
+            ids = np.fromiter(sorted(self._chunks), dtype=np.int64, count=len(self._chunks))
+            if not len(ids):
+                return ids, np.empty((0, self.embedding_dim), dtype=np.float32)
+            return ids, np.vstack([self._chunks[chunk_id][3] for chunk_id in ids])
+
+    def _iter_chunk_texts(self, batch_size: int = 1000) -> Iterator[Tuple[int, int, str]]:
+        self._round_trip()
+        with self._lock:
+            rows = [(chunk_id, chunk[0], chunk[1]) for chunk_id, chunk in sorted(self._chunks.items())]
+        return iter(rows)
+
+    def get_chunk_texts(self, chunk_ids: List[int]) -> Dict[int, str]:
+        if not chunk_ids:
+            return {}
+        self._round_trip()
+        with self._lock:
+            return {chunk_id: self._chunks[chunk_id][1] for chunk_id in chunk_ids if chunk_id in self._chunks}
+
+    # --- 답변 캐시 (TTL 없이 콘텐츠 버전으로만 무효화) ---
+    def _valid_cache_entry(self, question_hash: str) -> Optional[Dict[str, Any]]:
+        entry = self._qa_cache.get(question_hash)
+        if entry is None or entry['status'] != 'READY' or entry['version'] != self._content_version:
+            return None
+        return entry
+
+    def get_cached_answer(self, question_hash: str) -> Optional[str]:
+        self._round_trip()
+        with self._lock:
+            entry = self._valid_cache_entry(question_hash)
+            return entry['answer'] if entry else None
+
+    def cache_answer(self, question_hash: str, answer: str, question: Optional[str] = None, question_vector=None,
+                     content_version: Optional[int] = None):
+        self._round_trip()
+        with self._lock:
+            self._qa_cache[question_hash] = {
+                'answer': answer, 'question': question, 'status': 'READY',
+                'vector': np.asarray(question_vector, dtype=np.float32) if question_vector is not None else None,
+                'version': content_version if content_version is not None else self._content_version,
+            }
+
+    def try_claim_answer_generation(self, question_hash: str, lease_seconds: float) -> bool:
+        self._round_trip()
+        with self._lock:
+            entry = self._qa_cache.get(question_hash)
+            if entry is not None and entry['status'] == 'PENDING' and entry['locked_until'] > time.monotonic():
+                return False
+            if self._valid_cache_entry(question_hash) is not None:
+                return False  # 유효한 답변은 PENDING으로 덮어쓰지 않음
+            self._qa_cache[question_hash] = {**(entry or {'answer': ' ', 'question': None, 'vector': None, 'version': None}),
+                                             'status': 'PENDING', 'locked_until': time.monotonic() + lease_seconds}
+            return True
+
+    def release_answer_generation(self, question_hash: str):
+        self._round_trip()
+        with self._lock:
+            if self._qa_cache.get(question_hash, {}).get('status') == 'PENDING':
+                del self._qa_cache[question_hash]
+
+    def clear_answer_cache(self):
+        with self._lock:
+            self._qa_cache.clear()
+
+    def get_cached_question_vectors(self) -> List[Tuple[str, str, np.ndarray]]:
+        self._round_trip()
+        with self._lock:
+            return [
+                (question_hash, self._qa_cache[question_hash]['question'], self._qa_cache[question_hash]['vector'])
+                for question_hash in list(self._qa_cache)
+                if self._valid_cache_entry(question_hash) and self._qa_cache[question_hash]['vector'] is not None
+            ]
+
+    # --- 업체 정보 ---
+    def save_business_info(self, info: Dict[str, Any]):
+        self._round_trip()
+        with self._lock:
+            self._business_info = dict(info)
+            self._content_version += 1
+
+    def get_business_info(self) -> Optional[Dict[str, Any]]:
+        self._round_trip()
+        with self._lock:
+            if self._business_info is None:
+                return None
+            return {**self._business_info, 'content_version': self._content_version}
+
+    def get_business_info_version(self) -> Optional[Tuple[int, Any]]:
+        self._round_trip()
+        with self._lock:
+            return (self._content_version, None) if self._business_info is not None else None
+
+    # --- 크롤링 작업 (crawl_jobs / crawl_job_posts) ---
+    def create_crawl_job(self, blog_url: str, max_posts: Optional[int] = None) -> int:
+        self._round_trip()
+        with self._lock:
+            job_id = self._next_job_id
+            self._next_job_id += 1
+            self._crawl_jobs[job_id] = {
+                'id': job_id, 'tenant_id': self.tenant_id, 'status': 'pending', 'blog_url': blog_url, 'max_posts': max_posts,
+                'listing_done': False, 'total_posts': 0, 'last_error': None, 'created_at': time.time(),
+                'updated_at': time.time(), 'finished_at': None,
+            }
+            self._crawl_job_posts[job_id] = {}
+            return job_id
+
+    def get_crawl_job(self, job_id: int) -> Optional[Dict[str, Any]]:
+        self._round_trip()
+        with self._lock:
+            job = self._crawl_jobs.get(job_id)
+            if job is None or job['tenant_id'] != self.tenant_id:
+                return None
+            post_states: Dict[str, int] = {}
+            for post in self._crawl_job_posts[job_id].values():
+                post_states[post['state']] = post_states.get(post['state'], 0) + 1
+            return {**{key: value for key, value in job.items() if key != 'tenant_id'}, 'post_states': post_states}
+
+    def get_resumable_crawl_job_id(self) -> Optional[int]:
+        self._round_trip()
+        with self._lock:
+            return max((job_id for job_id, job in self._crawl_jobs.items()
+                        if job['tenant_id'] == self.tenant_id and job['status'] != 'completed'), default=None)
+
+    def update_crawl_job(self, job_id: int, status: Optional[str] = None, listing_done: Optional[bool] = None,
+                         last_error: Optional[str] = None):
+        self._round_trip()
+        with self._lock:
+            job = self._crawl_jobs[job_id]
+            if status is not None:
+                job['status'] = status
+            if listing_done is not None:
+                job['listing_done'] = bool(listing_done)
+            if status is not None or last_error is not None:
+                job['last_error'] = last_error
+            job['total_posts'] = len(self._crawl_job_posts[job_id])
+            job['updated_at'] = time.time()
+            if status in ('completed', 'incomplete', 'failed', 'interrupted'):
+                job['finished_at'] = time.time()
+
+    def add_crawl_job_posts(self, job_id: int, posts_meta: List[Dict[str, Any]]):
+        if not posts_meta:
+            return
+        self._round_trip()
+        with self._lock:
+            posts = self._crawl_job_posts[job_id]
+            for post in posts_meta:
+                posts.setdefault(post['url'], {
+                    'url': post['url'], 'title': post.get('title'), 'log_no': post.get('log_no'),
+                    'add_date': post.get('add_date'), 'modify_date': post.get('modify_date'), 'state': 'listed', 'last_error': None,
+                })
+
+    def set_crawl_job_post_states(self, job_id: int, updates: List[Tuple[str, str, Optional[str]]]):
+        if not updates:
+            return
+        self._round_trip()
+        with self._lock:
+            posts = self._crawl_job_posts[job_id]
+            for post_url, state, error in updates:
+                if post_url in posts:
+                    posts[post_url].update({'state': state, 'last_error': error})
+
+    def get_crawl_job_posts(self, job_id: int, exclude_states: Tuple[str, ...] = ()) -> List[Dict[str, Any]]:
+        self._round_trip()
+        with self._lock:
+            posts = sorted((post for post in self._crawl_job_posts.get(job_id, {}).values() if post['state'] not in exclude_states),
+                           key=lambda post: post['url'])
+        # ORDER BY log_no DESC NULLS LAST, post_url
+        listed = sorted((post for post in posts if post['log_no'] is not None), key=lambda post: post['log_no'], reverse=True)
+        keys = ('url', 'title', 'log_no', 'add_date', 'modify_date')
+        return [{key: post[key] for key in keys} for post in listed + [post for post in posts if post['log_no'] is None]]
+
+
+# --- 합성 말뭉치 ---
+_SERVICES = ["타이어", "엔진오일", "브레이크패드", "와이퍼", "배터리", "에어컨필터", "휠얼라인먼트", "미션오일", "냉각수", "점화플러그"]
+_CARS = ["아반떼", "쏘나타", "그랜저", "k5", "k8", "gv80", "싼타페", "쏘렌토", "카니발", "모닝"]
+_WORDS = ["교체", "점검", "정비", "추천", "가격", "할인", "예약", "방문", "주기", "상태", "소음", "마모", "시공", "무상", "보증",
+          "고객님", "차량", "작업", "완료", "확인", "안전", "겨울철", "여름철", "장거리", "주행", "매장", "당일", "상담"]
+
+
+def _chunk_text(rng: random.Random, words: int) -> str:
+    parts = []
+    for _ in range(words):
+        roll = rng.random()
+        if roll < 0.15:
+            parts.append(rng.choice(_SERVICES))
+        elif roll < 0.25:
+            parts.append(rng.choice(_CARS))
+        elif roll < 0.28:
+            parts.append(f"{rng.randint(1, 60) * 5},000원")
+        elif roll < 0.29:
+            parts.append(f"010-{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}")
+        else:
+            parts.append(rng.choice(_WORDS))
+    return " ".join(parts) + "."
+
+
+def synthetic_posts(chunk_count: int, chunks_per_post: int = 10, words_per_chunk: int = 80, dim: int = 1536,
+                    seed: int = 42) -> Iterator[Tuple[str, str, List[str], np.ndarray]]:
+    """
+    자동차 정비 블로그를 흉내낸 합성 게시글을 (post_url, 제목, 청크 본문 목록, 청크 벡터 행렬)로 생성.
+    벡터는 시드 고정 난수 단위 벡터로 한 게시글씩 만들어, 100만 청크도 말뭉치 전체를 두 번 들고 있지 않게 한다.
+    """
+    rng = random.Random(seed)
+    vector_rng = np.random.default_rng(seed)
+    for post_index in range((chunk_count + chunks_per_post - 1) // chunks_per_post):
+        count = min(chunks_per_post, chunk_count - post_index * chunks_per_post)
+        texts = [_chunk_text(rng, words_per_chunk) for _ in range(count)]
+        vectors = vector_rng.standard_normal((count, dim), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        title = f"{rng.choice(_CARS)} {rng.choice(_SERVICES)} {rng.choice(_WORDS)} 후기 #{post_index + 1}"
+        yield f"https://blog.naver.com/bench/{post_index + 1}", title, texts, vectors
+
+
+def synthetic_questions(count: int, seed: int = 7) -> List[str]:
+    """ 합성 말뭉치와 같은 어휘로 만든 고객 질문 """
+    rng = random.Random(seed)
+    templates = ["{car} {service} {word} 가격이 얼마인가요?", "{service} {word} 주기가 어떻게 되나요?",
+                 "{car} {service} 당일 {word} 가능한가요?", "{service} {word} 예약은 어떻게 하나요?"]
+    return [
+        rng.choice(templates).format(car=rng.choice(_CARS), service=rng.choice(_SERVICES), word=rng.choice(_WORDS))
+        for _ in range(count)
+    ]
+
+
+def synthetic_business_info(embedder: Embedder, faq_count: int = 20) -> Dict[str, Any]:
+    """ 벤치마크용 업체 정보 (FAQ 임베딩 포함) """
+    faqs = [{'q': question, 'a': "매장으로 문의해 주세요."} for question in synthetic_questions(faq_count, seed=11)]
+    return {
+        'business_name': "불로 카센터", 'blog_url': "https://blog.naver.com/bench",
+        'chatbot_personality': "친절하고 명확하게", 'faqs': faqs, 'marketing_info': "이번 달 엔진오일 교체 20% 할인 행사 중입니다.",
+        'faq_vectors': np.vstack(embedder.embed_texts([faq['q'] for faq in faqs])),
+    }
@@ -0,0 +1,378 @@
+# bench/run_bench.py
+"""
+OpenAI와 Oracle ATP 없이 RAG 핫 패스(임베딩, 게시글 저장, 청크 검색, 챗봇 답변)의 성능을 측정하는 벤치마크.
+가짜 임베딩 모델(해시 벡터), 지연 시간을 지정할 수 있는 가짜 LLM, 메모리 DB(InMemoryOracleManager)를 사용하며
+결과는 JSON으로 저장하여 릴리스 사이의 성능 회귀를 비교할 수 있다.
+
+    python bench/run_bench.py --chunks 1000 100000 --concurrency 1 8 32
+    python bench/run_bench.py --baseline bench/results/<이전 결과>.json
+"""
+import os
+import sys
+import io
+import json
+import time
+import asyncio
+import argparse
+import platform
+import resource
+import subprocess
+import tempfile
+import threading
+import contextlib
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+# bench/ 디렉터리에서 실행하더라도 루트 모듈(database, chatbot_service 등)을 import 할 수 있도록 경로 추가
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")  # ChatbotService/Embedder의 키 확인용 (실제 호출 없음)
+
+import metrics
+import vector_index
+from bench.fakes import (FakeChatModel, FakeEmbedder, InMemoryOracleManager, synthetic_business_info, synthetic_posts,
+                         synthetic_questions)
+from chatbot_service import ChatbotService
+from main import plan_chunk_changes
+
+SCENARIOS = ("embed", "upsert", "search", "chatbot")
+DEFAULT_RESULTS_DIR = os.path.join(REPO_ROOT, "bench", "results")
+
+
+def summarize(latencies: List[float]) -> Dict[str, Any]:
+    """ 초 단위 지연 시간 목록 → {count, p50_ms, p90_ms, p99_ms, mean_ms, max_ms} """
+    if not latencies:
+        return {'count': 0}
+    values = np.asarray(latencies) * 1000
+    return {
+        'count': len(values),
+        'p50_ms': round(float(np.percentile(values, 50)), 3), 'p90_ms': round(float(np.percentile(values, 90)), 3),
+        'p99_ms': round(float(np.percentile(values, 99)), 3), 'mean_ms': round(float(values.mean()), 3),
+        'max_ms': round(float(values.max()), 3),
+    }
+
+
+def peak_rss_mb() -> float:
+    """ 프로세스 최대 상주 메모리 (Linux: KB, macOS: 바이트 단위로 보고됨) """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def timed_calls(fn: Callable[[Any], Any], items: List[Any]) -> List[float]:
+    latencies = []
+    for item in items:
+        started = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def run_concurrently(fn: Callable[[Any], Any], items: List[Any], concurrency: int) -> Dict[str, Any]:
+    """ concurrency개 스레드로 items를 처리하며 호출별 지연 시간과 전체 처리량(QPS)을 측정 """
+    def call(item):
+        started = time.perf_counter()
+        fn(item)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(call, items))
+    elapsed = time.perf_counter() - started
+    return {**summarize(latencies), 'concurrency': concurrency, 'qps': round(len(items) / elapsed, 2)}
+
+
+async def run_concurrently_async(coro_fn: Callable[[Any], Any], items: List[Any], concurrency: int) -> Dict[str, Any]:
+    """ run_concurrently의 비동기 버전: 이벤트 루프 하나에서 동시에 concurrency개까지 실행 """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def call(item):
+        async with semaphore:
+            started = time.perf_counter()
+            await coro_fn(item)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(call(item) for item in items))
+    elapsed = time.perf_counter() - started
+    return {**summarize(latencies), 'concurrency': concurrency, 'qps': round(len(items) / elapsed, 2)}
+
+
+@contextlib.contextmanager
+def quiet(enabled: bool):
+    """ 측정 중 진행 로그(print) 출력을 숨김 """
+    if not enabled:
+        yield
+        return
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def new_manager(args) -> InMemoryOracleManager:
+    return InMemoryOracleManager(embedding_dim=args.dim, vector_search_backend=args.backend, index_dir=args.index_dir,
+                                 hybrid_search_candidates=args.hybrid_candidates, latency_seconds=args.db_latency_ms / 1000)
+
+
+def new_embedder(args) -> FakeEmbedder:
+    return FakeEmbedder(dim=args.dim, latency_seconds=args.embed_latency_ms / 1000)
+
+
+def load_corpus(manager: InMemoryOracleManager, args, chunk_count: int) -> float:
+    started = time.perf_counter()
+    manager.load_corpus(synthetic_posts(chunk_count, args.chunks_per_post, args.words_per_chunk, args.dim))
+    return round(time.perf_counter() - started, 3)
+
+
+def bench_embed(args) -> Dict[str, Any]:
+    """ Embedder: 캐시 미스(일괄 임베딩), 캐시 적중, 질문 임베딩 """
+    embedder = new_embedder(args)
+    texts = [text for _, _, post_texts, _ in synthetic_posts(args.embed_texts, args.chunks_per_post, args.words_per_chunk, 8)
+             for text in post_texts]
+    batches = [texts[i:i + args.embed_batch_size] for i in range(0, len(texts), args.embed_batch_size)]
+    cold = timed_calls(embedder.embed_texts, batches)
+    warm = timed_calls(embedder.embed_texts, batches)
+    questions = synthetic_questions(args.queries)
+    query = timed_calls(embedder.embed_query, questions)
+    return {
+        'texts': len(texts), 'batch_size': args.embed_batch_size,
+        'embed_texts_cold': {**summarize(cold), 'texts_per_second': round(len(texts) / sum(cold), 1)},
+        'embed_texts_cached': {**summarize(warm), 'texts_per_second': round(len(texts) / sum(warm), 1)},
+        'embed_query': summarize(query),
+        'count_tokens': summarize(timed_calls(embedder.count_tokens, texts[:1000])),
+        'cache': embedder.get_cache_stats(),
+    }
+
+
+def bench_upsert(args) -> Dict[str, Any]:
+    """
+    upsert_posts_with_chunks: 새 게시글 저장(분할 → 임베딩 → 배치 저장)과,
+    청크 하나만 바뀐 게시글의 증분 저장(plan_chunk_changes로 바뀐 청크만 임베딩/삭제)을 측정
+    """
+    manager, embedder = new_manager(args), new_embedder(args)
+    if args.upsert_base_chunks:
+        load_corpus(manager, args, args.upsert_base_chunks)
+    if args.hybrid_candidates:
+        with quiet(not args.verbose):
+            manager.build_lexical_index()  # 증분 갱신 경로를 측정하도록 기존 인덱스를 준비
+    posts = [
+        {'post_url': f"https://blog.naver.com/bench/new/{i}", 'title': title, 'content': "\n\n".join(texts)}
+        for i, (_, title, texts, _) in enumerate(synthetic_posts(args.upsert_posts * args.chunks_per_post, args.chunks_per_post,
+                                                                 args.words_per_chunk, 8, seed=99))
+    ]
+
+    def write(batch, incremental: bool):
+        prepared = []
+        for post in batch:
+            content = post['content'] + (f"\n\n수정 {time.time_ns()}" if incremental else "")
+            chunks = embedder.split_text(content)
+            reused, added, stale_ids = plan_chunk_changes(chunks, manager.get_post_chunk_hashes(post['post_url']))
+            vectors = embedder.embed_texts([text for text, _ in added])
+            prepared.append({
+                'post_url': post['post_url'], 'title': post['title'], 'content_hash': str(hash(content)),
+                'chunks': [{'chunk_text': text, 'chunk_hash': h, 'embedding': v} for (text, h), v in zip(added, vectors)],
+                **({'stale_chunk_ids': stale_ids} if incremental else {}),
+            })
+        manager.upsert_posts_with_chunks(prepared)
+
+    batches = [posts[i:i + args.write_batch_size] for i in range(0, len(posts), args.write_batch_size)]
+    with quiet(not args.verbose):
+        started = time.perf_counter()
+        insert = timed_calls(lambda batch: write(batch, False), batches)
+        insert_elapsed = time.perf_counter() - started
+        started = time.perf_counter()
+        update = timed_calls(lambda batch: write(batch, True), batches)
+        update_elapsed = time.perf_counter() - started
+    return {
+        'posts': len(posts), 'write_batch_size': args.write_batch_size, 'base_chunks': args.upsert_base_chunks,
+        'insert_batch': {**summarize(insert), 'posts_per_second': round(len(posts) / insert_elapsed, 1)},
+        'incremental_batch': {**summarize(update), 'posts_per_second': round(len(posts) / update_elapsed, 1)},
+    }
+
+
+def bench_search(args, chunk_count: int) -> Dict[str, Any]:
+    """ find_similar_chunks(벡터)와 search_chunks(하이브리드): 인덱스 구축 시간, 단일/동시 검색 지연, 메모리 """
+    manager, embedder = new_manager(args), new_embedder(args)
+    rss_before = peak_rss_mb()
+    result: Dict[str, Any] = {'chunks': chunk_count, 'backend': args.backend, 'load_seconds': load_corpus(manager, args, chunk_count)}
+    with quiet(not args.verbose):
+        started = time.perf_counter()
+        manager.get_vector_index()
+        result['vector_index_build_seconds'] = round(time.perf_counter() - started, 3)
+        if args.hybrid_candidates:
+            started = time.perf_counter()
+            manager.get_lexical_index()
+            result['lexical_index_build_seconds'] = round(time.perf_counter() - started, 3)
+    result['vector_index_mb'] = round(vector_index.get_cache_stats()['bytes'] / (1024 * 1024), 1)
+
+    questions = synthetic_questions(args.queries)
+    query_vectors = {question: embedder.embed_query(question).tolist() for question in questions}
+    result['find_similar_chunks'] = summarize(
+        timed_calls(lambda question: manager.find_similar_chunks(query_vectors[question], k=3), questions)
+    )
+    if args.hybrid_candidates:
+        result['search_chunks'] = summarize(
+            timed_calls(lambda question: manager.search_chunks(question, query_vectors[question], k=3), questions)
+        )
+    search = (lambda question: manager.search_chunks(question, query_vectors[question], k=3)) if args.hybrid_candidates \
+        else (lambda question: manager.find_similar_chunks(query_vectors[question], k=3))
+    result['concurrent'] = [run_concurrently(search, questions, concurrency) for concurrency in args.concurrency]
+    result['peak_rss_mb'] = peak_rss_mb()
+    result['peak_rss_growth_mb'] = round(result['peak_rss_mb'] - rss_before, 1)
+
+    # 다음 크기를 적재하기 전에 이 말뭉치의 벡터 인덱스를 프로세스 캐시에서 내려 메모리를 돌려받음
+    vector_index.evict_cached_index(manager.vector_index_backend, manager.vector_index_key)
+    return result
+
+
+def bench_chatbot(args) -> Dict[str, Any]:
+    """
+    ChatbotService 답변 파이프라인 (동기: answer_question_with_details, 비동기: answer_question_async).
+    질문의 repeat_ratio만큼은 앞서 나온 질문을 반복하여 캐시 적중 경로도 함께 측정한다.
+    """
+    manager, embedder = new_manager(args), new_embedder(args)
+    load_corpus(manager, args, args.chatbot_chunks)
+    with quiet(not args.verbose):
+        manager.save_business_info(synthetic_business_info(embedder))
+    llm = FakeChatModel(latency_seconds=args.llm_latency_ms / 1000)
+
+    unique = synthetic_questions(max(1, int(args.queries * (1 - args.repeat_ratio))), seed=3)
+    rng = np.random.default_rng(5)
+    questions = unique + [unique[i] for i in rng.integers(0, len(unique), args.queries - len(unique))]
+    rng.shuffle(questions)
+
+    def fresh_service() -> ChatbotService:
+        manager.clear_answer_cache()  # 동시성 수준마다 빈 답변 캐시에서 시작
+        with quiet(not args.verbose):
+            return ChatbotService(manager, embedder, llm=llm)
+
+    result: Dict[str, Any] = {'questions': len(questions), 'unique_questions': len(unique), 'chunks': args.chatbot_chunks,
+                              'llm_latency_ms': args.llm_latency_ms, 'db_latency_ms': args.db_latency_ms, 'sync': [], 'async': []}
+    for concurrency in args.concurrency:
+        service = fresh_service()
+        sources: Dict[str, int] = {}
+        sources_lock = threading.Lock()
+
+        def answer(question):
+            details = service.answer_question_with_details(question)
+            source = details['cache_type'] or ('coalesced' if details['coalesced'] else 'generated')
+            with sources_lock:
+                sources[source] = sources.get(source, 0) + 1
+
+        metrics.reset_stage_stats()
+        with quiet(not args.verbose):
+            run = run_concurrently(answer, questions, concurrency)
+        result['sync'].append({**run, 'answers_by_source': sources, 'stages': metrics.get_stage_stats()})
+
+        service = fresh_service()
+        with quiet(not args.verbose):
+            run = asyncio.run(run_concurrently_async(service.answer_question_async, questions, concurrency))
+        result['async'].append(run)
+    return result
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], prefix: str = "") -> List[str]:
+    """ 두 결과에서 같은 경로의 p50/p99/qps 값을 비교한 줄 목록 (지연은 증가, 처리량은 감소가 회귀) """
+    lines = []
+    if isinstance(results, list) and isinstance(baseline, list):
+        for index, (current, previous) in enumerate(zip(results, baseline)):
+            lines += compare(current, previous, f"{prefix}[{index}]")
+        return lines
+    if not isinstance(results, dict) or not isinstance(baseline, dict):
+        return lines
+    for key, value in results.items():
+        previous = baseline.get(key)
+        path = f"{prefix}.{key}" if prefix else key
+        if key in ('p50_ms', 'p99_ms', 'qps') and isinstance(previous, (int, float)) and previous:
+            change = (value - previous) / previous * 100
+            regressed = change > 0 if key != 'qps' else change < 0
+            flag = " ⚠️" if regressed and abs(change) >= 10 else ""
+            lines.append(f"  {path}: {previous} → {value} ({change:+.1f}%){flag}")
+        elif isinstance(value, (dict, list)):
+            lines += compare(value, previous, path)
+    return lines
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="<불로챗> RAG 핫 패스 오프라인 벤치마크 (OpenAI/Oracle 없이 실행)")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS), help="실행할 시나리오 (기본값: 전체)")
+    parser.add_argument("--chunks", type=int, nargs="+", default=[1000, 10000], help="검색 벤치마크의 말뭉치 크기(청크 수) 목록")
+    parser.add_argument("--dim", type=int, default=1536, help="임베딩 차원 (기본값: 1536, 100만 청크는 약 6GB 필요)")
+    parser.add_argument("--backend", choices=sorted(vector_index.VECTOR_INDEX_BACKENDS), default="numpy", help="벡터 인덱스 백엔드")
+    parser.add_argument("--hybrid-candidates", type=int, default=20, help="하이브리드 검색 후보 수 (0이면 벡터 검색만)")
+    parser.add_argument("--queries", type=int, default=200, help="질문 수")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="동시 요청 수 목록")
+    parser.add_argument("--chunks-per-post", type=int, default=10)
+    parser.add_argument("--words-per-chunk", type=int, default=80)
+    parser.add_argument("--embed-texts", type=int, default=2000, help="임베딩 벤치마크의 텍스트 수")
+    parser.add_argument("--embed-batch-size", type=int, default=100)
+    parser.add_argument("--upsert-posts", type=int, default=200, help="저장 벤치마크의 게시글 수")
+    parser.add_argument("--upsert-base-chunks", type=int, default=10000, help="저장 벤치마크 전에 미리 적재할 청크 수")
+    parser.add_argument("--write-batch-size", type=int, default=10, help="한 번에 저장할 게시글 수")
+    parser.add_argument("--chatbot-chunks", type=int, default=10000, help="챗봇 벤치마크의 말뭉치 크기")
+    parser.add_argument("--repeat-ratio", type=float, default=0.5, help="챗봇 벤치마크에서 반복 질문 비율 (캐시 적중)")
+    parser.add_argument("--llm-latency-ms", type=float, default=500, help="가짜 LLM 응답 지연")
+    parser.add_argument("--embed-latency-ms", type=float, default=0, help="가짜 임베딩 API 호출 지연")
+    parser.add_argument("--db-latency-ms", type=float, default=0, help="메모리 DB 호출마다 더할 왕복 지연")
+    parser.add_argument("--output", default=None, help="결과 JSON 경로 (기본값: bench/results/bench_<시각>.json)")
+    parser.add_argument("--baseline", default=None, help="비교할 이전 결과 JSON")
+    parser.add_argument("--verbose", action="store_true", help="측정 중 서비스 로그를 숨기지 않음")
+    args = parser.parse_args()
+
+    started_at = datetime.now()
+    results: Dict[str, Any] = {}
+    # 벡터/키워드 인덱스 파일은 임시 디렉터리에 저장하고 끝나면 지움 (faiss_indexes/의 실제 인덱스를 건드리지 않음)
+    index_dir = tempfile.TemporaryDirectory(prefix="bullroh_bench_")
+    args.index_dir = index_dir.name
+    if "embed" in args.scenarios:
+        print("▶️ 임베딩 벤치마크...")
+        results['embed'] = bench_embed(args)
+    if "upsert" in args.scenarios:
+        print("▶️ 게시글 저장 벤치마크...")
+        results['upsert'] = bench_upsert(args)
+    if "search" in args.scenarios:
+        results['search'] = []
+        for chunk_count in args.chunks:
+            print(f"▶️ 검색 벤치마크 ({chunk_count}개 청크)...")
+            results['search'].append(bench_search(args, chunk_count))
+    if "chatbot" in args.scenarios:
+        print("▶️ 챗봇 답변 벤치마크...")
+        results['chatbot'] = bench_chatbot(args)
+    index_dir.cleanup()
+    del args.index_dir
+
+    report = {
+        'meta': {
+            'started_at': started_at.isoformat(timespec="seconds"),
+            'duration_seconds': round((datetime.now() - started_at).total_seconds(), 1),
+            'git_revision': git_revision(), 'python': platform.python_version(), 'platform': platform.platform(),
+            'cpu_count': os.cpu_count(), 'numpy': np.__version__, 'peak_rss_mb': peak_rss_mb(), 'args': vars(args),
+        },
+        'results': results,
+    }
+    output = args.output or os.path.join(DEFAULT_RESULTS_DIR, f"bench_{started_at:%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    print(f"✅ 결과를 {output}에 저장했습니다.")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\n📊 {args.baseline} 대비 변화 (⚠️: 10% 이상 나빠짐)")
+        print("\n".join(compare(results, baseline.get('results', {}))) or "  비교할 항목이 없습니다.")
+
+
+if __name__ == "__main__":
+    main()
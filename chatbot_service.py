@@ -1,64 +1,24 @@
 # chatbot_service.py
 import os
+import time
+import asyncio
 import hashlib
-from typing import Dict, Any
+import logging
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, Any, AsyncIterator, Iterator, List, Optional, Tuple
 from langchain_openai import ChatOpenAI
-from langchain.chains import LLMChain
 from langchain.prompts import PromptTemplate
 from database import OracleManager
 from embedder import Embedder
+from vector_index import normalize_vectors
+from context_budget import ContextBudgeter, ContextItem, TokenCounter, remove_overlaps
+import metrics
 
-class ChatbotService:
-    """ RAG 챗봇의 핵심 로직을 담당하는 서비스 클래스 (비용 최적화 적용) """
-    def __init__(self, db_manager: OracleManager, embedder: Embedder):
-        if not os.getenv("OPENAI_API_KEY"):
-            raise ValueError(".env 파일에 OPENAI_API_KEY가 설정되지 않았습니다.")
-        self.db_manager = db_manager
-        self.embedder = embedder
-        self.llm = ChatOpenAI(model_name="gpt-4o-mini", temperature=0)
+logger = logging.getLogger(__name__)
 
-    def answer_question(self, question: str) -> str:
-        """ 사용자의 질문에 대해 RAG 파이프라인을 거쳐 답변을 생성. 캐싱 로직 포함. """
-        # 1. 질문을 해시하여 캐시된 답변이 있는지 확인
-        question_hash = hashlib.sha256(question.encode()).hexdigest()
-        cached_answer = self.db_manager.get_cached_answer(question_hash)
-        if cached_answer:
-            print("  - [Cache Hit] 이전에 저장된 답변을 반환합니다.")
-            return cached_answer
-
-        print("  - [Cache Miss] 새로운 질문에 대한 답변을 생성합니다.")
-        # 2. 업체 정보 조회
-        business_info = self.db_manager.get_business_info()
-        if not business_info:
-            return "업체 정보가 설정되지 않았습니다. 'onboard' 명령을 먼저 실행해주세요."
-
-        # 3. 질문 임베딩
-        print("  - 질문을 벡터로 변환하는 중...")
-        query_vector = self.embedder.embed_query(question).tolist()
-
-        # 4. 블로그 내용에서 유사 내용 검색 (Vector Search)
-        print("  - 블로그 내용에서 유사한 정보 검색 중...")
-        similar_chunks = self.db_manager.find_similar_chunks(query_vector, k=3)
-        print(f"  - [Debug] 유사 블로그 청크: {similar_chunks}")
-        blog_context = "\n\n---\n\n".join([text for text, score in similar_chunks])
-        print(f"  - [Debug] 블로그 컨텍스트: {blog_context}")
-
-        # 5. 직접 등록한 FAQ에서 관련 내용 검색
-        print("  - FAQ에서 관련 정보 검색 중...")
-        faq_context = ""
-        for faq in business_info.get('faqs', []):
-            if question in faq.get('q', ''):
-                faq_context += f"Q: {faq['q']}\nA: {faq['a']}\n"
-        
-        # 6. LLM에 전달할 최종 컨텍스트 구성
-        final_context = f"### 블로그에서 발췌한 정보 ###\n{blog_context}\n\n"
-        if faq_context:
-            final_context += f"### 자주 묻는 질문(FAQ) ###\n{faq_context}\n\n"
-        if business_info.get('marketing_info'):
-            final_context += f"### 현재 진행중인 이벤트 및 공지 ###\n{business_info['marketing_info']}\n"
-            
-        # 7. 동적 프롬프트 생성 및 LLM 호출
-        prompt_template = """
+ANSWER_PROMPT_TEMPLATE = """
 # 역할 정의 (Role Definition)
 당신은 '{business_name}'의 전문 AI 고객 상담원입니다. 
 당신의 전문성: 고객 서비스, 정보 검색, 문제 해결
@@ -158,22 +118,763 @@ class ChatbotService:
 
 **최종 답변:**
 [여기에 고객을 위한 답변 작성]
+"""
+
+# 간결한 프롬프트 (PROMPT_STYLE=compact, 기본값): 지침을 줄이고 '사고 과정' 없이 최종 답변만 생성하여 입력/출력 토큰을 줄임
+COMPACT_PROMPT_TEMPLATE = """
+당신은 '{business_name}'의 AI 고객 상담원입니다. 말투: {personality}
+
+규칙:
+- 아래 참고 자료에 있는 내용만 근거로 답하고, 추측하지 마세요.
+- 자료에 답이 없으면 솔직하게 알리고, 관련된 정보나 문의 방법을 안내하세요.
+- 사고 과정이나 단계 설명 없이 고객에게 보낼 최종 답변만 간결하게 작성하세요.
+
+# 참고 자료
+{context}
+
+# 고객 질문
+{question}
+
+# 답변
+"""
+
+PROMPT_TEMPLATES = {"full": ANSWER_PROMPT_TEMPLATE, "compact": COMPACT_PROMPT_TEMPLATE}
+
+class SemanticAnswerCache:
+    """
+    qa_cache에 저장된 질문 임베딩으로 표현만 다른 같은 질문(패러프레이즈)의 캐시 답변을 찾는 메모리 인덱스.
+    DB의 캐시 항목은 refresh_seconds 간격으로 다시 읽고, 이 프로세스에서 저장한 항목은 즉시 반영한다.
+    """
+    def __init__(self, db_manager: OracleManager, threshold: float, refresh_seconds: float):
+        self.db_manager = db_manager
+        self.threshold = threshold
+        self.refresh_seconds = refresh_seconds
+        self.hashes: List[str] = []
+        self.questions: List[str] = []
+        self.matrix = np.empty((0, 0), dtype=np.float32)
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return 0 < self.threshold <= 1
+
+    def _refresh_if_needed(self):
+        if time.monotonic() - self._loaded_at < self.refresh_seconds:
+            return
+        entries = self.db_manager.get_cached_question_vectors()
+        with self._lock:
+            self.hashes = [question_hash for question_hash, _, _ in entries]
+            self.questions = [question for _, question, _ in entries]
+            self.matrix = normalize_vectors(np.vstack([vector for _, _, vector in entries])) if entries else np.empty((0, 0), dtype=np.float32)
+            self._loaded_at = time.monotonic()
+
+    def lookup(self, query_vector) -> Optional[Tuple[str, str, float]]:
+        """ 임계값 이상으로 가장 유사한 캐시 질문의 (question_hash, 질문 원문, 코사인 유사도). 없으면 None """
+        if not self.enabled:
+            return None
+        self._refresh_if_needed()
+        with self._lock:
+            if not self.hashes:
+                return None
+            similarities = self.matrix @ normalize_vectors(query_vector)[0]
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                return None
+            return self.hashes[best], self.questions[best], float(similarities[best])
+
+    def add(self, question_hash: str, question: str, vector):
+        if not self.enabled:
+            return
+        with self._lock:
+            row = normalize_vectors(vector)
+            self.matrix = np.vstack([self.matrix, row]) if len(self.hashes) else row
+            self.hashes.append(question_hash)
+            self.questions.append(question)
+
+class SingleFlight:
+    """
+    같은 키로 동시에 들어온 호출을 하나로 합쳐, 먼저 온 호출(리더)이 한 번만 실행하고 나머지는 그 결과를 공유.
+    run은 스레드 간, run_async는 같은 이벤트 루프의 태스크 간 중복을 제거하며 둘 다 (결과, 공유 여부)를 반환한다.
+    스트리밍처럼 함수 하나로 감쌀 수 없는 리더는 join/end(join_async/end_async)로 직접 참여한다.
+    리더가 결과 없이 중단되면(스트리밍 클라이언트 연결 끊김) 기다리던 호출 중 하나가 새 리더가 된다.
+    """
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result: Any = None
+            self.error: Optional[BaseException] = None
+            self.abandoned = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, "SingleFlight._Call"] = {}
+        self._tasks: Dict[str, asyncio.Future] = {}
+
+    def join(self, key: str) -> Tuple[Optional["SingleFlight._Call"], Any]:
+        """
+        진행 중인 호출이 있으면 끝날 때까지 기다려 (None, 결과)를 반환 (리더의 예외는 그대로 발생).
+        없으면 이 호출을 리더로 등록해 (call, None)을 반환하며, 리더는 끝날 때 반드시 end를 호출해야 한다.
         """
-        prompt = PromptTemplate(template=prompt_template, input_variables=["business_name", "personality", "context", "question"])
-        
-        print("  - LLM으로 최종 답변 생성 중...")
-        # LangChainDeprecationWarning 해결: LLMChain 대신 prompt | llm 사용
-        chain = prompt | self.llm
-        response = chain.invoke({
-            "business_name": business_info['business_name'],
-            "personality": business_info['chatbot_personality'] or "친절하고 명확하게",
-            "context": final_context.strip(),
-            "question": question
-        })
-        
-        final_answer = response.content
-        
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                if call is None:
+                    call = self._calls[key] = self._Call()
+                    return call, None
+            call.done.wait()
+            if call.abandoned:
+                continue
+            if call.error is not None:
+                raise call.error
+            return None, call.result
+
+    def end(self, key: str, call: "SingleFlight._Call", result: Any = None, error: Optional[BaseException] = None):
+        """ 리더의 결과(또는 예외)를 기다리는 호출에 넘기고 키를 비움. 두 번째 호출부터는 무시 """
+        if call.done.is_set():
+            return
+        call.result = result
+        call.error = error
+        call.abandoned = isinstance(error, GeneratorExit)
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        call.done.set()
+
+    def run(self, key: str, fn) -> Tuple[Any, bool]:
+        call, result = self.join(key)
+        if call is None:
+            return result, True
+        try:
+            result = fn()
+        except BaseException as e:
+            self.end(key, call, error=e)
+            raise
+        self.end(key, call, result)
+        return result, False
+
+    async def run_async(self, key: str, coro_fn) -> Tuple[Any, bool]:
+        while True:
+            task = self._tasks.get(key)
+            shared = task is not None
+            if task is None:
+                # 별도 태스크로 실행하여 먼저 온 요청의 클라이언트가 끊겨(취소되어)도 기다리는 다른 요청은 결과를 받도록 함
+                task = asyncio.ensure_future(coro_fn())
+                self._track(key, task)
+            try:
+                return await asyncio.shield(task), shared
+            except asyncio.CancelledError:
+                if self._abandoned(task):
+                    continue
+                raise
+
+    async def join_async(self, key: str) -> Tuple[Optional[asyncio.Future], Any]:
+        """ join의 비동기 버전. 리더이면 (결과를 넘길 Future, None)을 반환하며 끝날 때 반드시 end_async를 호출해야 한다 """
+        while True:
+            task = self._tasks.get(key)
+            if task is None:
+                future = asyncio.get_running_loop().create_future()
+                self._track(key, future)
+                return future, None
+            try:
+                return None, await asyncio.shield(task)
+            except asyncio.CancelledError:
+                if self._abandoned(task):
+                    continue
+                raise
+
+    @staticmethod
+    def end_async(future: asyncio.Future, result: Any = None, error: Optional[BaseException] = None):
+        """ join_async로 받은 Future에 리더의 결과를 넘김. 연결이 끊겨 중단된 경우에는 취소하여 기다리던 요청이 다시 시도하게 함 """
+        if future.done():
+            return
+        if isinstance(error, (GeneratorExit, asyncio.CancelledError)):
+            future.cancel()
+        elif error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    @staticmethod
+    def _abandoned(task: asyncio.Future) -> bool:
+        # 리더 쪽 Future가 취소된 것이고 기다리던 이 태스크 자신이 취소되는 중이 아니면 다시 시도
+        current = asyncio.current_task()
+        return task.cancelled() and not (current is not None and current.cancelling())
+
+    def _track(self, key: str, task: asyncio.Future):
+        self._tasks[key] = task
+        task.add_done_callback(lambda done, key=key: self._forget_task(key, done))
+
+    def _forget_task(self, key: str, task: asyncio.Future):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            task.exception() # 기다리던 요청이 모두 취소된 경우에도 예외가 '처리되지 않음'으로 기록되지 않도록
+
+def embed_faq_questions(embedder: Embedder, faqs: List[Dict[str, str]]) -> Optional[np.ndarray]:
+    """ FAQ 질문들을 한 번에 임베딩하여 (FAQ 수 x 차원) 행렬로 반환. save_business_info의 'faq_vectors'로 저장 """
+    questions = [faq.get('q', '') for faq in faqs]
+    if not questions:
+        return None
+    return np.vstack(embedder.embed_texts(questions)).astype(np.float32)
+
+class FaqIndex:
+    """ FAQ 질문 임베딩에 대한 코사인 유사도 검색 인덱스 """
+    def __init__(self, faqs: List[Dict[str, str]], vectors: Optional[np.ndarray]):
+        self.faqs = faqs
+        self.matrix = normalize_vectors(vectors) if faqs and vectors is not None else None
+
+    def search(self, query_vector, k: int = 3, min_similarity: float = 0.0) -> List[Tuple[Dict[str, str], float]]:
+        """ 유사도가 min_similarity 이상인 FAQ를 (faq, 코사인 유사도) 형태로 유사도 내림차순 최대 k개 반환 """
+        if self.matrix is None:
+            return []
+        similarities = self.matrix @ normalize_vectors(query_vector)[0]
+        top = np.argsort(-similarities)[:k]
+        return [(self.faqs[i], float(similarities[i])) for i in top if similarities[i] >= min_similarity]
+
+class BusinessContext:
+    """ 업체 정보와 그로부터 미리 만들어 둔 파생 구조 (업체명/성격이 채워진 프롬프트, FAQ 인덱스, 이벤트 컨텍스트) """
+    def __init__(self, info: Dict[str, Any], version_key: Tuple[Any, Any], faq_vectors: Optional[np.ndarray] = None,
+                 prompt_template: str = COMPACT_PROMPT_TEMPLATE, marketing_vector: Optional[np.ndarray] = None):
+        self.info = info
+        self.version_key = version_key
+        self.content_version = info.get('content_version')
+        self.faqs = info.get('faqs', [])
+        self.faq_index = FaqIndex(self.faqs, faq_vectors)
+        self.prompt = PromptTemplate(
+            template=prompt_template,
+            input_variables=["context", "question"],
+            partial_variables={
+                "business_name": info['business_name'],
+                "personality": info['chatbot_personality'] or "친절하고 명확하게",
+            },
+        )
+        self.marketing_info = info.get('marketing_info') or ""
+        self.marketing_vector = normalize_vectors(marketing_vector)[0] if marketing_vector is not None else None
+
+    def marketing_similarity(self, query_vector) -> float:
+        """ 이벤트 공지와 질문의 코사인 유사도 (FAQ/블로그 청크와 같은 척도). 임베딩이 없으면 0 """
+        if self.marketing_vector is None:
+            return 0.0
+        return float(self.marketing_vector @ normalize_vectors(query_vector)[0])
+
+class AnswerRun:
+    """ 질문 하나를 처리하는 동안의 상태: 단계별 소요 시간, 중간 결과, 최종 답변 """
+    def __init__(self, question: str):
+        self.question = question
+        self.question_hash = hashlib.sha256(question.encode()).hexdigest()
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.timings: Dict[str, float] = {}
+        self.query_embedding: Optional[np.ndarray] = None
+        self.business_context: Optional[BusinessContext] = None
+        self.prompt: Optional[PromptTemplate] = None
+        self.llm_inputs: Optional[Dict[str, str]] = None
+        self.faq_matches: List[Tuple[Dict[str, str], float]] = []
+        self.blog_chunks: List[Tuple[str, float]] = []  # (본문, 질문과의 코사인 유사도)
+        self.context_tokens = 0
+        self.chunk_ids: List[int] = []
+        self.answer: Optional[str] = None
+        self.cache_type: Optional[str] = None
+        self.matched_question: Optional[str] = None
+        self.coalesced = False # 다른 요청이 생성한 답변을 기다려 받은 경우
+        self.claimed = False   # 여러 워커 간 생성 잠금(qa_cache PENDING 행)을 이 요청이 선점했는지
+        self.stored = False
+        self.source = 'llm'    # 답변 출처: llm | exact | semantic | faq | no_business_info (지표용)
+
+    def lap(self, stage: str):
+        """ 직전 단계 이후 경과 시간을 stage로 기록 (응답의 timings_ms와 chatbot 단계 지표에 함께 반영) """
+        now = time.perf_counter()
+        self.timings[stage] = round((now - self._last) * 1000, 2)
+        metrics.record_span('chatbot', stage, now - self._last)
+        self._last = now
+
+    def mark(self, stage: str):
+        """ 단계 구간을 끊지 않고 현재까지의 경과 시간만 기록 (예: 첫 토큰 도착 시점) """
+        self.timings[stage] = round((time.perf_counter() - self._last) * 1000, 2)
+
+    def finish(self, answer: str, cache_type: Optional[str] = None, matched_question: Optional[str] = None,
+               source: Optional[str] = None) -> bool:
+        self.answer = answer
+        self.cache_type = cache_type
+        self.matched_question = matched_question
+        self.source = source or cache_type or 'llm'
+        return True
+
+    def result(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self.started
+        self.timings['total'] = round(elapsed * 1000, 2)
+        metrics.record_span('chatbot', 'total', elapsed)
+        metrics.count_answer(self.source)
+        return {
+            'answer': self.answer, 'cache_hit': self.cache_type is not None, 'cache_type': self.cache_type,
+            'matched_question': self.matched_question, 'chunk_ids': self.chunk_ids, 'timings_ms': self.timings,
+            'coalesced': self.coalesced, 'context_tokens': self.context_tokens
+        }
+
+class ChatbotService:
+    """ RAG 챗봇의 핵심 로직을 담당하는 서비스 클래스 (비용 최적화 적용) """
+    def __init__(self, db_manager: OracleManager, embedder: Embedder, llm: Optional[ChatOpenAI] = None):
+        if not os.getenv("OPENAI_API_KEY"):
+            raise ValueError(".env 파일에 OPENAI_API_KEY가 설정되지 않았습니다.")
+        self.db_manager = db_manager
+        self.embedder = embedder
+        self.llm = llm or ChatOpenAI(model_name="gpt-4o-mini", temperature=0)
+        # 의미 기반 캐시: 새 질문과 코사인 유사도가 임계값 이상인 이전 질문의 답변을 재사용 (0이면 비활성화)
+        self.semantic_cache = SemanticAnswerCache(
+            db_manager,
+            threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92")),
+            refresh_seconds=float(os.getenv("SEMANTIC_CACHE_REFRESH_SECONDS", "60")),
+        )
+        # FAQ 검색 임계값: context 이상이면 참고 자료에 포함, direct 이상이면 LLM 호출 없이 등록된 답변을 바로 반환
+        self.faq_context_threshold = float(os.getenv("FAQ_CONTEXT_THRESHOLD", "0.5"))
+        self.faq_direct_answer_threshold = float(os.getenv("FAQ_DIRECT_ANSWER_THRESHOLD", "0.9"))
+        # 업체 정보는 거의 바뀌지 않으므로 프로세스에 보관하고, BUSINESS_INFO_CACHE_SECONDS 간격으로만 변경 여부를 확인
+        self.business_info_cache_seconds = float(os.getenv("BUSINESS_INFO_CACHE_SECONDS", "30"))
+        self._business_context: Optional[BusinessContext] = None
+        self._business_context_checked_at = 0.0
+        self._business_context_lock = threading.Lock()
+        # 같은 질문이 동시에 몰릴 때 임베딩/검색/LLM 호출을 한 번만 수행: 프로세스 안에서는 SingleFlight,
+        # 워커(프로세스) 사이에서는 qa_cache의 잠금 행으로 합침. ANSWER_LOCK_SECONDS=0이면 워커 간 잠금 비활성화
+        self.inflight = SingleFlight()
+        self.answer_lock_seconds = float(os.getenv("ANSWER_LOCK_SECONDS", "30"))
+        self.answer_lock_poll_seconds = float(os.getenv("ANSWER_LOCK_POLL_SECONDS", "0.2"))
+        # 프롬프트: compact(최종 답변만) | full(단계별 사고 과정을 포함한 기존 프롬프트)
+        prompt_style = os.getenv("PROMPT_STYLE", "compact").lower()
+        if prompt_style not in PROMPT_TEMPLATES:
+            raise ValueError(f"PROMPT_STYLE은 {', '.join(PROMPT_TEMPLATES)} 중 하나여야 합니다.")
+        self.prompt_template = PROMPT_TEMPLATES[prompt_style]
+        # 참고 자료는 LLM 토크나이저 기준 CONTEXT_TOKEN_BUDGET 토큰 이내로 맞춤
+        self.context_budgeter = ContextBudgeter(TokenCounter(getattr(self.llm, 'model_name', None) or "gpt-4o-mini"))
+
+    def get_business_context(self) -> Optional[BusinessContext]:
+        """
+        캐시된 업체 정보를 반환. 유효 기간이 지나면 LOB 없이 (content_version, last_updated)만 조회해
+        바뀐 경우에만 전체 정보를 다시 읽고 파생 구조를 새로 만든다.
+        """
+        context = self._business_context
+        if context is not None and time.monotonic() - self._business_context_checked_at < self.business_info_cache_seconds:
+            return context
+
+        with self._business_context_lock:
+            version_key = self.db_manager.get_business_info_version()
+            self._business_context_checked_at = time.monotonic()
+            if version_key is None:
+                self._business_context = None
+                return None
+            if self._business_context is None or self._business_context.version_key != version_key:
+                info = self.db_manager.get_business_info()
+                self._business_context = (
+                    BusinessContext(info, version_key, self._faq_vectors_for(info), self.prompt_template,
+                                    self._marketing_vector_for(info)) if info else None
+                )
+            return self._business_context
+
+    def _faq_vectors_for(self, info: Dict[str, Any]) -> Optional[np.ndarray]:
+        # 저장된 FAQ 임베딩이 없거나 FAQ 수와 맞지 않으면(이전 버전에서 저장된 경우) 여기서 한 번 임베딩
+        faqs = info.get('faqs', [])
+        faq_vectors = info.get('faq_vectors')
+        if faq_vectors is not None and len(faq_vectors) == len(faqs):
+            return faq_vectors
+        return embed_faq_questions(self.embedder, faqs)
+
+    def _marketing_vector_for(self, info: Dict[str, Any]) -> Optional[np.ndarray]:
+        # 이벤트 공지도 질문과의 유사도로 예산 순위를 정하도록 업체 정보가 바뀔 때 한 번 임베딩 (임베딩 캐시에 보관됨)
+        marketing_info = info.get('marketing_info')
+        if not marketing_info:
+            return None
+        try:
+            return self.embedder.embed_texts([marketing_info])[0]
+        except Exception as e:
+            logger.warning("이벤트 공지 임베딩 실패 (가장 낮은 순위로 참고 자료에 포함): %s", e)
+            return None
+
+    def invalidate_business_context(self):
+        """ 이 프로세스에서 업체 정보를 저장한 직후 호출하면 다음 요청에서 바로 다시 읽음 """
+        self._business_context_checked_at = 0.0
+
+    def answer_question(self, question: str) -> str:
+        """ 사용자의 질문에 대해 RAG 파이프라인을 거쳐 답변을 생성. 캐싱 로직 포함. """
+        return self.answer_question_with_details(question)['answer']
+
+    def answer_question_with_details(self, question: str) -> Dict[str, Any]:
+        """
+        answer_question과 동일한 파이프라인을 수행하되, API 응답용 구조화된 결과를 반환.
+        반환값: answer, cache_hit, cache_type(exact/semantic), matched_question(유사 캐시 질문 또는 FAQ 질문),
+               chunk_ids, timings_ms(단계별 소요 시간)
+        """
+        run = AnswerRun(question)
+        result, shared = self.inflight.run(run.question_hash, lambda: self._generate_answer(run))
+        return {**result, 'coalesced': True} if shared else result
+
+    def _generate_answer(self, run: "AnswerRun") -> Dict[str, Any]:
+        try:
+            if self._prepare_answer(run):
+                return run.result()
+
+            logger.debug("LLM으로 최종 답변 생성 중")
+            # LangChainDeprecationWarning 해결: LLMChain 대신 prompt | llm 사용
+            chain = run.prompt | self.llm
+            response = chain.invoke(run.llm_inputs)
+            run.lap('llm')
+            self._store_answer(run, response.content)
+            return run.result()
+        finally:
+            self._release_generation(run)
+
+    def stream_answer(self, question: str) -> Iterator[Dict[str, Any]]:
+        """
+        답변을 생성되는 대로 이벤트로 내보내는 제너레이터.
+        {'type': 'token', 'content': ...}를 여러 번 보낸 뒤 마지막에 {'type': 'done', ...answer_question_with_details와 같은 결과}.
+        캐시/FAQ 적중 시에는 전체 답변을 토큰 하나로 즉시 보낸다.
+        같은 질문을 이 프로세스에서 이미 생성 중이면(스트리밍이든 아니든) 그 결과를 기다렸다가 토큰 하나로 보낸다.
+        """
+        run = AnswerRun(question)
+        call, shared_result = self.inflight.join(run.question_hash)
+        if call is None:
+            yield {'type': 'token', 'content': shared_result['answer']}
+            yield {'type': 'done', **shared_result, 'coalesced': True}
+            return
+        try:
+            if self._prepare_answer(run):
+                result = run.result()
+                self.inflight.end(run.question_hash, call, result)
+                yield {'type': 'token', 'content': run.answer}
+                yield {'type': 'done', **result}
+                return
+
+            logger.debug("LLM으로 최종 답변 스트리밍 중")
+            chain = run.prompt | self.llm
+            parts: List[str] = []
+            for chunk in chain.stream(run.llm_inputs):
+                if not chunk.content:
+                    continue
+                if not parts:
+                    run.mark('llm_first_token')
+                parts.append(chunk.content)
+                yield {'type': 'token', 'content': chunk.content}
+            run.lap('llm')
+            self._store_answer(run, "".join(parts))
+            result = run.result()
+            self.inflight.end(run.question_hash, call, result)  # 마지막 이벤트를 보내기 전에 기다리는 요청에 결과를 넘김
+            yield {'type': 'done', **result}
+        except BaseException as e:
+            self.inflight.end(run.question_hash, call, error=e)  # GeneratorExit(연결 끊김)이면 기다리던 요청이 이어서 생성
+            raise
+        finally:
+            self._release_generation(run)
+
+    async def answer_question_async(self, question: str) -> Dict[str, Any]:
+        """
+        answer_question_with_details의 비동기 버전. OpenAI 호출은 aembed_query/ainvoke로 이벤트 루프 위에서,
+        블로킹 DB 호출은 스레드에서 실행하여 하나의 워커가 많은 동시 요청을 처리할 수 있도록 함.
+        """
+        run = AnswerRun(question)
+        result, shared = await self.inflight.run_async(run.question_hash, lambda: self._generate_answer_async(run))
+        return {**result, 'coalesced': True} if shared else result
+
+    async def _generate_answer_async(self, run: "AnswerRun") -> Dict[str, Any]:
+        try:
+            if await self._prepare_answer_async(run):
+                return run.result()
+
+            logger.debug("LLM으로 최종 답변 생성 중")
+            chain = run.prompt | self.llm
+            response = await chain.ainvoke(run.llm_inputs)
+            run.lap('llm')
+            await asyncio.to_thread(self._store_answer, run, response.content)
+            return run.result()
+        finally:
+            await asyncio.to_thread(self._release_generation, run)
+
+    async def astream_answer(self, question: str) -> AsyncIterator[Dict[str, Any]]:
+        """ stream_answer의 비동기 버전 (chain.astream 사용) """
+        run = AnswerRun(question)
+        future, shared_result = await self.inflight.join_async(run.question_hash)
+        if future is None:
+            yield {'type': 'token', 'content': shared_result['answer']}
+            yield {'type': 'done', **shared_result, 'coalesced': True}
+            return
+        try:
+            if await self._prepare_answer_async(run):
+                result = run.result()
+                self.inflight.end_async(future, result)
+                yield {'type': 'token', 'content': run.answer}
+                yield {'type': 'done', **result}
+                return
+
+            logger.debug("LLM으로 최종 답변 스트리밍 중")
+            chain = run.prompt | self.llm
+            parts: List[str] = []
+            async for chunk in chain.astream(run.llm_inputs):
+                if not chunk.content:
+                    continue
+                if not parts:
+                    run.mark('llm_first_token')
+                parts.append(chunk.content)
+                yield {'type': 'token', 'content': chunk.content}
+            run.lap('llm')
+            await asyncio.to_thread(self._store_answer, run, "".join(parts))
+            result = run.result()
+            self.inflight.end_async(future, result)
+            yield {'type': 'done', **result}
+        except BaseException as e:
+            self.inflight.end_async(future, error=e)
+            raise
+        finally:
+            await asyncio.to_thread(self._release_generation, run)
+
+    def _prepare_answer(self, run: "AnswerRun") -> bool:
+        """
+        LLM 호출 직전까지의 파이프라인(캐시 조회, 임베딩, FAQ/블로그 검색, 컨텍스트 구성)을 수행.
+        캐시나 FAQ로 답변이 확정되면 run.answer를 채우고 True, LLM 호출이 필요하면 run.prompt/llm_inputs를 채우고 False.
+        """
+        # 1. 질문을 해시하여 캐시된 답변이 있는지 확인
+        if self._lookup_exact_cache(run):
+            return True
+        # 다른 워커가 같은 질문을 생성 중이면 그 답변이 캐시에 저장될 때까지 대기
+        if self._wait_for_other_worker(run):
+            return True
+
+        # 2. 질문 임베딩
+        logger.debug("질문을 벡터로 변환하는 중")
+        run.query_embedding = self.embedder.embed_query(run.question)
+        run.lap('embed_query')
+
+        # 3. 의미가 같은 이전 질문의 캐시된 답변이 있는지 확인 (Semantic Cache)
+        if self._lookup_semantic_cache(run):
+            return True
+
+        # 업체 정보 조회 (프로세스 캐시)
+        business_context = self.get_business_context()
+        run.lap('business_info')
+        if self._apply_business_context(run, business_context):
+            return True
+
+        # 4~7. FAQ 검색, 블로그 검색, 컨텍스트 구성
+        if self._lookup_faq(run):
+            return True
+        self._retrieve_chunks(run)
+        self._build_llm_inputs(run)
+        return False
+
+    async def _prepare_answer_async(self, run: "AnswerRun") -> bool:
+        """ _prepare_answer의 비동기 버전. 질문 임베딩과 업체 정보 조회를 동시에 수행하고 DB 호출은 스레드에서 실행 """
+        if await asyncio.to_thread(self._lookup_exact_cache, run):
+            return True
+        if await self._wait_for_other_worker_async(run):
+            return True
+
+        logger.debug("질문 임베딩과 업체 정보 조회를 동시에 진행하는 중")
+        run.query_embedding, business_context = await asyncio.gather(
+            self.embedder.aembed_query(run.question),
+            asyncio.to_thread(self.get_business_context),
+        )
+        run.lap('embed_query_and_business_info')
+
+        if await asyncio.to_thread(self._lookup_semantic_cache, run):
+            return True
+        if self._apply_business_context(run, business_context):
+            return True
+        if self._lookup_faq(run):
+            return True
+        await asyncio.to_thread(self._retrieve_chunks, run)
+        self._build_llm_inputs(run)
+        return False
+
+    def _lookup_exact_cache(self, run: "AnswerRun") -> bool:
+        cached_answer = self.db_manager.get_cached_answer(run.question_hash)
+        run.lap('cache_lookup')
+        if cached_answer:
+            logger.info("[Cache Hit] 이전에 저장된 답변을 반환합니다.")
+            return run.finish(cached_answer, cache_type='exact')
+        return False
+
+    def _claim_generation(self, run: "AnswerRun") -> bool:
+        """ 워커 간 생성 잠금을 선점하면 True (잠금 비활성화 시에도 True) """
+        if self.answer_lock_seconds <= 0:
+            return True
+        run.claimed = self.db_manager.try_claim_answer_generation(run.question_hash, self.answer_lock_seconds)
+        return run.claimed
+
+    def _take_coalesced_answer(self, run: "AnswerRun") -> bool:
+        cached_answer = self.db_manager.get_cached_answer(run.question_hash)
+        if not cached_answer:
+            return False
+        run.lap('coalesced_wait')
+        run.coalesced = True
+        logger.info("[Coalesced] 다른 워커가 생성한 답변을 반환합니다.")
+        return run.finish(cached_answer, cache_type='exact')
+
+    def _wait_for_other_worker(self, run: "AnswerRun") -> bool:
+        """
+        다른 워커가 잠금을 쥐고 있으면 ANSWER_LOCK_SECONDS 동안 캐시를 폴링하여 그 답변을 사용(True).
+        잠금이 해제되거나 만료되어 이 요청이 선점하게 되면 직접 생성하도록 False.
+        """
+        if self._claim_generation(run):
+            return False
+        logger.info("같은 질문의 답변을 다른 워커가 생성 중입니다. 완료를 기다립니다.")
+        deadline = time.monotonic() + self.answer_lock_seconds
+        while time.monotonic() < deadline:
+            time.sleep(self.answer_lock_poll_seconds)
+            if self._take_coalesced_answer(run):
+                return True
+            if self._claim_generation(run):
+                break
+        run.lap('coalesced_wait')
+        return False
+
+    async def _wait_for_other_worker_async(self, run: "AnswerRun") -> bool:
+        """ _wait_for_other_worker의 비동기 버전 (대기 중 이벤트 루프를 막지 않음) """
+        if await asyncio.to_thread(self._claim_generation, run):
+            return False
+        logger.info("같은 질문의 답변을 다른 워커가 생성 중입니다. 완료를 기다립니다.")
+        deadline = time.monotonic() + self.answer_lock_seconds
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.answer_lock_poll_seconds)
+            if await asyncio.to_thread(self._take_coalesced_answer, run):
+                return True
+            if await asyncio.to_thread(self._claim_generation, run):
+                break
+        run.lap('coalesced_wait')
+        return False
+
+    def _release_generation(self, run: "AnswerRun"):
+        # 답변을 저장하면 잠금도 함께 해제되므로, 저장하지 못하고 끝난 경우에만 잠금 행을 지움
+        if not run.claimed or run.stored:
+            return
+        try:
+            self.db_manager.release_answer_generation(run.question_hash)
+        except Exception as e:
+            logger.warning("답변 생성 잠금 해제 실패 (잠금 만료 후 자동 해제됨): %s", e)
+
+    def _lookup_semantic_cache(self, run: "AnswerRun") -> bool:
+        match = self.semantic_cache.lookup(run.query_embedding)
+        cached_answer = None
+        if match:
+            matched_hash, matched_question, similarity = match
+            cached_answer = self.db_manager.get_cached_answer(matched_hash)
+        run.lap('semantic_cache_lookup')
+        if cached_answer:
+            logger.info("[Semantic Cache Hit] 유사 질문 '%s' (유사도 %.3f)의 답변을 반환합니다.", matched_question, similarity)
+            return run.finish(cached_answer, cache_type='semantic', matched_question=matched_question)
+        logger.info("[Cache Miss] 새로운 질문에 대한 답변을 생성합니다.")
+        return False
+
+    def _apply_business_context(self, run: "AnswerRun", business_context: Optional[BusinessContext]) -> bool:
+        if not business_context:
+            return run.finish("업체 정보가 설정되지 않았습니다. 'onboard' 명령을 먼저 실행해주세요.", source='no_business_info')
+        run.business_context = business_context
+        return False
+
+    def _lookup_faq(self, run: "AnswerRun") -> bool:
+        # 4. 직접 등록한 FAQ에서 관련 내용 검색 (FAQ 임베딩 인덱스)
+        logger.debug("FAQ에서 관련 정보 검색 중")
+        faq_matches = run.business_context.faq_index.search(run.query_embedding, k=3, min_similarity=self.faq_context_threshold)
+        run.lap('faq_search')
+        if faq_matches and faq_matches[0][1] >= self.faq_direct_answer_threshold:
+            faq, similarity = faq_matches[0]
+            logger.info("[FAQ Hit] 등록된 FAQ '%s' (유사도 %.3f)의 답변을 반환합니다.", faq['q'], similarity)
+            return run.finish(faq['a'], matched_question=faq['q'], source='faq')
+        run.faq_matches = faq_matches
+        return False
+
+    def _retrieve_chunks(self, run: "AnswerRun"):
+        # 5. 블로그 내용에서 유사 내용 검색 (벡터 + 키워드 하이브리드 검색)
+        logger.debug("블로그 내용에서 유사한 정보 검색 중")
+        similar_chunks = self.db_manager.search_chunks(run.question, run.query_embedding.tolist(), k=3)
+        run.lap('vector_search')
+        logger.debug("유사 블로그 청크: %s", similar_chunks)
+        run.chunk_ids = [chunk_id for chunk_id, text, score in similar_chunks]
+        run.blog_chunks = [(text, score) for chunk_id, text, score in similar_chunks]
+
+    # 예산이 부족할 때 덜어내는 순서는 자료마다 질문과의 코사인 유사도로 정함 (블로그 청크는 search_chunks의 점수,
+    # FAQ는 FAQ 질문, 이벤트 공지는 공지 본문의 임베딩 기준). 모두 같은 척도라 종류와 관계없이 비교된다
+    # (자료 종류, 제목, 구분자) - 프롬프트에 들어가는 순서
+    CONTEXT_SECTIONS = (
+        ('blog', "블로그에서 발췌한 정보", "\n\n---\n\n"),
+        ('faq', "자주 묻는 질문(FAQ)", "\n"),
+        ('marketing', "현재 진행중인 이벤트 및 공지", "\n"),
+    )
+
+    def _build_llm_inputs(self, run: "AnswerRun"):
+        # 6. LLM에 전달할 최종 컨텍스트 구성: 청크끼리 겹치는 부분(chunk_overlap)을 없애고,
+        #    토큰 예산을 넘으면 점수가 낮은 자료부터 잘라냄
+        items = remove_overlaps([ContextItem('blog', text, similarity) for text, similarity in run.blog_chunks])
+        items += [ContextItem('faq', f"Q: {faq['q']}\nA: {faq['a']}", similarity) for faq, similarity in run.faq_matches]
+        business_context = run.business_context
+        if business_context.marketing_info:
+            items.append(ContextItem('marketing', business_context.marketing_info,
+                                     business_context.marketing_similarity(run.query_embedding)))
+        fitted = self.context_budgeter.fit(items)
+        run.context_tokens = sum(item.tokens for item in fitted)
+        logger.debug("참고 자료 %d/%d개, %d 토큰 (예산 %d)", len(fitted), len(items), run.context_tokens, self.context_budgeter.max_tokens)
+
+        sections = []
+        for section, title, separator in self.CONTEXT_SECTIONS:
+            texts = [item.text for item in fitted if item.section == section]
+            if texts:
+                sections.append(f"### {title} ###\n" + separator.join(texts))
+
+        # 7. 업체명/성격이 미리 채워진 프롬프트에 컨텍스트와 질문을 전달
+        run.prompt = run.business_context.prompt
+        run.llm_inputs = {
+            "context": "\n\n".join(sections),
+            "question": run.question
+        }
+        run.lap('context_budget')
+
+    def _store_answer(self, run: "AnswerRun", final_answer: str):
+        run.answer = final_answer
         # 8. 생성된 답변을 캐시에 저장
-        self.db_manager.cache_answer(question_hash, final_answer)
+        # 답변 생성에 사용한 콘텐츠 버전을 함께 기록하여, 이후 크롤링/업체 정보 변경 시 자동으로 무효화되도록 함
+        self.db_manager.cache_answer(run.question_hash, final_answer, question=run.question, question_vector=run.query_embedding,
+                                     content_version=run.business_context.content_version)
+        run.stored = True
+        self.semantic_cache.add(run.question_hash, run.question, run.query_embedding)
+        run.lap('cache_write')
+
+
+class TenantChatbots:
+    """
+    테넌트(업체)별 ChatbotService를 최근 사용 순서(LRU)로 max_tenants개까지 보관.
+    각 서비스는 db_manager.for_tenant()로 해당 업체의 데이터만 다루며, DB 연결 풀·임베딩 모델·LLM 클라이언트는 모두 공유한다.
+    밀려난 테넌트는 업체 정보/의미 캐시 같은 메모리 상태만 버려지고 다음 요청에서 다시 만들어진다.
+    """
+
+    def __init__(self, db_manager: OracleManager, embedder: Embedder, max_tenants: Optional[int] = None):
+        self.db_manager = db_manager
+        self.embedder = embedder
+        self.max_tenants = max(1, max_tenants or int(os.getenv("TENANT_CACHE_SIZE", "256")))
+        self.llm: Optional[ChatOpenAI] = None
+        self._services: "OrderedDict[int, ChatbotService]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, tenant_id: int) -> Optional[ChatbotService]:
+        """ 테넌트의 ChatbotService. 업체 정보가 등록되지 않은(없는) 테넌트면 서비스를 만들거나 보관하지 않고 None """
+        with self._lock:
+            service = self._services.get(tenant_id)
+            if service is not None:
+                self._services.move_to_end(tenant_id)
+                return service
+        # 처음 보는 테넌트만 DB에서 존재 여부를 확인 (LOB 없이 버전만 조회, 잠금 밖에서 수행)
+        db_manager = self.db_manager.for_tenant(tenant_id)
+        if db_manager.get_business_info_version() is None:
+            return None
+        with self._lock:
+            service = self._services.get(tenant_id)
+            if service is None:
+                service = ChatbotService(db_manager, self.embedder, llm=self.llm)
+                self.llm = service.llm
+                self._services[tenant_id] = service
+                while len(self._services) > self.max_tenants:
+                    self._services.popitem(last=False)
+            self._services.move_to_end(tenant_id)
+            return service
 
-        return final_answer
+    def invalidate_business_context(self, tenant_id: int):
+        """ 업체 정보를 저장한 직후 호출. 보관 중인 서비스가 없으면 다음 요청에서 새로 읽으므로 아무것도 하지 않음 """
+        with self._lock:
+            service = self._services.get(tenant_id)
+        if service is not None:
+            service.invalidate_business_context()
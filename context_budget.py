@@ -0,0 +1,130 @@
+# context_budget.py
+import os
+from typing import List, Optional
+
+try:
+    import tiktoken  # 선택 의존성: 없으면 글자 수로 토큰 수를 어림잡음
+except ImportError:
+    tiktoken = None
+
+
+class TokenCounter:
+    """ LLM 모델의 토크나이저로 토큰 수를 세고 자르는 도우미 (tiktoken이 없으면 1글자 = 1토큰으로 보수적으로 계산) """
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self._encoding = None  # 처음 사용할 때 로드
+
+    def _get_encoding(self):
+        if self._encoding is None:
+            if tiktoken is None:
+                self._encoding = False
+            else:
+                try:
+                    self._encoding = tiktoken.encoding_for_model(self.model_name)
+                except KeyError:
+                    self._encoding = tiktoken.get_encoding("o200k_base")  # gpt-4o 계열 인코딩
+        return self._encoding
+
+    def count(self, text: str) -> int:
+        encoding = self._get_encoding()
+        if not encoding:
+            return len(text)
+        return len(encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """ 앞에서부터 max_tokens 토큰까지만 남김 """
+        encoding = self._get_encoding()
+        if not encoding:
+            return text[:max_tokens]
+        tokens = encoding.encode(text, disallowed_special=())
+        return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+
+
+class ContextItem:
+    """ 참고 자료 한 조각. score가 높을수록 예산이 부족할 때 나중까지 남는다 """
+
+    def __init__(self, section: str, text: str, score: float):
+        self.section = section
+        self.text = text
+        self.score = score
+        self.tokens = 0
+
+
+def remove_overlaps(items: List[ContextItem], min_overlap: int = 20, max_overlap: int = 300) -> List[ContextItem]:
+    """
+    검색된 청크들 사이의 중복을 제거 (순서 유지, item.text를 고쳐 씀).
+    다른 청크에 통째로 포함된 청크는 빼고(둘 중 높은 점수를 남는 청크가 가짐), 분할 시 chunk_overlap으로
+    이웃 청크와 겹친 앞/뒤 부분은 잘라낸다.
+    """
+    kept: List[ContextItem] = []
+    for item in items:
+        text = item.text.strip()
+        if not text:
+            continue
+        container = next((other for other in kept if text in other.text), None)
+        if container is not None:
+            container.score = max(container.score, item.score)
+            continue
+        for other in kept:
+            if other.text in text:
+                item.score = max(item.score, other.score)
+                other.text = ""  # 더 긴 청크가 같은 내용을 모두 포함
+                continue
+            n = _overlap_length(other.text, text, min_overlap, max_overlap)
+            if n:
+                text = text[n:].lstrip()  # other 뒤에 이어지는 청크: 겹친 앞부분 제거
+                continue
+            n = _overlap_length(text, other.text, min_overlap, max_overlap)
+            if n:
+                text = text[:-n].rstrip()  # other 앞에 오는 청크: 겹친 뒷부분 제거
+        kept = [other for other in kept if other.text]
+        if text:
+            item.text = text
+            kept.append(item)
+    return kept
+
+
+def _overlap_length(first: str, second: str, min_overlap: int, max_overlap: int) -> int:
+    """ first의 끝과 second의 시작이 겹치는 가장 긴 길이 (min_overlap 미만이면 0) """
+    for n in range(min(max_overlap, len(first), len(second)), min_overlap - 1, -1):
+        if first.endswith(second[:n]):
+            return n
+    return 0
+
+
+class ContextBudgeter:
+    """
+    LLM에 넘길 참고 자료(블로그 청크, FAQ, 이벤트 공지)를 토큰 예산 안으로 맞추는 단계.
+    점수가 높은 자료부터 담고, 예산을 넘기는 자료는 남은 만큼만 잘라 넣거나(min_partial_tokens 이상 남은 경우) 건너뛴다.
+    건너뛴 뒤에도 점수가 더 낮은 자료 중 남은 예산에 통째로 들어가는 것은 계속 담는다(greedy).
+    즉 예산이 부족하면 점수가 가장 낮은 자료부터 줄어든다. max_tokens <= 0이면 예산 제한 없음.
+    """
+
+    def __init__(self, counter: TokenCounter, max_tokens: Optional[int] = None, min_partial_tokens: int = 50):
+        self.counter = counter
+        self.max_tokens = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500")) if max_tokens is None else max_tokens
+        self.min_partial_tokens = min_partial_tokens
+
+    def fit(self, items: List[ContextItem]) -> List[ContextItem]:
+        """ 예산 안에 들어간 자료만 (잘린 경우 잘린 본문으로) 원래 순서대로 반환 """
+        for item in items:
+            item.tokens = self.counter.count(item.text)
+        if self.max_tokens <= 0:
+            return [item for item in items if item.text]
+        remaining = self.max_tokens
+        selected = set()
+        for item in sorted(items, key=lambda item: item.score, reverse=True):
+            if not item.text:
+                continue
+            if item.tokens <= remaining:
+                remaining -= item.tokens
+                selected.add(id(item))
+                continue
+            if remaining >= self.min_partial_tokens:
+                item.text = self.counter.truncate(item.text, remaining)
+                item.tokens = remaining
+                remaining = 0
+                selected.add(id(item))
+            # 남은 예산이 작으면 자르지 않고 건너뛰고, 더 작은 자료가 남은 예산에 들어가는지 계속 확인
+        return [item for item in items if id(item) in selected]
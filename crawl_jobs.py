@@ -0,0 +1,71 @@
+# crawl_jobs.py
+import time
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from database import OracleManager
+
+
+class CrawlJobTracker:
+    """
+    크롤링 작업(crawl_jobs)의 게시글별 진행 상태를 기록하는 체크포인트.
+    상태 변경은 모아서 flush_size개 또는 flush_seconds마다 한 번에 저장하며, 여러 스레드(피더, 본문 처리, DB 저장)에서 호출할 수 있다.
+    저장 전에 프로세스가 죽어 일부 상태가 유실되더라도 해당 게시글은 --resume 시 다시 확인될 뿐 결과는 같다.
+    """
+
+    def __init__(self, db: OracleManager, job_id: int, flush_size: int = 100, flush_seconds: float = 5.0):
+        self.db = db
+        self.job_id = job_id
+        self.flush_size = flush_size
+        self.flush_seconds = flush_seconds
+        self._updates: List[Tuple[str, str, Optional[str]]] = []
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record_listing(self, posts_meta: Iterable[Dict[str, Any]], page_size: int = 30) -> Iterator[Dict[str, Any]]:
+        """
+        게시글 목록을 그대로 흘려보내면서 page_size개씩 작업에 기록 ('listed').
+        목록이 정상적으로 끝나면(마지막 페이지 또는 max_posts 도달) listing_done을 기록하여 --resume 시 목록을 다시 받지 않도록 한다.
+        목록 조회가 오류(PostListError 등)로 끊기면 이미 받은 게시글까지만 기록하고 예외를 그대로 전달하며,
+        listing_done을 남기지 않으므로 --resume 시 목록을 처음부터 다시 받는다.
+        """
+        page: List[Dict[str, Any]] = []
+        try:
+            for post_meta in posts_meta:
+                page.append(post_meta)
+                if len(page) >= page_size:
+                    yield from self._record_page(page)
+                    page = []
+        except Exception:
+            yield from self._record_page(page)
+            raise
+        yield from self._record_page(page)
+        self.db.update_crawl_job(self.job_id, listing_done=True)
+
+    def _record_page(self, page: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        # 상태 갱신(UPDATE)이 기록보다 먼저 실행되지 않도록 기록한 뒤에 내보냄
+        self.db.add_crawl_job_posts(self.job_id, page)
+        yield from page
+
+    def mark(self, post_url: str, state: str, error: Optional[str] = None):
+        with self._lock:
+            self._updates.append((post_url, state, error))
+            due = len(self._updates) >= self.flush_size or time.monotonic() - self._flushed_at >= self.flush_seconds
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            updates, self._updates = self._updates, []
+            self._flushed_at = time.monotonic()
+        if not updates:
+            return
+        try:
+            self.db.set_crawl_job_post_states(self.job_id, updates)
+        except Exception as e:
+            # 상태 기록 실패는 크롤링 자체를 멈추지 않음 (다음 --resume에서 해당 게시글을 다시 확인)
+            print(f"  - ⚠️ 크롤링 작업 상태 저장 실패: {e}")
+
+    def finish(self, status: str, error: Optional[str] = None):
+        """ 남은 상태를 저장하고 작업을 completed/incomplete/failed/interrupted로 마무리 """
+        self.flush()
+        self.db.update_crawl_job(self.job_id, status=status, last_error=error)
@@ -0,0 +1,137 @@
+# crawl_scheduler.py
+import os
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from crawler import BlogCrawler, HostRateLimiter
+
+_WORKER_DONE = object()
+
+
+class CrawlScheduler:
+    """
+    여러 크롤러 워커(스레드마다 BlogCrawler 하나. HTTP 추출이 실패할 때만 브라우저를 띄움)가 공유 작업 큐에서 게시글을 가져가 본문을 수집하는 스케줄러.
+    - 요청 간격은 모든 워커가 공유하는 HostRateLimiter로 호스트 단위로 제한
+    - 결과 큐의 크기를 제한하여, 소비자(임베딩/DB 저장)가 밀리면 워커도 그만큼만 앞서 나가도록 함
+    crawler_factory는 crawl_post_content(url, validators=...)와 close()를 가진 객체를 만드는 함수로,
+    로컬 HTTP 테스트 서버용 크롤러 등으로 바꿔 끼울 수 있다.
+    """
+
+    def __init__(self, crawler_factory: Optional[Callable[[HostRateLimiter], Any]] = None, workers: Optional[int] = None,
+                 rate_limiter: Optional[HostRateLimiter] = None, queue_size: Optional[int] = None):
+        self.crawler_factory = crawler_factory or (lambda limiter: BlogCrawler(headless=True, rate_limiter=limiter))
+        self.workers = max(1, workers or int(os.getenv("CRAWL_WORKERS", "3")))
+        self.rate_limiter = rate_limiter or HostRateLimiter()
+        self.queue_size = queue_size or self.workers * 2
+
+    def run(self, posts_meta: Iterable[Dict[str, Any]]) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        게시글 메타데이터(url, title ...)를 받아 (메타데이터, crawl_post_content 결과)를 수집이 끝나는 순서대로 반환.
+        posts_meta는 제너레이터여도 되며(예: crawl_all_posts), 별도 스레드에서 읽어 목록 조회와 본문 수집이 겹쳐 진행된다.
+        수집에 실패한 게시글은 빈 딕셔너리와 함께 반환된다. 제너레이터를 중간에 닫으면 워커도 곧바로 정리된다.
+        """
+        work_queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=self.queue_size)
+        results: "queue.Queue[Any]" = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        feed_errors: List[Exception] = []
+        worker_errors: List[Exception] = []
+
+        feeder = threading.Thread(target=self._feed, args=(posts_meta, work_queue, stop, feed_errors), name="crawl-feeder", daemon=True)
+        threads = [
+            threading.Thread(target=self._worker, args=(work_queue, results, stop, worker_errors),
+                             name=f"crawl-worker-{i + 1}", daemon=True)
+            for i in range(self.workers)
+        ]
+        feeder.start()
+        for thread in threads:
+            thread.start()
+
+        finished = 0
+        try:
+            while finished < self.workers:
+                item = results.get()
+                if item is _WORKER_DONE:
+                    finished += 1
+                    continue
+                yield item
+            stop.set() # 모든 워커가 끝났는데 피더가 남아 있다면(워커 초기화 실패 등) 더 기다리지 않도록
+            feeder.join()
+            # 이미 수집한 게시글은 호출자가 저장할 수 있도록 예외 대신 경고만 출력
+            if feed_errors:
+                print(f"❌ 게시글 목록을 끝까지 읽지 못했습니다: {feed_errors[0]}")
+            unprocessed = [item for item in self._drain(work_queue) if item is not None]
+            if worker_errors and unprocessed:
+                print(f"❌ 크롤러 워커를 시작하지 못해 게시글 {len(unprocessed)}개 이상을 수집하지 못했습니다: {worker_errors[0]}")
+        finally:
+            stop.set()
+            # 큐가 가득 차 대기 중인 피더/워커가 종료 신호를 확인할 수 있도록 비워줌
+            while feeder.is_alive() or any(thread.is_alive() for thread in threads):
+                for pending in (work_queue, results):
+                    try:
+                        pending.get(timeout=0.05)
+                    except queue.Empty:
+                        pass
+
+    @staticmethod
+    def _drain(target: "queue.Queue") -> List[Any]:
+        items = []
+        while True:
+            try:
+                items.append(target.get_nowait())
+            except queue.Empty:
+                return items
+
+    def _feed(self, posts_meta: Iterable[Dict[str, Any]], work_queue: "queue.Queue", stop: threading.Event, errors: List[Exception]):
+        try:
+            for post_meta in posts_meta:
+                if not self._put_unless_stopped(work_queue, post_meta, stop):
+                    break
+        except Exception as e:
+            print(f"❌ 게시글 목록을 읽는 중 오류 발생: {e}")
+            errors.append(e)
+        finally:
+            if hasattr(posts_meta, 'close'):
+                posts_meta.close()
+            # 워커 종료 신호 (중단된 경우 워커는 stop을 보고 스스로 종료)
+            for _ in range(self.workers):
+                self._put_unless_stopped(work_queue, None, stop)
+
+    @staticmethod
+    def _put_unless_stopped(target: "queue.Queue", item: Any, stop: threading.Event) -> bool:
+        """ 큐에 자리가 날 때까지 기다리되 중단 신호가 오면 포기 (False) """
+        while not stop.is_set():
+            try:
+                target.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _worker(self, work_queue: "queue.Queue", results: "queue.Queue", stop: threading.Event, errors: List[Exception]):
+        try:
+            crawler = self.crawler_factory(self.rate_limiter)
+        except Exception as e:
+            print(f"❌ [{threading.current_thread().name}] 크롤러 초기화 실패: {e}")
+            errors.append(e)
+            results.put(_WORKER_DONE)
+            return
+
+        try:
+            while not stop.is_set():
+                try:
+                    post_meta = work_queue.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if post_meta is None:
+                    break
+                try:
+                    content_data = crawler.crawl_post_content(post_meta['url'], validators=post_meta.get('validators'))
+                except Exception as e:
+                    print(f"⚠ [{threading.current_thread().name}] 게시글 수집 실패: {post_meta['url']}, {e}")
+                    content_data = {}
+                results.put((post_meta, content_data))
+        finally:
+            try:
+                crawler.close()
+            finally:
+                results.put(_WORKER_DONE)
@@ -1,9 +1,16 @@
 # crawler.py
 import re
+import os
+import math
 import time
 import json
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
 import requests # Added for direct API calls
-from typing import Dict, Any, List, Optional
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, Iterator, List, Optional
 from tqdm import tqdm # Add this import
 from dotenv import load_dotenv
 # Import necessary libraries from Selenium for web scraping
@@ -15,9 +22,43 @@ from selenium.webdriver.support import expected_conditions as EC
 
 # Import BeautifulSoup for parsing HTML content
 from bs4 import BeautifulSoup
+import metrics
 
 load_dotenv()
 
+class HostRateLimiter:
+    """
+    Keeps requests to the same host at least `min_interval` seconds apart.
+    A single instance can be shared by several crawler workers (threads): each call
+    reserves the next free slot for its host, so workers are spread out instead of
+    every request paying a fixed sleep.
+    """
+    def __init__(self, min_interval: Optional[float] = None):
+        if min_interval is None:
+            min_interval = float(os.getenv("CRAWL_MIN_INTERVAL", "0.5"))
+        self.min_interval = min_interval
+        self._next_allowed: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url: str):
+        """
+        Blocks until a request to the host of `url` is allowed.
+        """
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_allowed.get(host, 0.0))
+            self._next_allowed[host] = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+            metrics.observe('crawler', 'rate_limit_wait', slot - now)
+
+class PostListError(Exception):
+    """
+    Raised by crawl_all_posts when a page of the post list could not be fetched or parsed,
+    so a cut-short listing is not mistaken for the end of the blog.
+    """
+
 class BlogCrawler:
     """
     A class to crawl all posts from a Naver blog.
@@ -32,14 +73,43 @@ class BlogCrawler:
     WRITER_SELECTORS = ".nick_name, .blog_author .author_name, .author, .writer, .nickname, .blog_name, .blog_name, .nickname"
     DATE_SELECTORS = ".se_time, .blog_header_info .date, ._postContents .post_info .date, .post_date, .date, .write_date, .se_publishDate, .date"
     HASHTAG_SELECTORS = "div.post_tag a, .se_component_hashtag a"
+    POSTS_PER_PAGE = 30 # We fetch 30 items per page for efficiency.
+    LIST_MAX_RETRIES = 3
+    LIST_RETRY_BACKOFF = 0.5 # seconds, doubled on every retry
+    TITLE_SELECTORS = ['.se-title-text', '.title_text', '.se_title > .se_textView > .se_textarea', '#title_1 > span']
+    USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/98.0.4758.102 Safari/537.36"
 
 
-    def __init__(self, headless: bool = False):
+    def __init__(self, headless: bool = False, rate_limiter: Optional[HostRateLimiter] = None, http_first: bool = True):
         """
-        Initializes the Selenium WebDriver.
+        Prepares the crawler. The Selenium WebDriver is started lazily on the first page load,
+        so listing posts through the API (and fetching posts over plain HTTP) does not launch a browser.
 
         Args:
             headless (bool): If True, runs the browser in headless mode (without a GUI).
+            rate_limiter (HostRateLimiter): Shared per-host rate limiter. A private one is created if omitted.
+            http_first (bool): If True, fetches the post's PostView HTML directly and only falls back to Selenium when that fails.
+        """
+        self.headless = headless
+        self.rate_limiter = rate_limiter or HostRateLimiter()
+        self.http_first = http_first
+        self._driver = None
+        # Keep-alive connection pool shared by the post list API and PostView requests.
+        self.session = requests.Session()
+        self.session.headers.update({"User-Agent": self.USER_AGENT})
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    @property
+    def driver(self):
+        if self._driver is None:
+            self._driver = self._create_driver(self.headless)
+        return self._driver
+
+    def _create_driver(self, headless: bool):
+        """
+        Initializes the Selenium WebDriver.
         """
         # Set up options for the Chrome WebDriver.
         options = webdriver.ChromeOptions()
@@ -48,12 +118,13 @@ class BlogCrawler:
         options.add_argument("--disable-gpu")
         options.add_argument("--no-sandbox")
         options.add_argument("--disable-dev-shm-usage")
-        options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/98.0.4758.102 Safari/537.36")
+        options.add_argument(f"user-agent={self.USER_AGENT}")
         
         try:
             # Initialize the Chrome WebDriver for scraping post details.
-            self.driver = webdriver.Chrome(options=options)
+            driver = webdriver.Chrome(options=options)
             print("✅ WebDriver has been successfully initialized.")
+            return driver
         except Exception as e:
             # Handle exceptions during WebDriver setup.
             print(f"❌ WebDriver setup failed: {e}")
@@ -108,88 +179,249 @@ class BlogCrawler:
             # 어떤 유효한 URL도 찾지 못함
             return None
 
-    def crawl_all_posts(self, blog_url: str, max_posts: Optional[int] = None) -> List[Dict[str, Any]]:
+    @metrics.timed('crawler', 'list_page')
+    def _fetch_post_list_page(self, blog_id: str, page: int) -> Dict[str, Any]:
         """
-        [Optimized] Retrieves the URL and title of all posts using Naver's internal API.
-        This method is now much faster as it no longer uses Selenium for listing posts.
+        Fetches one PostTitleListAsync.naver page over the keep-alive session.
+        Connection errors, 429 and 5xx responses are retried with exponential backoff.
+        Returns the parsed JSON, and raises PostListError if the page could not be fetched or parsed.
+        """
+        api_url = f"{self.BASE_URL_PC}/PostTitleListAsync.naver?blogId={blog_id}&currentPage={page}&countPerPage={self.POSTS_PER_PAGE}"
+        for attempt in range(self.LIST_MAX_RETRIES + 1):
+            try:
+                response = self.session.get(api_url, timeout=10)
+                if response.status_code == 429 or response.status_code >= 500:
+                    raise requests.HTTPError(f"{response.status_code} Server Error", response=response)
+                response.raise_for_status()
+                # The API returns JSON-like text with single quotes, which is invalid JSON.
+                # We replace them with double quotes to parse correctly.
+                return json.loads(response.text.replace("'", '"'))
+            except json.JSONDecodeError as e:
+                raise PostListError(f"Failed to parse API response on page {page}: {e}") from e
+            except requests.RequestException as e:
+                retryable = e.response is None or e.response.status_code == 429 or e.response.status_code >= 500
+                if not retryable or attempt == self.LIST_MAX_RETRIES:
+                    raise PostListError(f"API request failed on page {page}: {e}") from e
+                delay = self.LIST_RETRY_BACKOFF * (2 ** attempt)
+                print(f"  - ⚠️ API request failed on page {page} ({e}), retrying in {delay:.1f}s...")
+                time.sleep(delay)
+
+    def _posts_meta_from_page(self, blog_id: str, data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        posts_meta = []
+        for post in data.get("postList") or []:
+            # Ensure 'post' is a dictionary before trying to access its keys
+            if not isinstance(post, dict):
+                print(f"  - ⚠️ Skipped non-dictionary item in post list: {post}")
+                continue
+
+            log_no = post.get("logNo")
+            if log_no:
+                # Construct the full, permanent post URL.
+                posts_meta.append({
+                    'url': f"{self.BASE_URL_PC}/{blog_id}/{log_no}",
+                    'title': str(post.get("title", "")).strip(), # Ensure title is string before strip
+                    # Listing metadata used to skip unchanged posts before downloading them.
+                    'log_no': str(log_no),
+                    'add_date': post.get("addDate"),
+                    'modify_date': post.get("modifyDate"),
+                })
+        return posts_meta
+
+    def crawl_all_posts(self, blog_url: str, max_posts: Optional[int] = None,
+                        page_workers: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        [Optimized] Yields the URL, title and listing metadata of all posts using Naver's internal API.
+        The first page reports the total post count; the remaining pages are then fetched concurrently
+        (at most `page_workers` in flight) and yielded in page order, so content crawling can start
+        before the listing has finished.
 
         Args:
             blog_url (str): The URL of the Naver blog.
+            max_posts (int): Maximum number of posts to yield.
+            page_workers (int): Number of pages fetched concurrently (default: CRAWL_LIST_WORKERS or 4).
 
-        Returns:
-            List[Dict[str, Any]]: A list of dictionaries, each containing the 'url' and 'title' of a post.
+        Yields:
+            Dict[str, Any]: 'url', 'title', 'log_no', 'add_date' and 'modify_date' of a post.
+
+        Raises:
+            PostListError: If the blog ID cannot be extracted or a page fails after retries. The generator
+                stops at the failed page (posts from earlier pages have already been yielded), so callers
+                can tell a cut-short listing from the end of the blog.
         """
         blog_id = self._extract_blog_id(blog_url)
         if not blog_id:
-            return []
+            raise PostListError(f"Could not extract a valid blog ID from the URL: {blog_url}")
 
         print(f"\n▶️ Collecting all post listings via API... (ID: {blog_id})")
-        all_posts_meta = []
-        page = 1
-
-        while True:
-            # The API endpoint discovered from the Go code. We fetch 30 items per page for efficiency.
-            api_url = f"https://blog.naver.com/PostTitleListAsync.naver?blogId={blog_id}&currentPage={page}&countPerPage=30"
-            
-            try:
-                # Make a direct HTTP request.
-                response = requests.get(api_url, timeout=10)
-                response.raise_for_status()
-
-                # The API returns JSON-like text with single quotes, which is invalid JSON.
-                # We replace them with double quotes to parse correctly.
-                response_text = response.text.replace("'", '"')
-                data = json.loads(response_text)
+        first_page = self._fetch_post_list_page(blog_id, 1)
+        if not first_page.get("postList"):
+            print("  - No posts found on the first page. Finishing collection.")
+            return
+
+        total_count = int(first_page.get("totalCount") or 0)
+        page_workers = max(1, page_workers or int(os.getenv("CRAWL_LIST_WORKERS", "4")))
+        if total_count > 0:
+            total_pages = math.ceil(total_count / self.POSTS_PER_PAGE)
+            window = page_workers * 2
+            print(f"  - {total_count} posts in total.")
+        else:
+            # Without a total count, fall back to fetching one page at a time until an empty page.
+            total_pages = math.inf
+            window = 1
+        if max_posts is not None:
+            total_pages = min(total_pages, math.ceil(max_posts / self.POSTS_PER_PAGE))
 
-                post_list = data.get("postList")
-                if not post_list:
-                    # If postList is empty, we've reached the last page.
+        executor = ThreadPoolExecutor(max_workers=page_workers, thread_name_prefix="post-list")
+        in_flight = deque()
+        next_page = 2
+        collected = 0
+        try:
+            page, data = 1, first_page
+            while True:
+                posts_meta = self._posts_meta_from_page(blog_id, data)
+                if not posts_meta:
                     print(f"  - No more posts found on page {page}. Finishing collection.")
                     break
-                
-                for post in post_list:
-                    # Ensure 'post' is a dictionary before trying to access its keys
-                    if not isinstance(post, dict):
-                        print(f"  - ⚠️ Skipped non-dictionary item in post list: {post}")
-                        continue
-
-                    log_no = post.get("logNo")
-                    if log_no:
-                        # Construct the full, permanent post URL.
-                        post_url = f"{self.BASE_URL_PC}/{blog_id}/{log_no}"
-                        all_posts_meta.append({
-                            'url': post_url,
-                            'title': str(post.get("title", "")).strip() # Ensure title is string before strip
-                        })
-                        
-                        # Check if max_posts limit is reached
-                        if max_posts is not None and len(all_posts_meta) >= max_posts:
-                            print(f"  - Reached maximum post limit of {max_posts}. Stopping collection.")
-                            break # Break from the for loop
-
-                print(f"  - Page {page}: collected {len(post_list)} post metadata items.")
-                page += 1
-                time.sleep(0.5) # Be respectful to the server
-
-                # If max_posts limit was reached in the inner loop, break from the outer loop too
-                if max_posts is not None and len(all_posts_meta) >= max_posts:
+                print(f"  - Page {page}: collected {len(posts_meta)} post metadata items.")
+                for post_meta in posts_meta:
+                    yield post_meta
+                    collected += 1
+                    # Check if max_posts limit is reached
+                    if max_posts is not None and collected >= max_posts:
+                        print(f"  - Reached maximum post limit of {max_posts}. Stopping collection.")
+                        return
+
+                # Keep up to `window` pages requested ahead of the page being consumed.
+                while next_page <= total_pages and len(in_flight) < window:
+                    in_flight.append((next_page, executor.submit(self._fetch_post_list_page, blog_id, next_page)))
+                    next_page += 1
+                if not in_flight:
                     break
+                page, future = in_flight.popleft()
+                data = future.result() # PostListError from the page fetch propagates to the caller
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            print(f"✅ Collected metadata for a total of {collected} posts via API.")
 
-            except requests.RequestException as e:
-                print(f"  - ❌ API request failed on page {page}: {e}")
-                break
-            except json.JSONDecodeError:
-                print(f"  - ❌ Failed to parse API response on page {page}.")
+    def _post_view_url(self, post_url: str) -> str:
+        """
+        Returns the URL of the PostView page that the blog loads into its 'mainFrame' iframe.
+        URLs that are not in the blog.naver.com/{blogId}/{logNo} form (e.g. a local fixture server) are used as-is.
+        """
+        match = re.search(r'blog\.naver\.com/([a-zA-Z0-9_-]+)/(\d+)', post_url)
+        if not match:
+            return post_url
+        blog_id, log_no = match.groups()
+        return f"{self.BASE_URL_PC}/PostView.naver?blogId={blog_id}&logNo={log_no}&redirect=Dlog&widgetTypeCall=true"
+
+    @classmethod
+    def parse_post_html(cls, html: str) -> Optional[Dict[str, Any]]:
+        """
+        Parses PostView HTML into the same structure crawl_post_content returns.
+        Returns None if no post body (.se-main-container or #postViewArea) is found.
+        """
+        try:
+            soup = BeautifulSoup(html, 'lxml')
+        except Exception: # lxml이 없으면 내장 파서 사용
+            soup = BeautifulSoup(html, 'html.parser')
+
+        title = "제목 없음"
+        for selector in cls.TITLE_SELECTORS:
+            title_element = soup.select_one(selector)
+            if title_element and title_element.get_text().strip():
+                title = title_element.get_text().strip()
                 break
-        
-        print(f"✅ Collected metadata for a total of {len(all_posts_meta)} posts via API.")
-        
-        # Trim the list to max_posts if it exceeded the limit in the last page
-        if max_posts is not None:
-            return all_posts_meta[:max_posts]
-        return all_posts_meta
 
-    def crawl_post_content(self, post_url: str) -> Dict[str, Any]:
+        markdown_output = []
+        container = soup.select_one('.se-main-container')
+        if container is not None:
+            # 스마트에디터: 컴포넌트(블록) 순서대로 텍스트 문단만 추출 (이미지 등은 건너뜀)
+            for component in container.select('.se-component'):
+                component_text = [p.get_text().strip() for p in component.select('.se-text-paragraph')]
+                component_text = [text for text in component_text if text]
+                if component_text:
+                    markdown_output.append("\n".join(component_text))
+        else:
+            container = soup.select_one('#postViewArea')
+            if container is None:
+                return None
+            # 구버전 에디터: 직계 자식 요소의 텍스트를 블록으로 취급
+            for child in container.find_all(recursive=False):
+                text = child.get_text("\n").strip()
+                if text:
+                    markdown_output.append(text)
+
+        final_content = "\n\n".join(filter(None, markdown_output))
+        if not final_content.strip():
+            final_content = "[컨텐츠 추출 실패]"
+
+        writer_element = soup.select_one(cls.WRITER_SELECTORS)
+        date_element = soup.select_one(cls.DATE_SELECTORS)
+        return {
+            'title': title,
+            'content': final_content,
+            'hashtags': [tag.text.strip().lstrip('#') for tag in soup.select(cls.HASHTAG_SELECTORS)],
+            'writer': writer_element.text.strip() if writer_element else "Unknown",
+            'write_date': date_element.text.strip() if date_element else "Unknown",
+        }
+
+    @metrics.timed('crawler', 'http_fetch')
+    def fetch_post_content(self, post_url: str, validators: Optional[Dict[str, str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Fast path: downloads the PostView HTML with the pooled session and parses it without a browser.
+        Returns None when the request fails or the page has no recognizable post body.
+
+        Args:
+            validators (dict): Optional {'etag', 'last_modified'} from a previous crawl. They are sent as
+                If-None-Match / If-Modified-Since, and a 304 response returns {'not_modified': True}.
+        """
+        view_url = self._post_view_url(post_url)
+        headers = {"Referer": post_url}
+        if validators:
+            if validators.get('etag'):
+                headers["If-None-Match"] = validators['etag']
+            if validators.get('last_modified'):
+                headers["If-Modified-Since"] = validators['last_modified']
+        try:
+            self.rate_limiter.wait(view_url)
+            response = self.session.get(view_url, headers=headers, timeout=10)
+            if response.status_code == 304:
+                return {'not_modified': True}
+            response.raise_for_status()
+        except requests.RequestException as e:
+            print(f"⚠ PostView 요청 실패: {post_url}, {e}")
+            return None
+        content_data = self.parse_post_html(response.text)
+        if content_data is not None:
+            # Stored with the post (not part of the content hash) for conditional requests on the next crawl.
+            content_data['http_validators'] = {
+                'etag': response.headers.get("ETag"),
+                'last_modified': response.headers.get("Last-Modified"),
+            }
+        return content_data
+
+    def crawl_post_content(self, post_url: str, validators: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Extracts detailed information from a single post URL.
+        Tries the HTTP fast path first and falls back to Selenium when it fails.
+
+        Args:
+            post_url (str): The URL of the blog post.
+            validators (dict): Optional HTTP validators from the previous crawl (see fetch_post_content).
+
+        Returns:
+            Dict[str, Any]: A dictionary containing the post's content, hashtags, writer, and date,
+            or {'not_modified': True} if the server confirmed the post is unchanged.
+        """
+        if self.http_first:
+            content_data = self.fetch_post_content(post_url, validators)
+            if content_data and (content_data.get('not_modified') or content_data['content'] != "[컨텐츠 추출 실패]"):
+                return content_data
+            print(f"  - HTTP 추출 실패, Selenium으로 다시 시도합니다: {post_url}")
+        return self.crawl_post_content_with_browser(post_url)
+
+    @metrics.timed('crawler', 'browser_fetch')
+    def crawl_post_content_with_browser(self, post_url: str) -> Dict[str, Any]:
         """
         [UPDATED] Extracts detailed information from a single post URL.
         Uses the new text extraction logic from the markdown crawler.
@@ -203,11 +435,10 @@ class BlogCrawler:
         markdown_output = []  # 마크다운 블록들을 순서대로 저장할 리스트
         
         try:
+            # 고정 대기 대신 호스트별 요청 간격만 지키고, 로딩 완료는 아래의 WebDriverWait로 확인
+            self.rate_limiter.wait(post_url)
             print(f"게시물 접속 시도: {post_url}")
             self.driver.get(post_url)
-            # 페이지 로딩 및 JS 실행 충분히 대기
-            print("페이지 로딩 대기 중...")
-            time.sleep(5)
 
             # --- iframe으로 전환 ---
             try:
@@ -216,15 +447,11 @@ class BlogCrawler:
                     EC.frame_to_be_available_and_switch_to_it((By.ID, "mainFrame"))
                 )
                 print("iframe으로 성공적으로 전환했습니다.")
-                time.sleep(1)
 
                 # --- 제목 찾기 ---
                 title = "제목 없음"
                 try:
-                    title_selectors = [
-                        '.se-title-text', '.title_text', '.se_title > .se_textView > .se_textarea', '#title_1 > span'
-                    ]
-                    for selector in title_selectors:
+                    for selector in self.TITLE_SELECTORS:
                         try:
                             title_element = WebDriverWait(self.driver, 5).until(
                                 EC.visibility_of_element_located((By.CSS_SELECTOR, selector))
@@ -364,9 +591,6 @@ class BlogCrawler:
         if not final_content.strip():
             print("⚠ 유효한 컨텐츠를 추출하지 못했습니다.")
             final_content = "[컨텐츠 추출 실패]"
-        
-        # 서버 부하를 줄이기 위해 요청 사이에 지연 추가
-        time.sleep(1) 
 
         return {
             'title': title,
@@ -380,8 +604,10 @@ class BlogCrawler:
         """
         Closes the WebDriver and releases all associated resources.
         """
-        if self.driver:
-            self.driver.quit()
+        self.session.close()
+        if self._driver:
+            self._driver.quit()
+            self._driver = None
             print("✅ WebDriver has been closed.")
 
 
@@ -393,7 +619,7 @@ if __name__ == "__main__":
 
     try:
         # Step 1: Crawl all post URLs and titles using the fast API method.
-        all_posts = crawler.crawl_all_posts(BLOG_URL, max_posts=MAX_POSTS_TO_CRAWL)
+        all_posts = list(crawler.crawl_all_posts(BLOG_URL, max_posts=MAX_POSTS_TO_CRAWL))
 
         if all_posts:
             # Step 2: Crawl the content of the first N posts as a sample.
@@ -1,15 +1,80 @@
 import os
+import copy
 import json
+import time
+import array
+import hashlib
+import logging
+import threading
 import oracledb
 import numpy as np
 oracledb.init_oracle_client()
-print(f"DEBUG: oracledb module loaded from: {oracledb.__file__}")
-print(f"DEBUG: oracledb version: {oracledb.__version__}")
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Any, Iterator, Tuple, Optional
+import vector_index
+import lexical_index
+import metrics
+
+logger = logging.getLogger(__name__)
+logger.debug("oracledb module loaded from: %s (version %s)", oracledb.__file__, oracledb.__version__)
+
+# 청크 벡터 저장 형식: json(기존 NCLOB 문자열) | blob(float32 바이트 BLOB) | vector(Oracle 23ai VECTOR 컬럼)
+VECTOR_STORAGE_MODES = ("json", "blob", "vector")
+
+# 테넌트(업체) id = business_info.id. 테넌트 도입 전의 단일 업체 데이터는 모두 1번 테넌트로 취급
+DEFAULT_TENANT_ID = 1
+
+
+def chunk_hash(text: str) -> str:
+    """ 청크 본문의 sha256 해시 (chunks.chunk_hash) """
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def advance_chunks_signature(signature: str, inserted_ids: List[int], deleted_count: int) -> str:
+    """
+    get_chunks_signature 형식(행 수:최대 id)의 서명에 방금 삽입/삭제한 청크를 반영한 서명을 DB 조회 없이 계산.
+    최대 id였던 청크만 지운 경우처럼 실제와 다를 수 있으나, 그때는 다음 최신 여부 확인에서 서명이 맞지 않아
+    인덱스를 재구축하므로 검색 결과가 틀리지는 않는다.
+    """
+    count, max_id = (int(part) for part in signature.split(":"))
+    return f"{count + len(inserted_ids) - deleted_count}:{max([max_id, *inserted_ids])}"
+
+def encode_vector(embedding, storage: str):
+    """ 임베딩을 저장 형식에 맞는 바인드 값으로 변환 """
+    vector = np.asarray(embedding, dtype=np.float32)
+    if storage == "json":
+        return json.dumps(vector.tolist())
+    if storage == "vector":
+        return array.array('f', vector.tobytes())
+    return vector.tobytes()
+
+
+def decode_vector(value) -> Optional[np.ndarray]:
+    """ BLOB 바이트 / VECTOR(array.array) / JSON 문자열을 float32 배열로 변환. 바이너리는 np.frombuffer로 복사 없이 해석 """
+    if value is None:
+        return None
+    if isinstance(value, oracledb.LOB):
+        value = value.read()
+    if isinstance(value, str):
+        return np.asarray(json.loads(value), dtype=np.float32)
+    return np.frombuffer(value, dtype=np.float32)
+
+
+def _fetch_lobs_as_values(cursor, metadata):
+    # LOB 로케이터 대신 값 자체를 받아와 행마다 발생하는 LOB read 왕복을 없앰
+    if metadata.type_code is oracledb.DB_TYPE_BLOB:
+        return cursor.var(oracledb.DB_TYPE_LONG_RAW, arraysize=cursor.arraysize)
+    if metadata.type_code in (oracledb.DB_TYPE_CLOB, oracledb.DB_TYPE_NCLOB):
+        return cursor.var(oracledb.DB_TYPE_LONG_NVARCHAR, arraysize=cursor.arraysize)
+
 
 class OracleManager:
-    def __init__(self):
+    """
+    Oracle 연결 풀과 테이블 접근을 담당. 모든 조회/저장은 self.tenant_id 테넌트의 데이터로 한정된다.
+    한 프로세스에서 여러 업체를 다룰 때는 for_tenant(tenant_id)로 연결 풀을 공유하는 테넌트별 인스턴스를 얻는다.
+    """
+    def __init__(self, tenant_id: Optional[int] = None):
         try:
+            self.tenant_id = int(tenant_id if tenant_id is not None else os.getenv("TENANT_ID", DEFAULT_TENANT_ID))
             self.user = os.getenv("ORACLE_USER")
             self.password = os.getenv("ORACLE_PASSWORD")
             self.dsn = os.getenv("ORACLE_ATP_DSN")
@@ -22,21 +87,81 @@ class OracleManager:
             self.pool = oracledb.create_pool(
                 user=self.user, password=self.password, dsn=self.dsn,
                 config_dir=self.wallet_path, wallet_location=self.wallet_path,
-                wallet_password=self.wallet_password, min=2, max=5, increment=1
+                wallet_password=self.wallet_password,
+                # API 워커가 동시에 처리하는 요청 수에 맞춰 조정 (비동기 경로는 DB 호출마다 스레드에서 연결을 사용)
+                min=int(os.getenv("ORACLE_POOL_MIN", "2")), max=int(os.getenv("ORACLE_POOL_MAX", "5")), increment=1
             )
-            print("✅ Oracle Cloud ATP 연결 풀 생성 완료.")
+            logger.info("Oracle Cloud ATP 연결 풀 생성 완료.")
 
             self.embedding_dim = 1536 # 임베딩 벡터 차원 (OpenAI text-embedding-ada-002 기준)
+            # 답변 캐시 유효 기간(초). 0 이하이면 기간 만료 없이 콘텐츠 버전으로만 무효화
+            self.answer_cache_ttl_seconds = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", "604800"))
+
+            self.vector_storage = os.getenv("VECTOR_STORAGE", "json").lower()
+            if self.vector_storage not in VECTOR_STORAGE_MODES:
+                raise ValueError(f"VECTOR_STORAGE는 {', '.join(VECTOR_STORAGE_MODES)} 중 하나여야 합니다.")
+
+            # 벡터 검색 설정: numpy(정규화 행렬 완전 탐색) | faiss(HNSW 근사 탐색)
+            #               | oracle(DB 내 VECTOR_DISTANCE 검색) | scan(기존 전체 테이블 스캔)
+            self.vector_search_backend = os.getenv("VECTOR_SEARCH_BACKEND", "numpy").lower()
+            # oracle 백엔드가 실패하거나 쓸 수 없을 때 사용할 클라이언트 측 인덱스 백엔드
+            self.vector_index_backend = (
+                self.vector_search_backend if self.vector_search_backend in vector_index.VECTOR_INDEX_BACKENDS
+                else os.getenv("VECTOR_SEARCH_FALLBACK", "numpy").lower()
+            )
+            if self.vector_search_backend == "oracle" and self.vector_storage != "vector":
+                logger.warning("oracle 벡터 검색은 VECTOR_STORAGE=vector에서만 동작합니다. '%s' 인덱스로 대체합니다.", self.vector_index_backend)
+                self.vector_search_backend = self.vector_index_backend
+            self.oracle_vector_index_type = os.getenv("ORACLE_VECTOR_INDEX_TYPE", "ivf").lower() # ivf | hnsw
+            self.oracle_vector_target_accuracy = int(os.getenv("ORACLE_VECTOR_TARGET_ACCURACY", "95"))
+            self.vector_index_dir = os.getenv("VECTOR_INDEX_DIR", vector_index.DEFAULT_INDEX_DIR)
+            self.vector_index_refresh_seconds = float(os.getenv("VECTOR_INDEX_REFRESH_SECONDS", "30"))
+            self.vector_index_key = str(self.tenant_id) # 테넌트마다 별도 인덱스 (파일명과 프로세스 캐시의 키)
+            self._index_checked_at = 0.0
+            self._index_lock = threading.Lock()
+            # 하이브리드 검색: 벡터 검색과 키워드(BM25) 검색의 상위 후보를 각각 이 개수만큼 뽑아 RRF로 합침 (0이면 벡터 검색만)
+            self.hybrid_search_candidates = int(os.getenv("HYBRID_SEARCH_CANDIDATES", "20"))
+            self.rrf_k = int(os.getenv("RRF_K", "60"))
+            self._lexical_checked_at = 0.0
+            self._lexical_lock = threading.Lock()
+            self._owns_pool = True
+            self._tenant_views: Dict[int, "OracleManager"] = {self.tenant_id: self}
+            self._tenant_views_lock = threading.Lock()
 
         except oracledb.Error as e:
-            print(f"❌ Oracle DB 연결 풀 생성 실패: {e}")
+            logger.error("Oracle DB 연결 풀 생성 실패: %s", e)
             raise
 
+    def for_tenant(self, tenant_id: int) -> "OracleManager":
+        """
+        연결 풀과 설정을 공유하면서 tenant_id 테넌트의 데이터만 다루는 인스턴스를 반환 (테넌트마다 하나씩 재사용).
+        벡터 인덱스는 처음 검색할 때 불러오며, 메모리 상한(VECTOR_INDEX_CACHE_MAX_MB)을 넘으면 오래 쓰지 않은 테넌트부터 내린다.
+        """
+        tenant_id = int(tenant_id)
+        with self._tenant_views_lock:
+            view = self._tenant_views.get(tenant_id)
+            if view is None:
+                view = copy.copy(self)
+                view.tenant_id = tenant_id
+                view.vector_index_key = str(tenant_id)
+                view._index_checked_at = 0.0
+                view._index_lock = threading.Lock()
+                view._lexical_checked_at = 0.0
+                view._lexical_lock = threading.Lock()
+                view._owns_pool = False
+                self._tenant_views[tenant_id] = view
+            return view
+
+    def _acquire(self):
+        """ 연결 풀에서 연결을 가져옴. 풀의 연결이 모두 사용 중일 때 기다린 시간은 db.pool_acquire 지표로 기록 """
+        with metrics.span('db', 'pool_acquire'):
+            return self.pool.acquire()
+
     def _get_connection(self):
-        return self.pool.acquire()
+        return self._acquire()
 
     def _execute_sql(self, sql: str, params: dict = None, commit: bool = False):
-        with self.pool.acquire() as connection:
+        with self._acquire() as connection:
             with connection.cursor() as cursor:
                 cursor.execute(sql, params or {})
                 if commit:
@@ -57,13 +182,35 @@ class OracleManager:
                         return processed_rows
                     except oracledb.Error: return None
 
-    def _execute_many(self, sql: str, params_list: List[Dict]):
-        with self.pool.acquire() as connection:
-            with connection.cursor() as cursor:
-                cursor.executemany(sql, params_list, batcherrors=True)
-                for error in cursor.getbatcherrors():
-                    print(f"DB Error: {error.message} at row offset {error.offset}")
+    def _execute_many(self, sql: str, params_list: List[Dict], connection=None, input_sizes: Dict[str, Any] = None,
+                      returning: Optional[str] = None) -> Optional[List[int]]:
+        """
+        배열 DML(executemany)로 여러 행을 한 번의 왕복에 처리.
+        connection을 넘기면 커밋하지 않고 호출자의 트랜잭션에 참여하며, 배치 오류가 있으면 예외를 발생시켜 롤백을 유도한다.
+        returning에 'RETURNING id INTO :name'의 바인드 이름을 넘기면 행마다 반환된 숫자 목록을 돌려준다.
+        """
+        if connection is None:
+            with self._acquire() as connection:
+                values = self._execute_many(sql, params_list, connection, input_sizes, returning)
                 connection.commit()
+            return values
+        with connection.cursor() as cursor:
+            returned = None
+            if returning:
+                returned = cursor.var(oracledb.DB_TYPE_NUMBER, arraysize=len(params_list))
+                input_sizes = {**(input_sizes or {}), returning: returned}
+            if input_sizes:
+                cursor.setinputsizes(**input_sizes)
+            # DML RETURNING은 배치 오류 모드와 함께 쓸 수 없으므로 첫 오류에서 바로 예외 발생
+            cursor.executemany(sql, params_list, batcherrors=returned is None)
+            errors = cursor.getbatcherrors() if returned is None else []
+            for error in errors:
+                logger.error("배열 DML 오류: %s (행 오프셋 %d)", error.message, error.offset)
+            if errors:
+                raise RuntimeError(f"배열 DML 중 {len(errors)}개 행 처리 실패")
+            if returned is not None:
+                return [int(returned.getvalue(i)[0]) for i in range(len(params_list))]
+        return None
 
     def setup_tables(self):
         print("🔍 데이터베이스 스키마 설정 시작...")
@@ -72,15 +219,16 @@ class OracleManager:
         try:
             business_sql = """
             CREATE TABLE business_info (
-                id NUMBER(1) DEFAULT 1 NOT NULL,
+                id NUMBER(10) DEFAULT 1 NOT NULL, -- 테넌트 id
                 business_name NVARCHAR2(100) NOT NULL,
                 blog_url VARCHAR2(1024),
                 chatbot_personality NVARCHAR2(500),
                 faqs NCLOB,
+                faq_vectors BLOB, -- FAQ 질문 임베딩 (n x 차원 float32 바이트, faqs 순서와 동일)
                 marketing_info NCLOB,
                 last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                CONSTRAINT business_info_pk PRIMARY KEY (id),
-                CONSTRAINT single_row_check CHECK (id = 1)
+                content_version NUMBER DEFAULT 1 NOT NULL, -- 업체 정보나 블로그 청크가 바뀔 때마다 증가 (답변 캐시 무효화 기준)
+                CONSTRAINT business_info_pk PRIMARY KEY (id)
             )
             """
             self._execute_sql(business_sql, commit=True)
@@ -97,12 +245,18 @@ class OracleManager:
             posts_sql = """
             CREATE TABLE posts (
                 id NUMBER GENERATED BY DEFAULT AS IDENTITY,
+                tenant_id NUMBER(10) DEFAULT 1 NOT NULL,
                 post_url VARCHAR2(1024) NOT NULL,
                 title NVARCHAR2(512),
                 content_hash VARCHAR2(64),
+                log_no VARCHAR2(32), -- 게시글 목록 API(postList)의 메타데이터: 목록이 그대로면 본문을 다시 받지 않음
+                add_date VARCHAR2(64),
+                modify_date VARCHAR2(64),
+                etag VARCHAR2(256), -- PostView 응답의 검증자: --revalidate 시 조건부 요청(304)에 사용
+                last_modified VARCHAR2(64),
                 crawled_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 CONSTRAINT posts_pk PRIMARY KEY (id),
-                CONSTRAINT posts_url_uk UNIQUE (post_url)
+                CONSTRAINT posts_url_uk UNIQUE (tenant_id, post_url)
             )
             """
             self._execute_sql(posts_sql, commit=True)
@@ -116,12 +270,17 @@ class OracleManager:
         
         # CHUNKS 테이블 (FAISS 인덱스 파일 경로 저장)
         try:
-            chunks_sql = """
+            # json 모드가 아니면 바이너리 임베딩 컬럼(chunk_embedding)을 함께 생성
+            embedding_column = "" if self.vector_storage == "json" else f"chunk_embedding {self._embedding_column_type()},"
+            chunks_sql = f"""
             CREATE TABLE chunks (
                 id NUMBER GENERATED BY DEFAULT AS IDENTITY,
                 post_id NUMBER NOT NULL,
+                tenant_id NUMBER(10) DEFAULT 1 NOT NULL, -- posts.tenant_id (인덱스 구축/검색 시 조인 없이 테넌트별로 조회)
                 chunk_text NCLOB,
-                chunk_vector NCLOB, -- Oracle AI Vector Search를 위한 벡터 임베딩 저장 (문자열로 저장)
+                chunk_hash VARCHAR2(64), -- 청크 본문의 sha256 (변경된 청크만 재임베딩하기 위함)
+                chunk_vector NCLOB, -- Oracle AI Vector Search를 위한 벡터 임베딩 저장 (문자열로 저장, json 모드)
+                {embedding_column}
                 CONSTRAINT chunks_pk PRIMARY KEY (id),
                 CONSTRAINT fk_post FOREIGN KEY (post_id) REFERENCES posts (id) ON DELETE CASCADE
             )
@@ -134,15 +293,25 @@ class OracleManager:
             else: 
                 print(f"  - chunks 테이블 생성 오류: {e}")
                 raise
+        self.create_tenant_indexes()
+
+        if self.vector_storage == "vector":
+            self.create_vector_search_index()
 
         # QA_CACHE 테이블
         try:
             cache_sql = """
             CREATE TABLE qa_cache (
+                tenant_id NUMBER(10) DEFAULT 1 NOT NULL,
                 question_hash VARCHAR2(64),
+                question NCLOB,
+                question_vector BLOB, -- 의미 기반 캐시 조회용 질문 임베딩 (float32 바이트)
                 answer NCLOB NOT NULL,
+                content_version NUMBER, -- 답변 생성 당시의 business_info.content_version
+                status VARCHAR2(10) DEFAULT 'READY', -- PENDING: 다른 워커가 답변을 생성 중 (locked_until까지 유효)
+                locked_until TIMESTAMP,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                CONSTRAINT qa_cache_pk PRIMARY KEY (question_hash)
+                CONSTRAINT qa_cache_pk PRIMARY KEY (tenant_id, question_hash)
             )
             """
             self._execute_sql(cache_sql, commit=True)
@@ -175,9 +344,222 @@ class OracleManager:
             else: 
                 print(f"  - users 테이블 생성 오류: {e}")
                 raise
-                
+
+        self.create_crawl_job_tables()
         print("✅ 데이터베이스 스키마 설정이 완료되었습니다.")
 
+    # 크롤링 작업과 게시글별 진행 상태 (중단된 크롤링을 --resume으로 이어서 진행하기 위한 체크포인트)
+    CRAWL_JOB_TABLES = [
+        ("crawl_jobs", """
+            CREATE TABLE crawl_jobs (
+                id NUMBER GENERATED BY DEFAULT AS IDENTITY,
+                tenant_id NUMBER(10) DEFAULT 1 NOT NULL,
+                status VARCHAR2(20) DEFAULT 'pending' NOT NULL, -- pending/running/completed/incomplete/failed/interrupted
+                blog_url VARCHAR2(1024),
+                max_posts NUMBER,
+                listing_done NUMBER(1) DEFAULT 0 NOT NULL, -- 게시글 목록을 끝까지 기록했는지
+                total_posts NUMBER DEFAULT 0 NOT NULL,
+                last_error NVARCHAR2(2000),
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                finished_at TIMESTAMP,
+                CONSTRAINT crawl_jobs_pk PRIMARY KEY (id)
+            )
+        """),
+        ("crawl_job_posts", """
+            CREATE TABLE crawl_job_posts (
+                job_id NUMBER NOT NULL,
+                post_url VARCHAR2(1024) NOT NULL,
+                title NVARCHAR2(512),
+                log_no VARCHAR2(32),
+                add_date VARCHAR2(64),
+                modify_date VARCHAR2(64),
+                state VARCHAR2(20) DEFAULT 'listed' NOT NULL, -- CRAWL_POST_STATES 참고
+                last_error NVARCHAR2(2000),
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                CONSTRAINT crawl_job_posts_pk PRIMARY KEY (job_id, post_url),
+                CONSTRAINT crawl_job_posts_fk FOREIGN KEY (job_id) REFERENCES crawl_jobs(id) ON DELETE CASCADE
+            )
+        """),
+    ]
+
+    def create_crawl_job_tables(self):
+        """ 크롤링 작업 테이블 생성. 이미 있으면 건너뛰므로 upgrade_schema에서도 호출 """
+        for table_name, table_sql in self.CRAWL_JOB_TABLES:
+            try:
+                self._execute_sql(table_sql, commit=True)
+                print(f"  - '{table_name}' 테이블 생성 완료.")
+            except oracledb.Error as e:
+                if "ORA-00955" not in str(e): # ORA-00955: 이미 존재하는 객체
+                    print(f"  - {table_name} 테이블 생성 오류: {e}")
+                    raise
+
+    def _embedding_column_type(self) -> str:
+        if self.vector_storage == "vector":
+            return f"VECTOR({self.embedding_dim}, FLOAT32)"
+        return "BLOB"
+
+    def _vector_input_type(self):
+        # 6KB 이상 바이너리도 RAW 길이 제한 없이 바인딩되도록 입력 타입을 명시
+        if self.vector_storage == "vector":
+            return oracledb.DB_TYPE_VECTOR
+        if self.vector_storage == "blob":
+            return oracledb.DB_TYPE_LONG_RAW
+        return oracledb.DB_TYPE_LONG_NVARCHAR
+
+    def _vector_select_columns(self) -> str:
+        # 바이너리 모드에서도 아직 마이그레이션되지 않은 JSON 행을 읽을 수 있도록 두 컬럼을 함께 조회
+        return "chunk_vector" if self.vector_storage == "json" else "chunk_embedding, chunk_vector"
+
+    def _decode_row_vector(self, values) -> Optional[np.ndarray]:
+        for value in values:
+            if value is not None:
+                return decode_vector(value)
+        return None
+
+    def create_vector_search_index(self):
+        """ chunk_embedding(VECTOR) 컬럼에 Oracle AI Vector Search 인덱스(IVF 또는 HNSW)를 생성 """
+        if self.oracle_vector_index_type == "hnsw":
+            organization = "INMEMORY NEIGHBOR GRAPH" # HNSW: ATP의 VECTOR_MEMORY_SIZE 설정 필요
+        else:
+            organization = "NEIGHBOR PARTITIONS" # IVF: 디스크 기반, 별도 메모리 설정 불필요
+        sql = f"""
+        CREATE VECTOR INDEX chunks_embedding_vidx ON chunks (chunk_embedding)
+        ORGANIZATION {organization}
+        DISTANCE COSINE
+        WITH TARGET ACCURACY {self.oracle_vector_target_accuracy}
+        """
+        try:
+            self._execute_sql(sql, commit=True)
+            print(f"  - 'chunks_embedding_vidx' 벡터 인덱스 생성 완료 ({self.oracle_vector_index_type.upper()}).")
+        except oracledb.Error as e:
+            if "ORA-00955" in str(e):
+                print("  - 'chunks_embedding_vidx' 벡터 인덱스가 이미 존재합니다.")
+            else:
+                print(f"  - 벡터 인덱스 생성 오류: {e}")
+                raise
+
+    def uses_local_vector_index(self) -> bool:
+        """ 프로세스 메모리의 벡터 인덱스(numpy/faiss)로 검색하는지 여부 """
+        return self.vector_search_backend in vector_index.VECTOR_INDEX_BACKENDS
+
+    def migrate_vectors(self, batch_size: int = 500) -> int:
+        """
+        JSON 문자열(chunk_vector)로 저장된 기존 청크 벡터를 VECTOR_STORAGE 형식의 chunk_embedding 컬럼으로 일괄 변환.
+        변환된 행의 chunk_vector는 NULL로 비워 저장 공간을 회수한다. 변환한 행 수를 반환.
+        """
+        if self.vector_storage == "json":
+            raise ValueError("마이그레이션하려면 VECTOR_STORAGE를 'blob' 또는 'vector'로 설정해주세요.")
+
+        try:
+            self._execute_sql(f"ALTER TABLE chunks ADD (chunk_embedding {self._embedding_column_type()})", commit=True)
+            print(f"  - 'chunks.chunk_embedding' 컬럼 추가 완료 ({self._embedding_column_type()}).")
+        except oracledb.Error as e:
+            if "ORA-01430" not in str(e): # ORA-01430: 이미 존재하는 컬럼
+                raise
+
+        select_sql = """
+        SELECT id, chunk_vector FROM chunks
+        WHERE chunk_embedding IS NULL AND chunk_vector IS NOT NULL
+        FETCH FIRST :batch_size ROWS ONLY
+        """
+        update_sql = "UPDATE chunks SET chunk_embedding = :embedding, chunk_vector = NULL WHERE id = :id"
+        migrated = 0
+        with self._acquire() as connection, connection.cursor() as cursor:
+            while True:
+                cursor.outputtypehandler = _fetch_lobs_as_values
+                cursor.execute(select_sql, {'batch_size': batch_size})
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                params = []
+                for chunk_id, chunk_vector in rows:
+                    try:
+                        params.append({'id': chunk_id, 'embedding': encode_vector(json.loads(chunk_vector), self.vector_storage)})
+                    except json.JSONDecodeError as e:
+                        print(f"❌ 벡터 문자열 파싱 오류 (chunk {chunk_id}): {e} - 건너뜁니다.")
+                if not params:
+                    break
+                cursor.setinputsizes(embedding=self._vector_input_type())
+                cursor.executemany(update_sql, params)
+                connection.commit()
+                migrated += len(params)
+                print(f"  - {migrated}개 청크 벡터 변환 완료...")
+        print(f"✅ 총 {migrated}개 청크 벡터를 '{self.vector_storage}' 형식으로 변환했습니다.")
+        if self.vector_storage == "vector":
+            self.create_vector_search_index()
+        return migrated
+
+    # 기존 데이터베이스에 나중에 추가된 컬럼들 (setup_tables로 새로 만든 테이블에는 이미 포함됨)
+    SCHEMA_UPGRADES = [
+        ("posts", "log_no VARCHAR2(32)"),
+        ("posts", "add_date VARCHAR2(64)"),
+        ("posts", "modify_date VARCHAR2(64)"),
+        ("posts", "etag VARCHAR2(256)"),
+        ("posts", "last_modified VARCHAR2(64)"),
+        ("posts", "tenant_id NUMBER(10) DEFAULT 1 NOT NULL"),
+        ("chunks", "chunk_hash VARCHAR2(64)"),
+        ("chunks", "tenant_id NUMBER(10) DEFAULT 1 NOT NULL"),
+        ("qa_cache", "question NCLOB"),
+        ("qa_cache", "question_vector BLOB"),
+        ("qa_cache", "content_version NUMBER"),
+        ("qa_cache", "status VARCHAR2(10) DEFAULT 'READY'"),
+        ("qa_cache", "locked_until TIMESTAMP"),
+        ("qa_cache", "tenant_id NUMBER(10) DEFAULT 1 NOT NULL"),
+        ("business_info", "content_version NUMBER DEFAULT 1 NOT NULL"),
+        ("business_info", "faq_vectors BLOB"),
+        ("crawl_jobs", "tenant_id NUMBER(10) DEFAULT 1 NOT NULL"),
+    ]
+
+    # 테넌트 도입 전 테이블의 고유 키를 (tenant_id, ...)로 바꿔 업체마다 같은 URL/질문을 따로 저장할 수 있도록 함
+    TENANT_KEY_UPGRADES = [
+        ("posts", "posts_url_uk", "UNIQUE (tenant_id, post_url)"),
+        ("qa_cache", "qa_cache_pk", "PRIMARY KEY (tenant_id, question_hash)"),
+    ]
+
+    def upgrade_schema(self):
+        """ 데이터를 유지한 채 SCHEMA_UPGRADES의 컬럼을 추가. 이미 있는 컬럼은 건너뛰므로 여러 번 실행해도 안전 """
+        self.create_crawl_job_tables()
+        for table_name, column_def in self.SCHEMA_UPGRADES:
+            try:
+                self._execute_sql(f"ALTER TABLE {table_name} ADD ({column_def})", commit=True)
+                print(f"  - '{table_name}' 테이블에 컬럼 추가: {column_def}")
+            except oracledb.Error as e:
+                if "ORA-01430" not in str(e): # ORA-01430: 이미 존재하는 컬럼
+                    raise
+        self._upgrade_tenant_keys()
+        self.create_tenant_indexes()
+
+    def _upgrade_tenant_keys(self):
+        # 단일 업체용 제약(business_info.id = 1)을 없애고 id를 테넌트 id로 사용
+        try:
+            self._execute_sql("ALTER TABLE business_info DROP CONSTRAINT single_row_check", commit=True)
+            print("  - 'business_info' 테이블을 테넌트별로 저장하도록 변경했습니다.")
+        except oracledb.Error as e:
+            if "ORA-02443" not in str(e): # ORA-02443: 이미 삭제된 제약 조건
+                raise
+        self._execute_sql("ALTER TABLE business_info MODIFY (id NUMBER(10))", commit=True) # 기존 NUMBER(1) 확장
+        for table_name, constraint_name, constraint_def in self.TENANT_KEY_UPGRADES:
+            rows = self._execute_sql(
+                "SELECT column_name FROM user_cons_columns WHERE constraint_name = :name", {'name': constraint_name.upper()}
+            ) or []
+            columns = {row[0] for row in rows}
+            if "TENANT_ID" in columns:
+                continue
+            if columns:
+                self._execute_sql(f"ALTER TABLE {table_name} DROP CONSTRAINT {constraint_name} DROP INDEX", commit=True)
+            self._execute_sql(f"ALTER TABLE {table_name} ADD CONSTRAINT {constraint_name} {constraint_def}", commit=True)
+            print(f"  - '{table_name}' 테이블의 {constraint_name} 제약을 {constraint_def}로 변경했습니다.")
+
+    def create_tenant_indexes(self):
+        """ 테넌트별 청크 조회(인덱스 구축, 서명 확인)를 위한 인덱스. 이미 있으면 건너뜀 """
+        try:
+            self._execute_sql("CREATE INDEX chunks_tenant_idx ON chunks (tenant_id, id)", commit=True)
+            print("  - 'chunks_tenant_idx' 인덱스 생성 완료.")
+        except oracledb.Error as e:
+            if "ORA-00955" not in str(e) and "ORA-01408" not in str(e): # 이미 존재하는 이름 / 같은 컬럼의 인덱스
+                raise
+
     def _drop_table_if_exists(self, table_name: str):
         try:
             self._execute_sql(f"DROP TABLE {table_name} CASCADE CONSTRAINTS", commit=True)
@@ -192,6 +574,8 @@ class OracleManager:
     def reset_database(self):
         print("🚨 데이터베이스 초기화 시작...")
         # 테이블 삭제 (의존성 역순으로)
+        self._drop_table_if_exists("crawl_job_posts")
+        self._drop_table_if_exists("crawl_jobs")
         self._drop_table_if_exists("qa_cache")
         self._drop_table_if_exists("chunks")
         self._drop_table_if_exists("posts")
@@ -235,68 +619,421 @@ class OracleManager:
                 conn.commit()
 
     def get_post_hash(self, post_url: str) -> Optional[str]:
-        sql = "SELECT content_hash FROM posts WHERE post_url = :url"
-        result = self._execute_sql(sql, {'url': post_url})
+        sql = "SELECT content_hash FROM posts WHERE tenant_id = :tenant_id AND post_url = :url"
+        result = self._execute_sql(sql, {'tenant_id': self.tenant_id, 'url': post_url})
         return result[0][0] if result and result[0][0] else None
 
+    POST_CRAWL_STATE_COLUMNS = ('log_no', 'add_date', 'modify_date', 'etag', 'last_modified')
+
+    @metrics.timed('db')
+    def get_post_crawl_states(self) -> Dict[str, Dict[str, Any]]:
+        """ 모든 게시글의 변경 감지용 상태(post_url → title, content_hash, 목록 메타데이터, HTTP 검증자)를 한 번에 조회 """
+        columns = ", ".join(self.POST_CRAWL_STATE_COLUMNS)
+        rows = self._execute_sql(
+            f"SELECT post_url, title, content_hash, {columns} FROM posts WHERE tenant_id = :tenant_id", {'tenant_id': self.tenant_id}
+        ) or []
+        return {
+            row[0]: dict(zip(('title', 'content_hash') + self.POST_CRAWL_STATE_COLUMNS, row[1:]))
+            for row in rows
+        }
+
+    @metrics.timed('db')
+    def update_post_crawl_states(self, states: List[Dict[str, Any]]):
+        """ 본문이 바뀌지 않은 게시글의 제목, 목록 메타데이터, HTTP 검증자만 갱신 (청크와 콘텐츠 버전은 그대로) """
+        if not states:
+            return
+        sql = """
+        UPDATE posts SET title = :title, log_no = :log_no, add_date = :add_date, modify_date = :modify_date,
+                         etag = :etag, last_modified = :last_modified, crawled_at = CURRENT_TIMESTAMP
+        WHERE tenant_id = :tenant_id AND post_url = :post_url
+        """
+        self._execute_many(sql, [
+            {'tenant_id': self.tenant_id, 'post_url': state['post_url'], 'title': state['title'],
+             **{column: state.get(column) for column in self.POST_CRAWL_STATE_COLUMNS}}
+            for state in states
+        ])
+
+    # 게시글 상태: listed(목록에 기록) → fetched(본문 수집) → embedded(임베딩 완료) → stored(DB 저장)
+    # 본문을 받지 않고 끝난 경우 skipped(목록 변경 없음) / unchanged(본문 변경 없음), 오류 시 failed
+    CRAWL_POST_STATES = ('listed', 'fetched', 'embedded', 'stored', 'skipped', 'unchanged', 'failed')
+    CRAWL_POST_DONE_STATES = ('stored', 'skipped', 'unchanged')
+
+    def create_crawl_job(self, blog_url: str, max_posts: Optional[int] = None) -> int:
+        """ 새 크롤링 작업(pending)을 만들고 id를 반환 """
+        with self._acquire() as connection, connection.cursor() as cursor:
+            job_id_var = cursor.var(oracledb.DB_TYPE_NUMBER)
+            cursor.execute(
+                "INSERT INTO crawl_jobs (tenant_id, blog_url, max_posts) VALUES (:tenant_id, :blog_url, :max_posts) RETURNING id INTO :job_id",
+                {'tenant_id': self.tenant_id, 'blog_url': blog_url, 'max_posts': max_posts, 'job_id': job_id_var}
+            )
+            connection.commit()
+            return int(job_id_var.getvalue()[0])
+
+    def get_crawl_job(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """ 작업 정보와 게시글 상태별 개수('post_states')를 반환. 없거나 다른 테넌트의 작업이면 None """
+        rows = self._execute_sql("""
+            SELECT id, status, blog_url, max_posts, listing_done, total_posts, last_error, created_at, updated_at, finished_at
+            FROM crawl_jobs WHERE id = :job_id AND tenant_id = :tenant_id
+        """, {'job_id': job_id, 'tenant_id': self.tenant_id})
+        if not rows:
+            return None
+        keys = ('id', 'status', 'blog_url', 'max_posts', 'listing_done', 'total_posts', 'last_error',
+                'created_at', 'updated_at', 'finished_at')
+        job = dict(zip(keys, rows[0]))
+        job['listing_done'] = bool(job['listing_done'])
+        counts = self._execute_sql(
+            "SELECT state, COUNT(*) FROM crawl_job_posts WHERE job_id = :job_id GROUP BY state", {'job_id': job_id}
+        ) or []
+        job['post_states'] = {state: int(count) for state, count in counts}
+        return job
+
+    def get_resumable_crawl_job_id(self) -> Optional[int]:
+        """ 완료되지 않은 가장 최근 크롤링 작업의 id """
+        rows = self._execute_sql(
+            "SELECT id FROM crawl_jobs WHERE tenant_id = :tenant_id AND status <> 'completed' ORDER BY id DESC FETCH FIRST 1 ROWS ONLY",
+            {'tenant_id': self.tenant_id}
+        )
+        return int(rows[0][0]) if rows else None
+
+    def update_crawl_job(self, job_id: int, status: Optional[str] = None, listing_done: Optional[bool] = None,
+                         last_error: Optional[str] = None):
+        """ 작업 상태 갱신. completed/incomplete/failed/interrupted로 바꾸면 finished_at도 기록 """
+        self._execute_sql("""
+            UPDATE crawl_jobs SET
+                status = NVL(:status, status),
+                listing_done = NVL(:listing_done, listing_done),
+                total_posts = (SELECT COUNT(*) FROM crawl_job_posts WHERE job_id = :job_id),
+                last_error = CASE WHEN :status IS NOT NULL OR :last_error IS NOT NULL THEN :last_error ELSE last_error END,
+                updated_at = CURRENT_TIMESTAMP,
+                finished_at = CASE WHEN :status IN ('completed', 'incomplete', 'failed', 'interrupted') THEN CURRENT_TIMESTAMP ELSE finished_at END
+            WHERE id = :job_id
+        """, {
+            'job_id': job_id, 'status': status, 'listing_done': None if listing_done is None else int(listing_done),
+            'last_error': last_error[:2000] if last_error else None
+        }, commit=True)
+
+    def add_crawl_job_posts(self, job_id: int, posts_meta: List[Dict[str, Any]]):
+        """ 목록에서 찾은 게시글을 작업에 기록 (이미 기록된 게시글은 상태를 유지) """
+        if not posts_meta:
+            return
+        sql = """
+        MERGE INTO crawl_job_posts dest
+        USING (SELECT :job_id AS job_id, :post_url AS post_url FROM dual) src
+        ON (dest.job_id = src.job_id AND dest.post_url = src.post_url)
+        WHEN NOT MATCHED THEN
+            INSERT (job_id, post_url, title, log_no, add_date, modify_date)
+            VALUES (:job_id, :post_url, :title, :log_no, :add_date, :modify_date)
+        """
+        self._execute_many(sql, [
+            {'job_id': job_id, 'post_url': post['url'], 'title': post.get('title'),
+             'log_no': post.get('log_no'), 'add_date': post.get('add_date'), 'modify_date': post.get('modify_date')}
+            for post in posts_meta
+        ])
+
+    def set_crawl_job_post_states(self, job_id: int, updates: List[Tuple[str, str, Optional[str]]]):
+        """ (post_url, state, last_error) 목록으로 게시글 상태를 한 번에 갱신 """
+        if not updates:
+            return
+        sql = """
+        UPDATE crawl_job_posts SET state = :state, last_error = :last_error, updated_at = CURRENT_TIMESTAMP
+        WHERE job_id = :job_id AND post_url = :post_url
+        """
+        self._execute_many(sql, [
+            {'job_id': job_id, 'post_url': post_url, 'state': state, 'last_error': error[:2000] if error else None}
+            for post_url, state, error in updates
+        ])
+
+    def get_crawl_job_posts(self, job_id: int, exclude_states: Tuple[str, ...] = ()) -> List[Dict[str, Any]]:
+        """ 작업에 기록된 게시글 메타데이터 (crawl_all_posts와 같은 형식, 최신 글 먼저). exclude_states 상태는 제외 """
+        state_filter = ""
+        params: Dict[str, Any] = {'job_id': job_id}
+        if exclude_states:
+            names = [f"s{i}" for i in range(len(exclude_states))]
+            state_filter = f"AND state NOT IN ({', '.join(':' + name for name in names)})"
+            params.update(zip(names, exclude_states))
+        rows = self._execute_sql(f"""
+            SELECT post_url, title, log_no, add_date, modify_date FROM crawl_job_posts
+            WHERE job_id = :job_id {state_filter}
+            ORDER BY log_no DESC NULLS LAST, post_url
+        """, params) or []
+        return [dict(zip(('url', 'title', 'log_no', 'add_date', 'modify_date'), row)) for row in rows]
+
+    @metrics.timed('db')
+    def get_post_chunk_hashes(self, post_url: str) -> Dict[Optional[str], List[int]]:
+        """ 게시글에 저장된 청크들을 chunk_hash → chunk id 목록으로 반환 (해시가 없는 예전 청크는 None 키) """
+        sql = """
+        SELECT c.id, c.chunk_hash FROM chunks c
+        JOIN posts p ON p.id = c.post_id
+        WHERE p.tenant_id = :tenant_id AND p.post_url = :url
+        ORDER BY c.id
+        """
+        chunk_ids_by_hash: Dict[Optional[str], List[int]] = {}
+        for chunk_id, chunk_hash in self._execute_sql(sql, {'tenant_id': self.tenant_id, 'url': post_url}) or []:
+            chunk_ids_by_hash.setdefault(chunk_hash, []).append(int(chunk_id))
+        return chunk_ids_by_hash
+
     def upsert_post_with_chunks(self, post_url: str, title: str, content_hash: str, chunks_data: List[Dict[str, Any]]):
-        # 기존 데이터 삭제
-        delete_sql = """
-        BEGIN 
-            DELETE FROM chunks WHERE post_id IN (SELECT id FROM posts WHERE post_url = :url); 
-            DELETE FROM posts WHERE post_url = :url; 
+        self.upsert_posts_with_chunks([{
+            'post_url': post_url, 'title': title, 'content_hash': content_hash, 'chunks': chunks_data
+        }])
+        print(f"  > 게시글 '{title}' 및 {len(chunks_data)}개 청크 저장 완료.")
+
+    @metrics.timed('db')
+    def upsert_posts_with_chunks(self, posts: List[Dict[str, Any]]):
+        """
+        여러 게시글과 그 청크를 하나의 트랜잭션으로 저장 (게시글 upsert 1회 + 청크 insert 1회 + commit).
+        posts 항목: {'post_url', 'title', 'content_hash', 'chunks': [{'chunk_text', 'embedding', 'chunk_hash'}, ...],
+                    'stale_chunk_ids': [...] (선택), POST_CRAWL_STATE_COLUMNS의 값들 (선택)}
+        'stale_chunk_ids'가 있으면 해당 청크만 삭제하고 나머지는 유지(증분 갱신), 없으면 게시글의 청크를 모두 교체한다.
+        중간에 실패하면 전체를 롤백하여 일부만 저장된 게시글이 남지 않도록 한다.
+        """
+        if not posts:
+            return
+
+        # 게시글 id를 유지한 채 갱신(없으면 삽입)하고 기존 청크를 삭제한 뒤 id를 돌려주는 PL/SQL 블록
+        upsert_post_sql = """
+        DECLARE
+            v_post_id posts.id%TYPE;
+        BEGIN
+            UPDATE posts SET title = :title, content_hash = :content_hash,
+                             log_no = :log_no, add_date = :add_date, modify_date = :modify_date,
+                             etag = :etag, last_modified = :last_modified, crawled_at = CURRENT_TIMESTAMP
+            WHERE tenant_id = :tenant_id AND post_url = :post_url
+            RETURNING id INTO v_post_id;
+            IF SQL%ROWCOUNT = 0 THEN
+                INSERT INTO posts (tenant_id, post_url, title, content_hash, log_no, add_date, modify_date, etag, last_modified)
+                VALUES (:tenant_id, :post_url, :title, :content_hash, :log_no, :add_date, :modify_date, :etag, :last_modified)
+                RETURNING id INTO v_post_id;
+            END IF;
+            IF :replace_chunks = 1 THEN
+                DELETE FROM chunks WHERE post_id = v_post_id;
+                :deleted_count := SQL%ROWCOUNT;
+            ELSE
+                :deleted_count := 0;
+            END IF;
+            :post_id := v_post_id;
         END;
         """
-        self._execute_sql(delete_sql, {'url': post_url}, commit=True)
-        
-        # 새 게시글 삽입
-        insert_post_sql = """
-        INSERT INTO posts (post_url, title, content_hash) 
-        VALUES (:post_url, :title, :hash) 
-        RETURNING id INTO :post_id
-        """
-        with self.pool.acquire() as conn, conn.cursor() as cursor:
-            post_id_var = cursor.var(oracledb.DB_TYPE_NUMBER)
-            cursor.execute(insert_post_sql, {
-                'post_url': post_url, 
-                'title': title, 
-                'hash': content_hash, 
-                'post_id': post_id_var
-            })
-            post_id = post_id_var.getvalue()[0]
-            conn.commit()
-        # 청크 데이터 저장
-        if chunks_data:
-            insert_chunks_sql = """
-            INSERT INTO chunks (post_id, chunk_text, chunk_vector) 
-            VALUES (:post_id, :chunk_text, :chunk_vector)
-            """
-            with self.pool.acquire() as conn, conn.cursor() as cursor:
-                for chunk in chunks_data:
-                    params = {
-                        'post_id': post_id, 
-                        'chunk_text': chunk['chunk_text'], 
-                        'chunk_vector': json.dumps(chunk['embedding'].tolist()) # JSON 형식으로 저장
+        vector_column = "chunk_vector" if self.vector_storage == "json" else "chunk_embedding"
+        insert_chunks_sql = f"""
+        INSERT INTO chunks (post_id, tenant_id, chunk_text, chunk_hash, {vector_column}) 
+        VALUES (:post_id, :tenant_id, :chunk_text, :chunk_hash, :chunk_vector)
+        RETURNING id INTO :chunk_id
+        """
+        delete_stale_sql = "DELETE FROM chunks WHERE id = :chunk_id AND post_id = :post_id"
+        chunk_ids: List[int] = []
+        deleted_chunks = 0  # 키워드 인덱스 서명을 다시 조회하지 않고 계산하기 위한 삭제 행 수
+
+        with self._acquire() as connection:
+            try:
+                with connection.cursor() as cursor:
+                    post_id_var = cursor.var(oracledb.DB_TYPE_NUMBER, arraysize=len(posts))
+                    deleted_count_var = cursor.var(oracledb.DB_TYPE_NUMBER, arraysize=len(posts))
+                    cursor.setinputsizes(post_id=post_id_var, deleted_count=deleted_count_var)
+                    cursor.executemany(upsert_post_sql, [
+                        {
+                            'tenant_id': self.tenant_id,
+                            'post_url': post['post_url'], 'title': post['title'], 'content_hash': post['content_hash'],
+                            'replace_chunks': 0 if 'stale_chunk_ids' in post else 1,
+                            **{column: post.get(column) for column in self.POST_CRAWL_STATE_COLUMNS}
+                        }
+                        for post in posts
+                    ])
+                    post_ids = [int(post_id_var.getvalue(i)) for i in range(len(posts))]
+                    deleted_chunks = sum(int(deleted_count_var.getvalue(i) or 0) for i in range(len(posts)))
+
+                stale_params = [
+                    {'chunk_id': chunk_id, 'post_id': post_id}
+                    for post, post_id in zip(posts, post_ids)
+                    for chunk_id in post.get('stale_chunk_ids') or []
+                ]
+                if stale_params:
+                    with connection.cursor() as cursor:
+                        cursor.executemany(delete_stale_sql, stale_params)
+                        deleted_chunks += cursor.rowcount
+
+                chunk_params = [
+                    {
+                        'post_id': post_id,
+                        'tenant_id': self.tenant_id,
+                        'chunk_text': chunk['chunk_text'],
+                        'chunk_hash': chunk.get('chunk_hash') or chunk_hash(chunk['chunk_text']),
+                        'chunk_vector': encode_vector(chunk['embedding'], self.vector_storage) # VECTOR_STORAGE 형식으로 저장
                     }
-                    cursor.execute(insert_chunks_sql, params)
-                conn.commit()
-        
-        print(f"  > 게시글 '{title}' 및 {len(chunks_data)}개 청크 저장 완료.")
+                    for post, post_id in zip(posts, post_ids)
+                    for chunk in post['chunks']
+                ]
+                if chunk_params:
+                    chunk_ids = self._execute_many(insert_chunks_sql, chunk_params, connection, input_sizes={
+                        'chunk_text': oracledb.DB_TYPE_LONG_NVARCHAR,
+                        'chunk_vector': self._vector_input_type(),
+                    }, returning='chunk_id')
+                with connection.cursor() as cursor:
+                    # 블로그 내용이 바뀌었으므로 기존 캐시 답변 무효화
+                    cursor.execute(self.BUMP_CONTENT_VERSION_SQL, {'tenant_id': self.tenant_id})
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+
+        self._index_checked_at = 0.0 # 다음 검색 시 인덱스 최신 여부를 바로 확인
+        if self.hybrid_search_candidates:
+            self._update_lexical_index(posts, post_ids, chunk_params, chunk_ids, deleted_chunks)
+
+    def _update_lexical_index(self, posts: List[Dict[str, Any]], post_ids: List[int], chunk_params: List[Dict[str, Any]],
+                              chunk_ids: List[int], deleted_count: int):
+        """
+        방금 저장한 청크 변경분을 BM25 인덱스(프로세스 캐시 또는 디스크 파일)에 바로 반영하여 전체 재구축을 피함.
+        서명은 DB를 다시 조회하지 않고 인덱스의 서명에 삽입/삭제 행 수를 더해 계산한다. 다른 프로세스가 그 사이 청크를
+        바꿨다면 계산한 서명이 DB와 달라지므로, 다음 최신 여부 확인(VECTOR_INDEX_REFRESH_SECONDS)에서 새로 구축된다.
+        """
+        key = self.vector_index_key
+        try:
+            index = lexical_index.get_cached_index(key) or lexical_index.load_index(key, self.vector_index_dir)
+            if index is None or not index.signature:
+                return
+            for post, post_id in zip(posts, post_ids):
+                if 'stale_chunk_ids' in post:
+                    index.remove(post['stale_chunk_ids'] or [])
+                else:
+                    index.remove_post(post_id)
+            for params, chunk_id in zip(chunk_params, chunk_ids):
+                index.add(chunk_id, params['post_id'], params['chunk_text'])
+            index.signature = advance_chunks_signature(index.signature, chunk_ids, deleted_count)
+            self._lexical_checked_at = time.monotonic()
+        except Exception as e:
+            logger.warning("키워드 인덱스 증분 갱신 실패 (다음 검색 시 재구축됨): %s", e)
+
+    BUMP_CONTENT_VERSION_SQL = "UPDATE business_info SET content_version = content_version + 1 WHERE id = :tenant_id"
+
+    # 현재 콘텐츠 버전으로 생성되었고 TTL이 지나지 않은 캐시 항목만 유효 (생성 중인 PENDING 자리표시 행은 제외)
+    # 버전은 각 행의 테넌트 기준으로 비교하므로 테넌트 조건 없이 전체 삭제(purge)에도 쓸 수 있음
+    VALID_CACHE_CONDITION = """
+        (status IS NULL OR status = 'READY')
+        AND content_version = (SELECT b.content_version FROM business_info b WHERE b.id = qa_cache.tenant_id)
+        AND (:ttl <= 0 OR created_at > SYSTIMESTAMP - NUMTODSINTERVAL(:ttl, 'SECOND'))
+    """
 
+    @metrics.timed('db')
     def get_cached_answer(self, question_hash: str) -> Optional[str]:
-        sql = "SELECT answer FROM qa_cache WHERE question_hash = :hash"
-        result = self._execute_sql(sql, {'hash': question_hash})
+        """ 유효한 캐시 답변만 반환. 콘텐츠 버전이 바뀌었거나 만료된 항목은 무시되고 다음 저장 시 덮어써짐 """
+        sql = f"SELECT answer FROM qa_cache WHERE tenant_id = :tenant_id AND question_hash = :hash AND {self.VALID_CACHE_CONDITION}"
+        result = self._execute_sql(sql, {'tenant_id': self.tenant_id, 'hash': question_hash, 'ttl': self.answer_cache_ttl_seconds})
         return result[0][0] if result and result[0][0] else None
     
-    def cache_answer(self, question_hash: str, answer: str):
-        sql = "INSERT INTO qa_cache (question_hash, answer) VALUES (:hash, :answer)"
-        self._execute_sql(sql, {'hash': question_hash, 'answer': answer}, commit=True)
-        print("  - 새로운 답변을 캐시에 저장했습니다.")
+    @metrics.timed('db')
+    def cache_answer(self, question_hash: str, answer: str, question: Optional[str] = None, question_vector=None,
+                     content_version: Optional[int] = None):
+        """
+        답변을 캐시에 저장(MERGE). 질문 원문과 임베딩을 함께 저장하면 의미 기반(유사 질문) 캐시 조회에 사용됨.
+        content_version은 답변 생성에 사용한 업체 정보의 버전으로, 생략하면 현재 버전으로 기록한다.
+        """
+        sql = """
+        MERGE INTO qa_cache dest
+        USING (SELECT :tenant_id AS tenant_id, :hash AS question_hash FROM dual) src
+        ON (dest.tenant_id = src.tenant_id AND dest.question_hash = src.question_hash)
+        WHEN MATCHED THEN
+            UPDATE SET
+                question = :question,
+                question_vector = :question_vector,
+                answer = :answer,
+                content_version = NVL(:content_version, (SELECT content_version FROM business_info WHERE id = :tenant_id)),
+                status = 'READY',
+                locked_until = NULL,
+                created_at = CURRENT_TIMESTAMP
+        WHEN NOT MATCHED THEN
+            INSERT (tenant_id, question_hash, question, question_vector, answer, content_version, status)
+            VALUES (:tenant_id, :hash, :question, :question_vector, :answer,
+                    NVL(:content_version, (SELECT content_version FROM business_info WHERE id = :tenant_id)), 'READY')
+        """
+        vector_bytes = encode_vector(question_vector, "blob") if question_vector is not None else None
+        try:
+            with self._acquire() as connection, connection.cursor() as cursor:
+                cursor.setinputsizes(question=oracledb.DB_TYPE_LONG_NVARCHAR, question_vector=oracledb.DB_TYPE_LONG_RAW,
+                                     answer=oracledb.DB_TYPE_LONG_NVARCHAR)
+                cursor.execute(sql, {
+                    'tenant_id': self.tenant_id, 'hash': question_hash, 'question': question, 'question_vector': vector_bytes,
+                    'answer': answer, 'content_version': content_version
+                })
+                connection.commit()
+        except oracledb.IntegrityError:
+            # 동시에 같은 질문을 처리한 다른 요청이 먼저 삽입한 경우: 그 답변을 그대로 사용
+            logger.debug("같은 질문의 답변이 이미 캐시에 저장되어 있습니다.")
+            return
+        logger.debug("새로운 답변을 캐시에 저장했습니다.")
+
+    @metrics.timed('db')
+    def try_claim_answer_generation(self, question_hash: str, lease_seconds: float) -> bool:
+        """
+        여러 워커 사이에서 같은 질문의 답변 생성을 한 번만 수행하기 위한 잠금 행(status='PENDING')을 선점.
+        True면 이 요청이 생성 담당, False면 다른 워커가 lease_seconds 안에 생성 중이거나 이미 유효한 답변이 저장되어 있으므로
+        캐시를 다시 조회하면 됨. 선점할 수 있는 행은 없거나, 잠금이 만료된 PENDING 행이거나, 유효하지 않은(버전이 바뀌었거나
+        TTL이 지난) READY 행뿐이며, 유효한 답변을 PENDING으로 덮어써 다른 요청의 캐시 적중을 막지 않는다.
+        잠금은 cache_answer가 답변을 저장하면서 해제되며, 워커가 죽더라도 locked_until이 지나면 다시 선점할 수 있다.
+        """
+        # VALID_CACHE_CONDITION이 qa_cache.tenant_id를 참조하므로 대상 테이블에 별칭을 붙이지 않음
+        sql = f"""
+        MERGE INTO qa_cache
+        USING (SELECT :tenant_id AS tenant_id, :hash AS question_hash FROM dual) src
+        ON (qa_cache.tenant_id = src.tenant_id AND qa_cache.question_hash = src.question_hash)
+        WHEN MATCHED THEN
+            UPDATE SET status = 'PENDING', locked_until = SYSTIMESTAMP + NUMTODSINTERVAL(:lease, 'SECOND')
+            WHERE (status = 'PENDING' AND (locked_until IS NULL OR locked_until < SYSTIMESTAMP))
+            OR (NVL(status, 'READY') <> 'PENDING' AND (content_version IS NULL OR NOT ({self.VALID_CACHE_CONDITION})))
+        WHEN NOT MATCHED THEN
+            INSERT (tenant_id, question_hash, answer, status, locked_until)
+            VALUES (:tenant_id, :hash, ' ', 'PENDING', SYSTIMESTAMP + NUMTODSINTERVAL(:lease, 'SECOND'))
+        """
+        try:
+            with self._acquire() as connection, connection.cursor() as cursor:
+                cursor.execute(sql, {'tenant_id': self.tenant_id, 'hash': question_hash, 'lease': lease_seconds,
+                                     'ttl': self.answer_cache_ttl_seconds})
+                claimed = cursor.rowcount == 1
+                connection.commit()
+        except oracledb.IntegrityError:
+            return False # 다른 워커가 같은 순간에 먼저 삽입함
+        return claimed
+
+    @metrics.timed('db')
+    def release_answer_generation(self, question_hash: str):
+        """ 답변을 저장하지 못하고 끝난 경우(오류, FAQ 직접 답변 등) 선점한 잠금 행을 삭제하여 다른 워커가 바로 생성할 수 있도록 함 """
+        self._execute_sql("DELETE FROM qa_cache WHERE tenant_id = :tenant_id AND question_hash = :hash AND status = 'PENDING'",
+                          {'tenant_id': self.tenant_id, 'hash': question_hash}, commit=True)
+
+    @metrics.timed('db')
+    def purge_answer_cache(self) -> int:
+        """ 콘텐츠 버전이 바뀌었거나 TTL이 지난 캐시 항목을 모든 테넌트에서 삭제하고 삭제한 행 수를 반환 """
+        # 아직 잠금 기간이 남은 PENDING 행은 다른 워커가 생성 중이므로 남겨둠
+        sql = f"""
+        DELETE FROM qa_cache
+        WHERE (NOT ({self.VALID_CACHE_CONDITION}) OR content_version IS NULL)
+        AND NOT (NVL(status, 'READY') = 'PENDING' AND NVL(locked_until, SYSTIMESTAMP) > SYSTIMESTAMP)
+        """
+        with self._acquire() as connection, connection.cursor() as cursor:
+            cursor.execute(sql, {'ttl': self.answer_cache_ttl_seconds})
+            deleted = cursor.rowcount
+            connection.commit()
+        print(f"✅ 오래된 답변 캐시 {deleted}개를 삭제했습니다.")
+        return deleted
 
+    @metrics.timed('db')
+    def get_cached_question_vectors(self) -> List[Tuple[str, str, np.ndarray]]:
+        """ 의미 기반 캐시용: 임베딩이 저장된 캐시 항목의 (question_hash, 질문 원문, 질문 벡터) 목록 """
+        sql = f"""
+        SELECT question_hash, question, question_vector FROM qa_cache
+        WHERE tenant_id = :tenant_id AND question_vector IS NOT NULL AND {self.VALID_CACHE_CONDITION}
+        """
+        with self._acquire() as connection, connection.cursor() as cursor:
+            cursor.outputtypehandler = _fetch_lobs_as_values
+            cursor.execute(sql, {'tenant_id': self.tenant_id, 'ttl': self.answer_cache_ttl_seconds})
+            rows = cursor.fetchall()
+        return [(question_hash, question, decode_vector(vector)) for question_hash, question, vector in rows]
+
+    @metrics.timed('db')
     def save_business_info(self, info: Dict[str, Any]):
         sql = """
         MERGE INTO business_info dest 
-        USING (SELECT 1 AS id FROM dual) src 
+        USING (SELECT :tenant_id AS id FROM dual) src 
         ON (dest.id = src.id)
         WHEN MATCHED THEN 
             UPDATE SET 
@@ -304,73 +1041,301 @@ class OracleManager:
                 blog_url = :url, 
                 chatbot_personality = :personality, 
                 faqs = :faqs, 
+                faq_vectors = :faq_vectors, 
                 marketing_info = :marketing, 
-                last_updated = CURRENT_TIMESTAMP
+                last_updated = CURRENT_TIMESTAMP,
+                content_version = dest.content_version + 1
         WHEN NOT MATCHED THEN 
-            INSERT (id, business_name, blog_url, chatbot_personality, faqs, marketing_info) 
-            VALUES (1, :name, :url, :personality, :faqs, :marketing)
+            INSERT (id, business_name, blog_url, chatbot_personality, faqs, faq_vectors, marketing_info) 
+            VALUES (:tenant_id, :name, :url, :personality, :faqs, :faq_vectors, :marketing)
         """
+        # 'faq_vectors'(FAQ 질문 임베딩 행렬)가 있으면 함께 저장하여 질문 시마다 FAQ를 다시 임베딩하지 않도록 함
+        faq_vectors = info.get('faq_vectors')
         params = {
+            'tenant_id': self.tenant_id,
             'name': info['business_name'], 
             'url': info['blog_url'], 
             'personality': info['chatbot_personality'], 
             'faqs': json.dumps(info['faqs'], ensure_ascii=False), 
+            'faq_vectors': encode_vector(faq_vectors, "blob") if faq_vectors is not None and len(faq_vectors) else None,
             'marketing': info['marketing_info']
         }
-        self._execute_sql(sql, params, commit=True)
+        with self._acquire() as connection, connection.cursor() as cursor:
+            cursor.setinputsizes(faqs=oracledb.DB_TYPE_LONG_NVARCHAR, faq_vectors=oracledb.DB_TYPE_LONG_RAW,
+                                 marketing=oracledb.DB_TYPE_LONG_NVARCHAR)
+            cursor.execute(sql, params)
+            connection.commit()
         print("✅ 업체 정보가 데이터베이스에 저장되었습니다.")
 
+    @metrics.timed('db')
     def get_business_info(self) -> Optional[Dict[str, Any]]:
-        sql = "SELECT business_name, blog_url, chatbot_personality, faqs, marketing_info FROM business_info WHERE id = 1"
-        result = self._execute_sql(sql)
+        sql = "SELECT business_name, blog_url, chatbot_personality, faqs, marketing_info, content_version, faq_vectors FROM business_info WHERE id = :tenant_id"
+        result = self._execute_sql(sql, {'tenant_id': self.tenant_id})
         if not result: 
             return None
         
         row = result[0]
         faqs_json = row[3] if row[3] else '[]'
         marketing_text = row[4] if row[4] else ''
+        faq_vectors = decode_vector(row[6]).reshape(-1, self.embedding_dim) if row[6] else None
         
         return {
             'business_name': row[0], 
             'blog_url': row[1], 
             'chatbot_personality': row[2], 
             'faqs': json.loads(faqs_json), 
-            'marketing_info': marketing_text
+            'marketing_info': marketing_text,
+            'content_version': int(row[5]) if row[5] is not None else None,
+            'faq_vectors': faq_vectors
         }
 
-    def find_similar_chunks(self, query_vector: list, k: int = 5) -> List[Tuple[str, float]]:
+    @metrics.timed('db')
+    def get_business_info_version(self) -> Optional[Tuple[int, Any]]:
+        """ LOB 컬럼 없이 (content_version, last_updated)만 조회. 프로세스 캐시의 변경 감지용 """
+        result = self._execute_sql("SELECT content_version, last_updated FROM business_info WHERE id = :tenant_id",
+                                   {'tenant_id': self.tenant_id})
+        return (int(result[0][0]), result[0][1]) if result else None
+
+    def list_tenants(self) -> List[Tuple[int, str]]:
+        """ 업체 정보가 등록된 모든 테넌트의 (tenant_id, business_name) 목록 """
+        rows = self._execute_sql("SELECT id, business_name FROM business_info ORDER BY id") or []
+        return [(int(tenant_id), name) for tenant_id, name in rows]
+
+    @metrics.timed('db')
+    def get_chunks_signature(self) -> str:
+        """ 이 테넌트 청크의 현재 상태를 나타내는 가벼운 서명 (행 수 + 최대 id). 인덱스 최신 여부 판단용 """
+        result = self._execute_sql("SELECT COUNT(*), NVL(MAX(id), 0) FROM chunks WHERE tenant_id = :tenant_id",
+                                   {'tenant_id': self.tenant_id})
+        count, max_id = result[0] if result else (0, 0)
+        return f"{int(count)}:{int(max_id)}"
+
+    def _fetch_all_chunk_vectors(self, batch_size: int = 1000) -> Tuple[np.ndarray, np.ndarray]:
+        """ 인덱스 구축용으로 이 테넌트의 모든 청크 (id 배열, float32 벡터 행렬)을 배치 단위로 읽어옴 """
+        ids, vectors = [], []
+        with self._acquire() as connection, connection.cursor() as cursor:
+            cursor.arraysize = batch_size
+            cursor.outputtypehandler = _fetch_lobs_as_values
+            cursor.execute(f"SELECT id, {self._vector_select_columns()} FROM chunks WHERE tenant_id = :tenant_id ORDER BY id",
+                           {'tenant_id': self.tenant_id})
+            while True:
+                rows = cursor.fetchmany()
+                if not rows:
+                    break
+                for row in rows:
+                    try:
+                        vector = self._decode_row_vector(row[1:])
+                    except (TypeError, ValueError) as e:
+                        print(f"❌ 벡터 파싱 오류 (chunk {row[0]}): {e}")
+                        continue
+                    if vector is not None and vector.shape == (self.embedding_dim,):
+                        vectors.append(vector)
+                        ids.append(int(row[0]))
+        matrix = np.vstack(vectors) if vectors else np.empty((0, self.embedding_dim), dtype=np.float32)
+        return np.asarray(ids, dtype=np.int64), matrix
+
+    @metrics.timed('db')
+    def build_vector_index(self) -> vector_index.VectorIndex:
+        """ 이 테넌트의 청크 전체로 벡터 인덱스를 새로 만들고 디스크에 저장한 뒤 프로세스 캐시에 등록 """
+        signature = self.get_chunks_signature()
+        ids, matrix = self._fetch_all_chunk_vectors()
+        index = vector_index.get_index_class(self.vector_index_backend)(self.embedding_dim)
+        index.build(ids, matrix, signature=signature)
+        index.save(self.vector_index_dir, self.vector_index_key)
+        vector_index.set_cached_index(self.vector_index_backend, self.vector_index_key, index)
+        logger.info("테넌트 %s의 '%s' 벡터 인덱스 구축 완료 (%d개 청크).", self.tenant_id, self.vector_index_backend, len(index))
+        return index
+
+    def get_vector_index(self) -> vector_index.VectorIndex:
+        """
+        프로세스 캐시 → 디스크 파일 → chunks 테이블 순서로 인덱스를 확보.
+        VECTOR_INDEX_REFRESH_SECONDS 간격으로만 DB 서명을 확인하여 변경 시 다시 읽거나 재구축한다.
+        """
+        backend, key = self.vector_index_backend, self.vector_index_key
+        index = vector_index.get_cached_index(backend, key)
+        if index is not None and time.monotonic() - self._index_checked_at < self.vector_index_refresh_seconds:
+            return index
+
+        with self._index_lock:
+            signature = self.get_chunks_signature()
+            self._index_checked_at = time.monotonic()
+            index = vector_index.get_cached_index(backend, key)
+            if index is not None and index.signature == signature:
+                return index
+            # 다른 프로세스(예: crawl)가 이미 최신 인덱스를 저장했을 수 있으므로 디스크부터 확인
+            index = vector_index.load_index(backend, key, self.embedding_dim, self.vector_index_dir)
+            if index is not None and index.signature == signature:
+                return index
+            return self.build_vector_index()
+
+    def _iter_chunk_texts(self, batch_size: int = 1000) -> Iterator[Tuple[int, int, str]]:
+        """ 키워드 인덱스 구축용으로 이 테넌트의 모든 청크 (id, post_id, 본문)를 배치 단위로 읽어옴 """
+        with self._acquire() as connection, connection.cursor() as cursor:
+            cursor.arraysize = batch_size
+            cursor.outputtypehandler = _fetch_lobs_as_values
+            cursor.execute("SELECT id, post_id, chunk_text FROM chunks WHERE tenant_id = :tenant_id ORDER BY id",
+                           {'tenant_id': self.tenant_id})
+            while True:
+                rows = cursor.fetchmany()
+                if not rows:
+                    break
+                for chunk_id, post_id, chunk_text in rows:
+                    yield int(chunk_id), int(post_id), chunk_text or ""
+
+    @metrics.timed('db')
+    def build_lexical_index(self) -> lexical_index.LexicalIndex:
+        """ 이 테넌트의 청크 전체로 키워드(BM25) 인덱스를 새로 만들고 디스크에 저장한 뒤 프로세스 캐시에 등록 """
+        signature = self.get_chunks_signature()
+        index = lexical_index.LexicalIndex()
+        for chunk_id, post_id, chunk_text in self._iter_chunk_texts():
+            index.add(chunk_id, post_id, chunk_text)
+        index.signature = signature
+        index.save(self.vector_index_dir, self.vector_index_key)
+        lexical_index.set_cached_index(self.vector_index_key, index)
+        logger.info("테넌트 %s의 키워드(BM25) 인덱스 구축 완료 (%d개 청크).", self.tenant_id, len(index))
+        return index
+
+    def get_lexical_index(self) -> lexical_index.LexicalIndex:
+        """ get_vector_index와 같은 방식(프로세스 캐시 → 디스크 파일 → chunks 테이블)으로 키워드 인덱스를 확보 """
+        key = self.vector_index_key
+        index = lexical_index.get_cached_index(key)
+        if index is not None and time.monotonic() - self._lexical_checked_at < self.vector_index_refresh_seconds:
+            return index
+
+        with self._lexical_lock:
+            signature = self.get_chunks_signature()
+            self._lexical_checked_at = time.monotonic()
+            index = lexical_index.get_cached_index(key)
+            if index is not None and index.signature == signature:
+                return index
+            index = lexical_index.load_index(key, self.vector_index_dir)
+            if index is not None and index.signature == signature:
+                return index
+            return self.build_lexical_index()
+
+    def save_lexical_index(self):
+        """ 증분 갱신된 키워드 인덱스를 디스크에 저장하여 다른 프로세스(API)가 재구축 없이 읽도록 함 """
+        self.get_lexical_index().save(self.vector_index_dir, self.vector_index_key)
+
+    @metrics.timed('db')
+    def get_chunk_texts(self, chunk_ids: List[int]) -> Dict[int, str]:
+        """ 지정한 청크 id들의 본문만 한 번의 쿼리로 조회 """
+        if not chunk_ids:
+            return {}
+        binds = {f"id{i}": chunk_id for i, chunk_id in enumerate(chunk_ids)}
+        sql = f"SELECT id, chunk_text FROM chunks WHERE tenant_id = :tenant_id AND id IN ({', '.join(':' + name for name in binds)})"
+        result = self._execute_sql(sql, {'tenant_id': self.tenant_id, **binds}) or []
+        return {int(row[0]): row[1] for row in result}
+
+    @metrics.timed('db')
+    def find_similar_chunks(self, query_vector: list, k: int = 5) -> List[Tuple[int, str, float]]:
+        """
+        질문 벡터와 가까운 청크를 (chunk_id, chunk_text, L2 거리) 튜플로 거리 오름차순 반환.
+        점수 방향이 search_chunks와 반대로 작을수록 유사하다 (정규화 벡터 기준 0~2, 코사인 유사도 = 1 - 거리² / 2).
+        """
+        if self.vector_search_backend == "scan":
+            return self._scan_similar_chunks(query_vector, k)
+        if self.vector_search_backend == "oracle":
+            try:
+                return self._find_similar_chunks_in_db(query_vector, k)
+            except oracledb.Error as e:
+                logger.warning("DB 벡터 검색 실패, '%s' 인덱스로 대체합니다: %s", self.vector_index_backend, e)
+
+        hits = self.get_vector_index().search(np.asarray(query_vector, dtype=np.float32), k)
+        texts = self.get_chunk_texts([chunk_id for chunk_id, _ in hits])
+        # 인덱스 갱신 주기 사이에 삭제된 청크는 결과에서 제외
+        return [(chunk_id, texts[chunk_id], distance) for chunk_id, distance in hits if chunk_id in texts]
+
+    @metrics.timed('db')
+    def search_chunks(self, query_text: str, query_vector: list, k: int = 5) -> List[Tuple[int, str, float]]:
+        """
+        질문과 관련된 청크를 (chunk_id, chunk_text, 코사인 유사도) 튜플로 관련도 순으로 반환.
+        점수는 find_similar_chunks의 L2 거리와 반대로 클수록 관련되며, FAQ 검색 점수와 같은 척도라 컨텍스트 예산에서 함께 비교된다.
+        벡터 검색과 키워드(BM25) 검색의 상위 후보를 reciprocal rank fusion으로 합쳐 순서를 정하여, 임베딩만으로는 잘 잡히지 않는
+        상품명·전화번호·가격이 들어간 청크도 적은 k 안에 들어오도록 한다. 키워드로만 찾은 청크는 벡터 후보 밖에 있었으므로
+        유사도를 벡터 후보 중 가장 낮은 유사도(그 청크 유사도의 상한)로 둔다.
+        HYBRID_SEARCH_CANDIDATES=0이면 find_similar_chunks의 결과를 유사도로 바꿔 반환한다.
+        """
+        if self.hybrid_search_candidates <= 0:
+            return [
+                (chunk_id, text, vector_index.l2_to_similarity(distance))
+                for chunk_id, text, distance in self.find_similar_chunks(query_vector, k)
+            ]
+        candidates = max(k, self.hybrid_search_candidates)
+        vector_hits = self.find_similar_chunks(query_vector, candidates)
+        try:
+            with metrics.span('db', 'lexical_search'):
+                lexical_hits = self.get_lexical_index().search(query_text, candidates)
+        except Exception as e:
+            logger.warning("키워드 검색 실패, 벡터 검색 결과만 사용합니다: %s", e)
+            lexical_hits = []
+        fused = lexical_index.reciprocal_rank_fusion(
+            [[chunk_id for chunk_id, _, _ in vector_hits], [chunk_id for chunk_id, _ in lexical_hits]], self.rrf_k
+        )[:k]
+        texts = {chunk_id: text for chunk_id, text, _ in vector_hits}
+        texts.update(self.get_chunk_texts([chunk_id for chunk_id, _ in fused if chunk_id not in texts]))
+        similarities = {chunk_id: vector_index.l2_to_similarity(distance) for chunk_id, _, distance in vector_hits}
+        floor = min(similarities.values(), default=0.0)
+        # 인덱스 갱신 주기 사이에 삭제된 청크는 결과에서 제외
+        return [(chunk_id, texts[chunk_id], similarities.get(chunk_id, floor)) for chunk_id, _ in fused if chunk_id in texts]
+
+    @metrics.timed('db', 'vector_search_oracle')
+    def _find_similar_chunks_in_db(self, query_vector: list, k: int) -> List[Tuple[int, str, float]]:
+        """
+        VECTOR_DISTANCE + FETCH APPROX FIRST로 DB 안에서 상위 k개만 골라 반환 (벡터 인덱스 사용).
+        COSINE 거리(1 - cos)는 정규화 벡터 기준 L2 거리(sqrt(2 * d))로 변환하여 다른 백엔드와 척도를 맞춤.
+        """
+        sql = """
+        SELECT id, chunk_text, VECTOR_DISTANCE(chunk_embedding, :query_vector, COSINE) AS distance
+        FROM chunks
+        WHERE tenant_id = :tenant_id AND chunk_embedding IS NOT NULL
+        ORDER BY distance
+        FETCH APPROX FIRST :k ROWS ONLY
+        """
+        with self._acquire() as connection, connection.cursor() as cursor:
+            cursor.outputtypehandler = _fetch_lobs_as_values
+            cursor.setinputsizes(query_vector=oracledb.DB_TYPE_VECTOR)
+            cursor.execute(sql, {'tenant_id': self.tenant_id, 'query_vector': encode_vector(query_vector, "vector"), 'k': k})
+            rows = cursor.fetchall()
+        return [(int(chunk_id), chunk_text, float(np.sqrt(max(2.0 * float(distance), 0.0)))) for chunk_id, chunk_text, distance in rows]
+
+    @metrics.timed('db', 'vector_search_scan')
+    def _scan_similar_chunks(self, query_vector: list, k: int = 5) -> List[Tuple[int, str, float]]:
+        """ 인덱스 없이 chunks 테이블 전체를 읽어 거리를 계산하는 기존 방식 (VECTOR_SEARCH_BACKEND=scan) """
         # 모든 청크 데이터를 가져와 Python에서 유사도 계산
-        sql = "SELECT chunk_text, chunk_vector FROM chunks"
-        results = self._execute_sql(sql)
-        print(f"  - [Debug] chunks 테이블에서 {len(results) if results else 0}개의 청크를 가져왔습니다.")
+        sql = f"SELECT id, chunk_text, {self._vector_select_columns()} FROM chunks WHERE tenant_id = :tenant_id"
+        results = self._execute_sql(sql, {'tenant_id': self.tenant_id})
+        logger.debug("chunks 테이블에서 %d개의 청크를 가져왔습니다.", len(results) if results else 0)
 
-        query_np_vector = np.array(query_vector)
+        query_np_vector = np.asarray(query_vector, dtype=np.float32)
         similarities = []
 
         if results:
             for row in results:
-                chunk_text = row[0] if hasattr(row[0], 'read') else row[0]
-                chunk_vector_str = row[1] if hasattr(row[1], 'read') else row[1]
+                chunk_id = int(row[0])
+                chunk_text = row[1]
                 
                 try:
-                    # 문자열 형태의 벡터를 NumPy 배열로 변환
-                    chunk_np_vector = np.array(json.loads(chunk_vector_str))
+                    # 저장 형식(JSON 문자열 / float32 바이트)에 맞게 NumPy 배열로 변환
+                    chunk_np_vector = self._decode_row_vector(row[2:])
+                    if chunk_np_vector is None:
+                        continue
                     
                     # L2 Distance (유클리드 거리) 계산
                     distance = np.linalg.norm(query_np_vector - chunk_np_vector)
-                    similarities.append((chunk_text, distance))
+                    similarities.append((chunk_id, chunk_text, float(distance)))
                 except json.JSONDecodeError as e:
-                    print(f"❌ 벡터 문자열 파싱 오류: {e} - {chunk_vector_str[:100]}...") # 오류나는 문자열 일부 출력
+                    logger.warning("벡터 문자열 파싱 오류: %s (chunk %s)", e, chunk_id)
                     continue
                 except Exception as e:
-                    print(f"❌ 유사도 계산 중 예기치 않은 오류: {e}")
+                    logger.warning("유사도 계산 중 예기치 않은 오류: %s", e)
                     continue
         
         # 거리가 짧은 순서대로 정렬하고 상위 k개 반환
-        similarities.sort(key=lambda x: x[1])
+        similarities.sort(key=lambda x: x[2])
         return similarities[:k]
 
     def close(self):
-        if self.pool: 
+        # for_tenant로 얻은 인스턴스는 풀을 공유하므로 원래 인스턴스에서만 닫음
+        if self.pool and self._owns_pool:
             self.pool.close()
             print("🔌 Oracle Cloud ATP 연결 풀을 닫았습니다.")
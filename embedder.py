@@ -1,26 +1,247 @@
 # embedder.py
 import os
+import time
+import logging
+import queue
+import random
+import threading
 import numpy as np
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings
+from embedding_cache import EmbeddingCache, DEFAULT_CACHE_PATH
+import metrics
+
+logger = logging.getLogger(__name__)
+
+try:
+  import tiktoken # 선택 의존성: 없으면 글자 수로 토큰 수를 어림잡음
+except ImportError:
+  tiktoken = None
 
 class Embedder:
-  """ 텍스트 분할 및 OpenAI 임베딩 생성을 담당 """
+  """ 텍스트 분할 및 OpenAI 임베딩 생성을 담당 (임베딩 캐시 적용) """
   def __init__(self):
     if not os.getenv("OPENAI_API_KEY"): raise ValueError(".env 파일에 OPENAI_API_KEY가 설정되지 않았습니다.")
     self.text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-    self.embedding_model = OpenAIEmbeddings(model="text-embedding-3-small")
-    print("✅ OpenAI 임베딩 모델 'text-embedding-3-small' 로드 완료.")
+    self.model_name = "text-embedding-3-small"
+    self.embedding_model = OpenAIEmbeddings(model=self.model_name)
+    # 한 번 임베딩한 텍스트는 (모델명, sha256) 기준으로 재사용. EMBEDDING_CACHE_PATH를 비우면 메모리 계층만 사용
+    self.cache = EmbeddingCache(
+      self.model_name,
+      path=os.getenv("EMBEDDING_CACHE_PATH", DEFAULT_CACHE_PATH) or None,
+      memory_size=int(os.getenv("EMBEDDING_CACHE_MEMORY_SIZE", "10000")),
+      max_entries=int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000")),
+    )
+    self._encoding = None # tiktoken 인코딩 (count_tokens에서 처음 사용할 때 로드)
+    logger.info("OpenAI 임베딩 모델 '%s' 로드 완료.", self.model_name)
 
   def split_text(self, text: str) -> List[str]:
     return self.text_splitter.split_text(text)
     # return [text]
 
-  def embed_texts(self, texts: List[str]) -> List[np.ndarray]:
+  def count_tokens(self, text: str) -> int:
+    if self._encoding is None:
+      self._encoding = tiktoken.encoding_for_model(self.model_name) if tiktoken else False
+    if not self._encoding:
+      return len(text) # tiktoken이 없으면 보수적으로 1글자 = 1토큰 (한글은 대체로 이보다 적음)
+    return len(self._encoding.encode(text, disallowed_special=()))
+
+  @metrics.timed('embedder', 'embed_api')
+  def embed_uncached(self, texts: List[str]) -> List[np.ndarray]:
+    """ 캐시를 거치지 않고 API로 임베딩한 뒤 캐시에 저장 """
     # embed_documents는 List[List[float]]를 반환하므로, 각 요소를 np.ndarray로 변환
-    return [np.array(emb) for emb in self.embedding_model.embed_documents(texts)]
+    vectors = [np.array(emb, dtype=np.float32) for emb in self.embedding_model.embed_documents(texts)]
+    self.cache.put_many(texts, vectors)
+    return vectors
+
+  def embed_texts(self, texts: List[str]) -> List[np.ndarray]:
+    cached = self.cache.get_many(texts)
+    # 캐시에 없는 텍스트만 (중복 제거 후) API로 요청
+    missing = list(dict.fromkeys(text for text, vector in zip(texts, cached) if vector is None))
+    if missing:
+      new_vectors = self.embed_uncached(missing)
+      by_text = dict(zip(missing, new_vectors))
+      cached = [vector if vector is not None else by_text[text] for text, vector in zip(texts, cached)]
+    return cached
  
   def embed_query(self, text: str) -> np.ndarray:
     # 'list' object has no attribute 'read' 오류를 해결하기 위해 text를 명시적으로 문자열로 변환
-    return np.array(self.embedding_model.embed_query(str(text)))
+    text = str(text)
+    cached = self.cache.get_many([text])[0]
+    if cached is not None:
+      return cached
+    vector = np.array(self.embedding_model.embed_query(text), dtype=np.float32)
+    self.cache.put_many([text], [vector])
+    return vector
+
+  async def aembed_query(self, text: str) -> np.ndarray:
+    """ embed_query의 비동기 버전 (캐시 미스일 때만 OpenAI 비동기 호출) """
+    text = str(text)
+    cached = self.cache.get_many([text])[0]
+    if cached is not None:
+      return cached
+    vector = np.array(await self.embedding_model.aembed_query(text), dtype=np.float32)
+    self.cache.put_many([text], [vector])
+    return vector
+
+  def get_cache_stats(self):
+    return self.cache.get_stats()
+
+
+def _is_rate_limit_error(error: Exception) -> bool:
+  return getattr(error, 'status_code', None) == 429 or type(error).__name__ == 'RateLimitError'
+
+class TokenRateLimiter:
+  """ 분당 토큰 한도(tokens_per_minute)를 넘지 않도록 요청 전에 대기하는 토큰 버킷 (0이면 제한 없음) """
+  def __init__(self, tokens_per_minute: int):
+    self.capacity = tokens_per_minute
+    self.available = float(tokens_per_minute)
+    self.updated_at = time.monotonic()
+    self._lock = threading.Lock()
+
+  def acquire(self, tokens: int):
+    if self.capacity <= 0:
+      return
+    tokens = min(tokens, self.capacity) # 한도보다 큰 배치도 가득 찬 버킷 하나로는 보낼 수 있도록
+    while True:
+      with self._lock:
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated_at) * self.capacity / 60.0)
+        self.updated_at = now
+        if self.available >= tokens:
+          self.available -= tokens
+          return
+        wait = (tokens - self.available) * 60.0 / self.capacity
+      time.sleep(wait)
+
+class _PendingItem:
+  def __init__(self, item: Any, texts: List[str]):
+    self.item = item
+    self.vectors: List[Optional[np.ndarray]] = [None] * len(texts)
+    self.remaining = len(texts)
+    self.error: Optional[Exception] = None
+
+class EmbeddingPipeline:
+  """
+  여러 게시글의 청크를 모아 토큰 예산(tiktoken 기준) 단위 배치로 임베딩 API를 동시에 호출하는 단계.
+  submit(item, texts)로 넣은 항목은 모든 텍스트의 임베딩이 끝나면 (item, vectors, error)로 output 큐에 들어가며,
+  output은 크기가 제한되어 있어 DB 저장이 밀리면 임베딩도 그만큼만 앞서 나간다. close() 후 마지막에 None이 들어간다.
+  - 캐시에 있는 텍스트는 API로 보내지 않고, 여러 게시글에 같은 텍스트가 있으면 한 번만 요청
+  - 429(rate limit) 응답은 지수 백오프로 재시도
+  """
+  def __init__(self, embedder: Embedder, max_batch_tokens: Optional[int] = None, max_batch_size: Optional[int] = None,
+               concurrency: Optional[int] = None, tokens_per_minute: Optional[int] = None, max_retries: int = 6,
+               queue_size: int = 16):
+    self.embedder = embedder
+    # OpenAI 임베딩 요청 한도(요청당 입력 2048개, 약 30만 토큰)보다 충분히 작게
+    self.max_batch_tokens = max_batch_tokens or int(os.getenv("EMBEDDING_BATCH_TOKENS", "100000"))
+    self.max_batch_size = max_batch_size or int(os.getenv("EMBEDDING_BATCH_SIZE", "512"))
+    self.concurrency = max(1, concurrency or int(os.getenv("EMBEDDING_CONCURRENCY", "4")))
+    if tokens_per_minute is None:
+      tokens_per_minute = int(os.getenv("EMBEDDING_TOKENS_PER_MINUTE", "1000000"))
+    self.rate_limiter = TokenRateLimiter(tokens_per_minute)
+    self.max_retries = max_retries
+    self.output: "queue.Queue[Optional[Tuple[Any, Optional[List[np.ndarray]], Optional[Exception]]]]" = queue.Queue(maxsize=queue_size)
+    self.stats = {'texts': 0, 'cached': 0, 'requested': 0, 'batches': 0, 'tokens': 0, 'retries': 0}
+
+    self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="embedding")
+    self._in_flight = threading.BoundedSemaphore(self.concurrency * 2) # 동시에 진행 중인 배치 수 제한
+    self._lock = threading.Lock()
+    self._waiters: Dict[str, List[Tuple[_PendingItem, int]]] = {} # 텍스트 → 그 임베딩을 기다리는 (항목, 위치)
+    self._batch: List[str] = []
+    self._batch_tokens = 0
+
+  def submit(self, item: Any, texts: List[str]):
+    """ 항목(예: 저장할 게시글)과 임베딩할 텍스트 목록을 파이프라인에 넣음. 배치가 가득 차면 요청을 보냄 """
+    pending = _PendingItem(item, texts)
+    cached = self.embedder.cache.get_many(texts) if texts else []
+    ready_batches = []
+    with self._lock:
+      self.stats['texts'] += len(texts)
+      for index, (text, vector) in enumerate(zip(texts, cached)):
+        if vector is not None:
+          pending.vectors[index] = vector
+          pending.remaining -= 1
+          self.stats['cached'] += 1
+          continue
+        waiters = self._waiters.setdefault(text, [])
+        waiters.append((pending, index))
+        if len(waiters) > 1:
+          continue # 같은 텍스트가 이미 배치에 있거나 요청 중
+        tokens = self.embedder.count_tokens(text)
+        if self._batch and (self._batch_tokens + tokens > self.max_batch_tokens or len(self._batch) >= self.max_batch_size):
+          ready_batches.append(self._take_batch())
+        self._batch.append(text)
+        self._batch_tokens += tokens
+      if self._batch_tokens >= self.max_batch_tokens or len(self._batch) >= self.max_batch_size:
+        ready_batches.append(self._take_batch())
+      done = pending.remaining == 0
+
+    if done:
+      self.output.put((pending.item, pending.vectors, None))
+    for batch, tokens in ready_batches:
+      self._dispatch(batch, tokens)
+
+  def close(self):
+    """ 남은 배치를 보내고 모든 요청이 끝날 때까지 기다린 뒤 output에 종료 신호(None)를 넣음 """
+    with self._lock:
+      batch = self._take_batch() if self._batch else None
+    if batch:
+      self._dispatch(*batch)
+    self._executor.shutdown(wait=True)
+    self.output.put(None)
+
+  def _take_batch(self) -> Tuple[List[str], int]:
+    batch, tokens = self._batch, self._batch_tokens
+    self._batch, self._batch_tokens = [], 0
+    return batch, tokens
+
+  def _dispatch(self, batch: List[str], tokens: int):
+    self._in_flight.acquire() # 진행 중인 배치가 많으면 여기서 대기 (역압)
+    try:
+      self._executor.submit(self._run_batch, batch, tokens)
+    except Exception:
+      self._in_flight.release()
+      raise
+
+  def _run_batch(self, batch: List[str], tokens: int):
+    try:
+      vectors, error = None, None
+      for attempt in range(self.max_retries + 1):
+        self.rate_limiter.acquire(tokens)
+        try:
+          vectors = self.embedder.embed_uncached(batch)
+          break
+        except Exception as e:
+          if not _is_rate_limit_error(e) or attempt == self.max_retries:
+            error = e
+            break
+          delay = min(60.0, 2 ** attempt) + random.uniform(0, 1)
+          logger.warning("임베딩 요청 한도 초과(429), %.1f초 후 재시도합니다.", delay)
+          with self._lock:
+            self.stats['retries'] += 1
+          time.sleep(delay)
+      self._complete(batch, vectors, error, tokens)
+    finally:
+      self._in_flight.release()
+
+  def _complete(self, batch: List[str], vectors: Optional[List[np.ndarray]], error: Optional[Exception], tokens: int):
+    finished = []
+    with self._lock:
+      self.stats['batches'] += 1
+      if vectors is not None:
+        self.stats['requested'] += len(batch)
+        self.stats['tokens'] += tokens
+      for position, text in enumerate(batch):
+        for pending, index in self._waiters.pop(text, []):
+          if vectors is not None:
+            pending.vectors[index] = vectors[position]
+          else:
+            pending.error = error
+          pending.remaining -= 1
+          if pending.remaining == 0:
+            finished.append(pending)
+    for pending in finished:
+      self.output.put((pending.item, None if pending.error else pending.vectors, pending.error))
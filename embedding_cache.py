@@ -0,0 +1,143 @@
+# embedding_cache.py
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "embedding_cache.sqlite3")
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    (모델명, 텍스트 sha256)을 키로 임베딩 벡터를 보관하는 2단 캐시.
+    - 메모리 계층: 최근 사용 순서(LRU)로 memory_size개까지 유지
+    - 영속 계층: 로컬 SQLite 파일. max_entries를 넘으면 가장 오래 사용되지 않은 항목부터 삭제
+    """
+
+    def __init__(self, model_name: str, path: Optional[str] = DEFAULT_CACHE_PATH,
+                 memory_size: int = 10000, max_entries: int = 200000):
+        self.model_name = model_name
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0}
+        self._disk_entries: Optional[int] = None  # 영속 계층 항목 수 추정치 (처음 한 번만 COUNT, 이후 쓰기마다 더해 감)
+
+        self._conn = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL") # 여러 프로세스(API, crawl)가 동시에 읽고 쓸 수 있도록
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (model, text_hash)
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_access_idx ON embeddings (last_access)")
+            self._conn.commit()
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """ 텍스트 목록에 대한 캐시된 벡터 목록 (없으면 None) """
+        keys = [text_hash(text) for text in texts]
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+            self.stats['memory_hits'] += sum(1 for key in keys if key in found)
+
+            missing = list({key for key in keys if key not in found})
+            if missing and self._conn is not None:
+                for i in range(0, len(missing), 500): # SQLite 바인드 변수 개수 제한 대비
+                    batch = missing[i:i + 500]
+                    rows = self._conn.execute(
+                        f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({', '.join('?' * len(batch))})",
+                        [self.model_name, *batch]
+                    ).fetchall()
+                    for key, blob in rows:
+                        vector = np.frombuffer(blob, dtype=np.float32)
+                        found[key] = vector
+                        self._remember(key, vector)
+                disk_keys = {key for key in missing if key in found}
+                if disk_keys:
+                    now = time.time()
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_access = ? WHERE model = ? AND text_hash = ?",
+                        [(now, self.model_name, key) for key in disk_keys]
+                    )
+                    self._conn.commit()
+                self.stats['disk_hits'] += sum(1 for key in keys if key in disk_keys)
+            self.stats['misses'] += sum(1 for key in keys if key not in found)
+        return [found.get(key) for key in keys]
+
+    def put_many(self, texts: List[str], vectors: List[np.ndarray]):
+        rows = []
+        now = time.time()
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = text_hash(text)
+                vector = np.asarray(vector, dtype=np.float32)
+                self._remember(key, vector)
+                rows.append((self.model_name, key, vector.tobytes(), now))
+            if self._conn is not None and rows:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_access) VALUES (?, ?, ?, ?)", rows
+                )
+                self._evict(len(rows))
+                self._conn.commit()
+
+    def _count_entries(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def _evict(self, inserted: int):
+        # 매 쓰기마다 COUNT(*)로 테이블 전체를 세지 않도록 항목 수를 메모리에서 추정.
+        # INSERT OR REPLACE로 덮어쓴 행도 더하므로 추정치는 실제보다 크거나 같고, 상한을 넘었을 때만 다시 센다
+        # (다른 프로세스가 쓴 행은 그때 반영됨)
+        if self._disk_entries is None:
+            self._disk_entries = self._count_entries()
+        else:
+            self._disk_entries += inserted
+        if self._disk_entries <= self.max_entries:
+            return
+        count = self._disk_entries = self._count_entries()
+        if count <= self.max_entries:
+            return
+        # 상한을 넘으면 여유분(10%)까지 한 번에 지워 매 쓰기마다 삭제가 일어나지 않도록 함
+        to_delete = count - int(self.max_entries * 0.9)
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY last_access LIMIT ?)",
+            (to_delete,)
+        )
+        self._disk_entries = count - to_delete
+        self.stats['evictions'] += to_delete
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats['memory_entries'] = len(self._memory)
+        return stats
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,188 @@
+# lexical_index.py
+import os
+import re
+import math
+import heapq
+import pickle
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# 한글 음절 연속 구간 | 영문/숫자 단어(모델명 gv80, 가격 35,000, 배기량 2.0 등) | 전화번호
+_TOKEN_PATTERN = re.compile(r"[가-힣]+|[0-9a-z]+(?:[.,][0-9]+)*")
+_PHONE_PATTERN = re.compile(r"\d{2,4}-\d{3,4}-\d{4}")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    형태소 분석기 없이 한국어를 색인하기 위한 토큰화.
+    - 한글은 음절 바이그램('타이어는' → 타이, 이어, 어는)으로 나눠 조사/어미가 붙어도 어간이 일치하도록 함 (한 글자 단어는 그대로)
+    - 영문/숫자는 소문자 단어 단위로, 숫자의 천 단위 쉼표는 제거 (35,000 → 35000)
+    - 전화번호는 하이픈을 뺀 숫자열도 함께 색인 (010-1234-5678 → 01012345678)
+    """
+    text = (text or "").lower()
+    tokens = []
+    for match in _TOKEN_PATTERN.finditer(text):
+        word = match.group()
+        if "가" <= word[0] <= "힣":
+            if len(word) == 1:
+                tokens.append(word)
+            else:
+                tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word.replace(",", ""))
+    tokens.extend(phone.replace("-", "") for phone in _PHONE_PATTERN.findall(text))
+    return tokens
+
+
+class LexicalIndex:
+    """
+    chunk_text에 대한 BM25 역색인. 청크 단위로 추가/삭제할 수 있어 게시글을 저장할 때마다 증분 갱신된다.
+    search는 (chunk_id, BM25 점수)를 점수 내림차순으로 반환.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.signature: Optional[str] = None  # 인덱스에 반영된 시점의 chunks 상태 (get_chunks_signature)
+        self._postings: Dict[str, Dict[int, int]] = {}  # 토큰 → {chunk_id: 빈도}
+        self._doc_terms: Dict[int, Dict[str, int]] = {}  # chunk_id → {토큰: 빈도} (삭제 시 역색인에서 빼기 위함)
+        self._doc_lengths: Dict[int, int] = {}
+        self._doc_posts: Dict[int, int] = {}  # chunk_id → post_id
+        self._post_docs: Dict[int, Set[int]] = {}  # post_id → chunk_id 집합 (게시글 청크 전체 교체용)
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def add(self, chunk_id: int, post_id: int, text: str):
+        terms = dict(Counter(tokenize(text)))
+        with self._lock:
+            self._remove(chunk_id)
+            self._doc_terms[chunk_id] = terms
+            self._doc_lengths[chunk_id] = length = sum(terms.values())
+            self._doc_posts[chunk_id] = post_id
+            self._post_docs.setdefault(post_id, set()).add(chunk_id)
+            self._total_length += length
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {})[chunk_id] = tf
+
+    def remove(self, chunk_ids: Iterable[int]):
+        with self._lock:
+            for chunk_id in chunk_ids:
+                self._remove(chunk_id)
+
+    def remove_post(self, post_id: int):
+        """ 게시글의 청크를 모두 삭제 (청크 전체 교체 시) """
+        with self._lock:
+            for chunk_id in list(self._post_docs.get(post_id, ())):
+                self._remove(chunk_id)
+
+    def _remove(self, chunk_id: int):
+        terms = self._doc_terms.pop(chunk_id, None)
+        if terms is None:
+            return
+        self._total_length -= self._doc_lengths.pop(chunk_id)
+        post_id = self._doc_posts.pop(chunk_id)
+        post_docs = self._post_docs.get(post_id)
+        if post_docs is not None:
+            post_docs.discard(chunk_id)
+            if not post_docs:
+                del self._post_docs[post_id]
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(chunk_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        query_terms = set(tokenize(query))
+        with self._lock:
+            n_docs = len(self._doc_terms)
+            if not n_docs or not query_terms or k <= 0:
+                return []
+            avg_length = self._total_length / n_docs or 1.0
+            scores: Dict[int, float] = {}
+            for term in query_terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1.0 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for chunk_id, tf in postings.items():
+                    norm = self.k1 * (1.0 - self.b + self.b * self._doc_lengths[chunk_id] / avg_length)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1.0) / (tf + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    @staticmethod
+    def _path(index_dir: str, index_key: str) -> str:
+        return os.path.join(index_dir, f"lexical_index_{index_key}.pkl")
+
+    def save(self, index_dir: str, index_key: str):
+        os.makedirs(index_dir, exist_ok=True)
+        path = self._path(index_dir, index_key)
+        with self._lock:
+            state = {'signature': self.signature, 'k1': self.k1, 'b': self.b,
+                     'docs': {chunk_id: (self._doc_posts[chunk_id], terms) for chunk_id, terms in self._doc_terms.items()}}
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".tmp", path)  # 다른 프로세스가 반쯤 쓰인 파일을 읽지 않도록 원자적으로 교체
+
+    @classmethod
+    def load(cls, index_dir: str, index_key: str) -> Optional["LexicalIndex"]:
+        path = cls._path(index_dir, index_key)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        index = cls(state['k1'], state['b'])
+        for chunk_id, (post_id, terms) in state['docs'].items():
+            index._doc_terms[chunk_id] = terms
+            index._doc_lengths[chunk_id] = length = sum(terms.values())
+            index._doc_posts[chunk_id] = post_id
+            index._post_docs.setdefault(post_id, set()).add(chunk_id)
+            index._total_length += length
+            for term, tf in terms.items():
+                index._postings.setdefault(term, {})[chunk_id] = tf
+        index.signature = state['signature']
+        return index
+
+
+def reciprocal_rank_fusion(rankings: List[List[int]], k: int = 60) -> List[Tuple[int, float]]:
+    """ 여러 순위 목록(chunk_id, 좋은 순)을 RRF 점수 Σ 1 / (k + 순위)로 합쳐 점수 내림차순으로 반환 """
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking, start=1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+# 프로세스 단위 인덱스 캐시: index_key(테넌트) -> LexicalIndex. 최근 사용 순서(LRU)로 LEXICAL_INDEX_CACHE_SIZE개까지 유지
+INDEX_CACHE_SIZE = int(os.getenv("LEXICAL_INDEX_CACHE_SIZE", "64"))
+_loaded_indexes: "OrderedDict[str, LexicalIndex]" = OrderedDict()
+_loaded_lock = threading.Lock()
+
+
+def get_cached_index(index_key: str) -> Optional[LexicalIndex]:
+    with _loaded_lock:
+        index = _loaded_indexes.get(index_key)
+        if index is not None:
+            _loaded_indexes.move_to_end(index_key)
+        return index
+
+
+def set_cached_index(index_key: str, index: LexicalIndex):
+    with _loaded_lock:
+        _loaded_indexes[index_key] = index
+        _loaded_indexes.move_to_end(index_key)
+        while len(_loaded_indexes) > max(1, INDEX_CACHE_SIZE):
+            _loaded_indexes.popitem(last=False)
+
+
+def load_index(index_key: str, index_dir: str) -> Optional[LexicalIndex]:
+    """ 디스크에 저장된 인덱스를 읽어 프로세스 캐시에 등록. 파일이 없으면 None """
+    index = LexicalIndex.load(index_dir, index_key)
+    if index is not None:
+        set_cached_index(index_key, index)
+    return index
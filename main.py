@@ -1,6 +1,7 @@
 # main.py
 import os
 import argparse
+import threading
 import hashlib
 from dotenv import load_dotenv
 from tqdm import tqdm
@@ -8,10 +9,13 @@ import oracledb
 import urllib.parse # Add this import
 import json
 import numpy as np # Add this import
-from database import OracleManager
+from database import OracleManager, chunk_hash
 from crawler import BlogCrawler
-from embedder import Embedder
-from chatbot_service import ChatbotService
+from crawl_scheduler import CrawlScheduler
+from crawl_jobs import CrawlJobTracker
+from embedder import Embedder, EmbeddingPipeline
+from chatbot_service import ChatbotService, embed_faq_questions
+import metrics
 
 def clear_screen():
     os.system('cls' if os.name == 'nt' else 'clear')
@@ -38,56 +42,273 @@ def onboard_command():
         a = input(f"  - 답변(A) for '{q}': "); faqs.append({'q': q, 'a': a})
     marketing_info = input("\n5. 현재 진행중인 이벤트나 마케팅 문구가 있나요? ")
     info = {'business_name': business_name, 'blog_url': blog_url, 'chatbot_personality': chatbot_personality, 'faqs': faqs, 'marketing_info': marketing_info}
+    if faqs:
+        print("\n  - FAQ 질문을 임베딩하는 중...")
+        info['faq_vectors'] = embed_faq_questions(Embedder(), faqs) # 질문 시마다 FAQ를 다시 임베딩하지 않도록 저장
     db.save_business_info(info); db.close()
     print("\n" + "="*50 + "\n🎉 온보딩이 완료되었습니다!\n" + "="*50)
 
+def plan_chunk_changes(chunks, stored_chunk_ids_by_hash):
+    """
+    새로 분할한 청크와 DB에 저장된 청크(chunk_hash → id 목록)를 비교.
+    반환: (재사용 청크 수, 새로 임베딩할 (본문, 해시) 목록, 삭제할 청크 id 목록)
+    """
+    remaining = {h: list(ids) for h, ids in stored_chunk_ids_by_hash.items()}
+    reused, added = 0, []
+    for text in chunks:
+        h = chunk_hash(text)
+        if remaining.get(h):
+            remaining[h].pop()
+            reused += 1
+        else:
+            added.append((text, h))
+    stale_ids = [chunk_id for ids in remaining.values() for chunk_id in ids]
+    return reused, added, stale_ids
+
+LISTING_KEYS = ('log_no', 'add_date', 'modify_date')
+
+REVALIDATE_MODES = ('auto', 'all', 'never')
+
+def plan_post_fetches(posts_meta, crawl_states, stats, revalidate='auto', tracker=None):
+    """
+    게시글 목록의 메타데이터(logNo, 제목, 작성/수정일)를 DB에 저장된 상태와 비교해 본문을 받을 게시글만 내보내는 제너레이터.
+    목록이 그대로인 게시글 중 아래 revalidate 대상은 저장된 ETag/Last-Modified로 조건부 요청을 보내(대부분 304, 본문 없음)
+    목록에 드러나지 않는 본문 수정까지 확인하고, 나머지는 페이지를 열지 않고 건너뛴다.
+    - auto(기본값): 수정일(modifyDate)이 저장되지 않은 게시글만 확인. 목록에 수정일이 없으면 수정 여부를 알 수 없기 때문
+    - all: 목록이 그대로인 게시글을 모두 확인
+    - never: 요청 없이 모두 건너뜀. 가장 빠르지만 목록에 드러나지 않는 수정은 게시글 제목/수정일이 바뀔 때까지 반영되지 않음
+    stats['listed'], stats['skipped']에 목록 게시글 수와 건너뛴 수를 누적하고, tracker가 있으면 건너뛴 게시글을 기록.
+    """
+    if revalidate not in REVALIDATE_MODES:
+        raise ValueError(f"revalidate는 {', '.join(REVALIDATE_MODES)} 중 하나여야 합니다.")
+    for post_meta in posts_meta:
+        stats['listed'] += 1
+        stored = crawl_states.get(post_meta['url'])
+        listing_unchanged = bool(stored and stored['content_hash'] and stored['title'] == post_meta['title']) and all(
+            (stored.get(key) or None) == (post_meta.get(key) or None) for key in LISTING_KEYS
+        )
+        if not listing_unchanged:
+            yield post_meta
+        elif revalidate == 'never' or (revalidate == 'auto' and stored.get('modify_date')):
+            stats['skipped'] += 1
+            if tracker:
+                tracker.mark(post_meta['url'], 'skipped')
+        elif stored.get('etag') or stored.get('last_modified'):
+            yield {**post_meta, 'validators': {'etag': stored.get('etag'), 'last_modified': stored.get('last_modified')}}
+        else:
+            yield post_meta # 검증자가 없으면 본문을 받아 해시로 비교
+
+def write_embedded_posts(db, pipeline, write_batch_size, stats, tracker):
+    """
+    crawl_command의 DB 저장 스레드: EmbeddingPipeline의 결과(게시글, 새 청크 임베딩)를 받아
+    게시글 write_batch_size개씩 한 트랜잭션으로 저장. 파이프라인이 종료 신호(None)를 보내면 남은 게시글을 저장하고 끝낸다.
+    """
+    pending_posts = []
+
+    def mark_failed(post_url, reason):
+        try:
+            tracker.mark(post_url, 'failed', reason)
+        except Exception as e:
+            tqdm.write(f"  - ⚠️ 작업 상태 기록 실패: {post_url}, {e}")
+
+    def flush_pending_posts():
+        if not pending_posts:
+            return
+        batch = pending_posts[:]
+        pending_posts.clear()
+        try:
+            db.upsert_posts_with_chunks(batch)
+        except Exception as e:
+            # 배치 전체가 롤백되므로 해시도 저장되지 않아 다음 크롤링에서 다시 처리됨
+            tqdm.write(f"  - ❌ 게시글 {len(batch)}개 일괄 저장 실패 (롤백됨): {e}")
+            for post in batch:
+                mark_failed(post['post_url'], f"DB 저장 실패: {e}")
+            return
+        stats['written_posts'] += len(batch)
+        total_chunks = sum(len(post['chunks']) for post in batch)
+        tqdm.write(f"  > 게시글 {len(batch)}개 및 새 청크 {total_chunks}개 저장 완료.")
+        for post in batch:
+            tracker.mark(post['post_url'], 'stored')
+
+    def handle_result(post, vectors, error):
+        if error is not None:
+            tqdm.write(f"  - ❌ 임베딩 실패로 저장하지 않습니다 (다음 크롤링에서 다시 처리됨): {post['post_url']}, {error}")
+            mark_failed(post['post_url'], f"임베딩 실패: {error}")
+            return
+        tracker.mark(post['post_url'], 'embedded')
+        post['chunks'] = [
+            {"chunk_text": text, "chunk_hash": h, "embedding": emb}
+            for (text, h), emb in zip(post.pop('added_chunks'), vectors)
+        ]
+        pending_posts.append(post)
+        if len(pending_posts) >= write_batch_size:
+            flush_pending_posts()
+
+    # 이 스레드가 예외로 끝나면 EmbeddingPipeline이 가득 찬 output 큐에 put하다 영원히 멈추므로(submit/close 포함),
+    # 게시글 하나를 처리하다 난 오류는 기록만 하고 종료 신호(None)를 받을 때까지 계속 큐를 비운다
+    while True:
+        result = pipeline.output.get()
+        if result is None:
+            break
+        post = result[0]
+        try:
+            handle_result(*result)
+        except Exception as e:
+            tqdm.write(f"  - ❌ 저장 준비 중 오류 발생: {post.get('post_url')}, {e}")
+            mark_failed(post.get('post_url'), f"저장 준비 실패: {e}")
+    try:
+        flush_pending_posts()
+    except Exception as e:
+        tqdm.write(f"  - ❌ 마지막 게시글 저장 후 처리 중 오류 발생: {e}")
+
 def crawl_command(args):
     db = OracleManager()
     info = db.get_business_info()
     if not info or not info.get('blog_url'):
         print("❌ 블로그 URL이 설정되지 않았습니다. 'onboard' 명령을 먼저 실행해주세요."); db.close(); return
     print(f"▶️ '{info['business_name']}'의 블로그({info['blog_url']}) 크롤링을 시작합니다.");
-    crawler = BlogCrawler(); embedder = Embedder()
-    
-    # max_posts 인자를 전달합니다.
+    crawler = BlogCrawler(); embedder = Embedder() # 게시글 목록은 API로만 조회하므로 브라우저를 띄우지 않음
+    crawl_states = db.get_post_crawl_states()
     max_posts_to_crawl = args.max_posts if hasattr(args, 'max_posts') else None
-    all_posts_meta = crawler.crawl_all_posts(info['blog_url'], max_posts=max_posts_to_crawl)
-    
-    if not all_posts_meta:
-        print("⚠️ 크롤링할 게시글이 없습니다."); crawler.close(); db.close(); return
-        
-    for post_meta in tqdm(all_posts_meta, desc="게시글 처리 중"):
-        # URL 디코딩된 제목을 사용합니다.
-        decoded_title = urllib.parse.unquote(post_meta['title'])
-        try:
-            content_data = crawler.crawl_post_content(post_meta['url'])
-            if not content_data:
-                tqdm.write(f"  - 콘텐츠 없음: '{decoded_title}' 건너뜁니다.")
-                continue
-
-            # content_data가 딕셔너리이므로 JSON 문자열로 변환하여 인코딩합니다.
-            # 이전에 'dict' object has no attribute 'encode' 오류가 발생한 부분입니다.
-            content_text_for_hash = json.dumps(content_data, ensure_ascii=False)
-            new_hash = hashlib.sha256(content_text_for_hash.encode('utf-8')).hexdigest()
-            old_hash = db.get_post_hash(post_meta['url'])
-            
-            # 임베딩을 위해 실제 텍스트 콘텐츠를 사용합니다.
-            content_for_embedding = content_data.get('content', '')
 
-            if new_hash == old_hash:
-                tqdm.write(f"  - [변경 없음] '{decoded_title}' 건너뜁니다.")
-                continue
+    # 크롤링 작업(체크포인트): --job-id로 지정하거나(/crawl API), --resume이면 완료되지 않은 최근 작업을 이어서 진행
+    job_id = getattr(args, 'job_id', None) or (db.get_resumable_crawl_job_id() if getattr(args, 'resume', False) else None)
+    job = db.get_crawl_job(job_id) if job_id else None
+    if job and job['status'] == 'completed':
+        print(f"⚠️ 크롤링 작업 #{job_id}은(는) 이미 완료되었습니다."); db.close(); return
+    if job is None:
+        if job_id and getattr(args, 'job_id', None):
+            print(f"❌ 크롤링 작업 #{job_id}을(를) 찾을 수 없습니다."); db.close(); return
+        if getattr(args, 'resume', False):
+            print("ℹ️ 이어서 진행할 크롤링 작업이 없어 새 작업을 시작합니다.")
+        job_id = db.create_crawl_job(info['blog_url'], max_posts_to_crawl)
+    elif job['status'] != 'pending':
+        max_posts_to_crawl = max_posts_to_crawl or job['max_posts']
+        print(f"▶️ 크롤링 작업 #{job_id}을(를) 이어서 진행합니다. (게시글 상태: {job['post_states']})")
+    tracker = CrawlJobTracker(db, job_id)
+    db.update_crawl_job(job_id, status='running')
+    print(f"▶️ 크롤링 작업 id: {job_id}")
+
+    # 목록은 페이지가 도착하는 대로 흘려보내고, 목록 메타데이터가 그대로인 게시글은 본문 요청 없이 건너뜀.
+    # 이어서 진행하는 경우 이미 끝난 게시글은 제외하고, 목록을 끝까지 기록해 두었다면 목록 API도 다시 호출하지 않음
+    if job and job['listing_done']:
+        listing = iter(db.get_crawl_job_posts(job_id, exclude_states=db.CRAWL_POST_DONE_STATES))
+    else:
+        done_urls = set()
+        if job:
+            remaining_urls = {post['url'] for post in db.get_crawl_job_posts(job_id, exclude_states=db.CRAWL_POST_DONE_STATES)}
+            done_urls = {post['url'] for post in db.get_crawl_job_posts(job_id)} - remaining_urls
+        listing = (
+            post_meta for post_meta in tracker.record_listing(crawler.crawl_all_posts(info['blog_url'], max_posts=max_posts_to_crawl))
+            if post_meta['url'] not in done_urls
+        )
+    listing_stats = {'listed': 0, 'skipped': 0}
+    posts_to_fetch = plan_post_fetches(
+        listing, crawl_states, listing_stats, revalidate=getattr(args, 'revalidate', 'auto'), tracker=tracker
+    )
+    unchanged_states = [] # 본문은 그대로지만 목록 메타데이터/검증자를 새로 기록할 게시글
+
+    # 임베딩은 여러 게시글의 청크를 모아 토큰 단위 배치로 동시에 요청하고(EmbeddingPipeline),
+    # 결과는 크기가 제한된 큐를 거쳐 DB 저장 스레드가 게시글 --write-batch-size개씩 한 트랜잭션으로 저장
+    write_batch_size = max(1, getattr(args, 'write_batch_size', 1) or 1)
+    chunk_stats = {'reused': 0, 'added': 0, 'removed': 0, 'written_posts': 0}
+    pipeline = EmbeddingPipeline(embedder)
+    writer = threading.Thread(target=write_embedded_posts, args=(db, pipeline, write_batch_size, chunk_stats, tracker),
+                              name="post-writer", daemon=True)
+    writer.start()
+
+    # 워커 여러 개가 본문을 병렬로 수집하고, 이 루프는 수집이 끝난 순서대로 변경 확인과 청크 분할을 수행
+    scheduler = CrawlScheduler(workers=args.workers)
+    print(f"▶️ 워커 {scheduler.workers}개로 게시글 본문을 수집합니다.")
+    try:
+        for post_meta, content_data in tqdm(scheduler.run(posts_to_fetch), desc="게시글 처리 중"):
+            # URL 디코딩된 제목을 사용합니다.
+            decoded_title = urllib.parse.unquote(post_meta['title'])
+            crawl_state = {'post_url': post_meta['url'], 'title': post_meta['title'], **{key: post_meta.get(key) for key in LISTING_KEYS}}
+            try:
+                if not content_data:
+                    tqdm.write(f"  - 콘텐츠 없음: '{decoded_title}' 건너뜁니다.")
+                    tracker.mark(post_meta['url'], 'failed', "콘텐츠 없음")
+                    continue
+                if content_data.get('not_modified'):
+                    tqdm.write(f"  - [변경 없음 (304)] '{decoded_title}' 건너뜁니다.")
+                    unchanged_states.append({**crawl_state, **post_meta['validators']})
+                    tracker.mark(post_meta['url'], 'unchanged')
+                    continue
+                crawl_state.update(content_data.pop('http_validators', None) or {'etag': None, 'last_modified': None})
+
+                # content_data가 딕셔너리이므로 JSON 문자열로 변환하여 인코딩합니다.
+                # 이전에 'dict' object has no attribute 'encode' 오류가 발생한 부분입니다.
+                content_text_for_hash = json.dumps(content_data, ensure_ascii=False)
+                new_hash = hashlib.sha256(content_text_for_hash.encode('utf-8')).hexdigest()
+                old_hash = (crawl_states.get(post_meta['url']) or {}).get('content_hash')
             
-            tqdm.write(f"  - [콘텐츠 변경 감지] '{decoded_title}' 처리 시작...")
-            chunks = embedder.split_text(content_for_embedding)
-            embeddings = embedder.embed_texts(chunks) # <- 변경된 경우에만 API 호출
-            # embeddings는 이미 리스트의 리스트이므로, .tolist()를 다시 호출할 필요가 없습니다.
-            chunks_with_embeddings = [{"chunk_text": text, "embedding": emb} for text, emb in zip(chunks, embeddings)]
-            db.upsert_post_with_chunks(post_meta['url'], post_meta['title'], new_hash, chunks_with_embeddings)
-        except Exception as e:
-            tqdm.write(f"  - ❌ 처리 중 오류 발생: {post_meta['url']}, {e}")
+                # 임베딩을 위해 실제 텍스트 콘텐츠를 사용합니다.
+                content_for_embedding = content_data.get('content', '')
+
+                if new_hash == old_hash:
+                    tqdm.write(f"  - [변경 없음] '{decoded_title}' 건너뜁니다.")
+                    unchanged_states.append(crawl_state)
+                    tracker.mark(post_meta['url'], 'unchanged')
+                    continue
             
-    crawler.close(); db.close()
+                tqdm.write(f"  - [콘텐츠 변경 감지] '{decoded_title}' 처리 시작...")
+                with metrics.span('crawler', 'split_and_diff'):
+                    chunks = embedder.split_text(content_for_embedding)
+                    # 청크 단위 해시를 비교해 새로 생기거나 바뀐 청크만 임베딩하고, 사라진 청크만 삭제
+                    reused, added_chunks, stale_ids = plan_chunk_changes(chunks, db.get_post_chunk_hashes(post_meta['url']))
+                tqdm.write(f"    · 청크 재사용 {reused}개, 추가 {len(added_chunks)}개, 삭제 {len(stale_ids)}개")
+                chunk_stats['reused'] += reused
+                chunk_stats['added'] += len(added_chunks)
+                chunk_stats['removed'] += len(stale_ids)
+                # 바뀐 청크만 임베딩 단계로 보냄 (임베딩이 끝나면 저장 스레드가 게시글을 저장)
+                pipeline.submit({
+                    'post_url': post_meta['url'], 'title': post_meta['title'], 'content_hash': new_hash,
+                    'added_chunks': added_chunks, 'stale_chunk_ids': stale_ids, **crawl_state
+                }, [text for text, _ in added_chunks])
+                tracker.mark(post_meta['url'], 'fetched')
+            except Exception as e:
+                tqdm.write(f"  - ❌ 처리 중 오류 발생: {post_meta['url']}, {e}")
+                tracker.mark(post_meta['url'], 'failed', str(e))
+    except KeyboardInterrupt:
+        tracker.finish('interrupted', "사용자가 중단함")
+        print(f"\n⏸️ 크롤링을 중단했습니다. 'python main.py crawl --resume'으로 이어서 진행할 수 있습니다.")
+        raise
+    except Exception as e:
+        tracker.finish('failed', str(e))
+        raise
+    finally:
+        pipeline.close() # 남은 배치를 보내고 저장 스레드가 마지막 게시글까지 저장할 때까지 대기
+        writer.join()
+        tracker.flush()
+    crawler.close()
+    # 목록을 끝까지 읽었고 모든 게시글이 끝난 경우에만 완료 처리 (실패한 게시글이 남으면 --resume 대상으로 유지)
+    job = db.get_crawl_job(job_id)
+    remaining = db.get_crawl_job_posts(job_id, exclude_states=db.CRAWL_POST_DONE_STATES)
+    if job['listing_done'] and not remaining:
+        tracker.finish('completed')
+    else:
+        tracker.finish('incomplete', f"미완료 게시글 {len(remaining)}개" + ("" if job['listing_done'] else ", 게시글 목록 조회 중단"))
+        print(f"⚠️ 크롤링 작업 #{job_id}이(가) 모두 끝나지 않았습니다. 'python main.py crawl --resume'으로 남은 게시글을 다시 처리할 수 있습니다.")
+    if not listing_stats['listed']:
+        print("⚠️ 크롤링할 게시글이 없습니다."); db.close(); return
+    print(f"▶️ 게시글 {listing_stats['listed']}개 중 목록 변경 없음 {listing_stats['skipped']}개는 본문을 받지 않고 건너뛰었습니다.")
+    try:
+        db.update_post_crawl_states(unchanged_states)
+    except Exception as e:
+        print(f"  - ⚠️ 게시글 변경 감지 정보 저장 실패 (다음 크롤링에서 다시 확인됨): {e}")
+    print(f"\n📊 청크 요약: 재사용 {chunk_stats['reused']}개, 추가 {chunk_stats['added']}개, 삭제 {chunk_stats['removed']}개")
+    embedding_stats = pipeline.stats
+    print(f"📊 임베딩 요약: 캐시 {embedding_stats['cached']}개, API 요청 {embedding_stats['requested']}개 "
+          f"(배치 {embedding_stats['batches']}개, {embedding_stats['tokens']} 토큰, 429 재시도 {embedding_stats['retries']}회)")
+    print("📊 단계별 소요 시간:\n" + metrics.format_stage_summary())
+
+    # API 프로세스가 재구축 없이 바로 읽을 수 있도록 최신 벡터/키워드 인덱스를 디스크에 저장 (바뀐 게시글이 있을 때만)
+    if chunk_stats['written_posts'] and db.uses_local_vector_index():
+        db.build_vector_index()
+    if chunk_stats['written_posts'] and db.hybrid_search_candidates > 0:
+        db.save_lexical_index() # 저장하면서 증분 갱신한 키워드 인덱스 (없었다면 새로 구축)
+    db.close()
     print("\n🎉 블로그 전체 데이터화 작업이 완료되었습니다.")
 
 def ask_command(question: str):
@@ -101,20 +322,60 @@ def ask_command(question: str):
 
 def main():
     load_dotenv()
+    metrics.configure_logging()
     parser = argparse.ArgumentParser(description="<불로챗> 소상공인 AI 챗봇 자동화 플랫폼 (비용 최적화 버전)")
+    parser.add_argument("--tenant", type=int, default=None, help="작업할 업체(테넌트) id (기본값: TENANT_ID 또는 1)")
     subparsers = parser.add_subparsers(dest="command", required=True)
     subparsers.add_parser("onboard", help="대화형으로 챗봇 설정을 시작합니다.")
     subparsers.add_parser("setup-db", help="Oracle DB에 테이블과 인덱스를 생성합니다.")
     crawl_parser = subparsers.add_parser("crawl", help="블로그 게시글을 크롤링하고 변경된 내용만 DB에 반영합니다.")
     crawl_parser.add_argument("--max-posts", type=int, default=None, help="크롤링할 최대 게시글 수 (기본값: 모든 게시글)")
+    crawl_parser.add_argument("--workers", type=int, default=None, help="본문을 동시에 수집할 워커 수 (기본값: CRAWL_WORKERS 또는 3)")
+    crawl_parser.add_argument(
+        "--revalidate", nargs="?", const="all", default="auto", choices=REVALIDATE_MODES,
+        help="목록이 그대로인 게시글의 본문 수정 여부를 ETag/Last-Modified 조건부 요청으로 확인할 범위 "
+             "(auto: 수정일이 없는 게시글만(기본값), all: 모두(값 없이 --revalidate), never: 확인하지 않음)"
+    )
+    crawl_parser.add_argument("--resume", action="store_true", help="완료되지 않은 가장 최근 크롤링 작업을 중단된 지점부터 이어서 진행")
+    crawl_parser.add_argument("--job-id", type=int, default=None, help="지정한 크롤링 작업을 실행/재개 (/crawl API가 만든 작업)")
+    crawl_parser.add_argument("--write-batch-size", type=int, default=10, help="한 트랜잭션으로 함께 저장할 게시글 수 (기본값: 10)")
+    subparsers.add_parser("upgrade-db", help="데이터를 유지한 채 새로 추가된 컬럼을 기존 테이블에 반영합니다.")
+    subparsers.add_parser("purge-cache", help="콘텐츠 버전이 바뀌었거나 유효 기간이 지난 답변 캐시를 삭제합니다.")
+    index_parser = subparsers.add_parser("build-index", help="chunks 테이블로 벡터 인덱스를 (재)구축하여 디스크에 저장합니다.")
+    index_parser.add_argument("--all-tenants", action="store_true", help="업체 정보가 등록된 모든 테넌트의 인덱스를 구축")
+    migrate_parser = subparsers.add_parser("migrate-vectors", help="JSON 문자열로 저장된 청크 벡터를 VECTOR_STORAGE(blob/vector) 형식으로 일괄 변환합니다.")
+    migrate_parser.add_argument("--batch-size", type=int, default=500, help="한 번에 변환할 청크 수 (기본값: 500)")
     ask_parser = subparsers.add_parser("ask", help="챗봇에게 질문합니다 (답변 캐싱 기능 포함).")
     ask_parser.add_argument("question", type=str, help="AI에게 할 질문")
     args = parser.parse_args()
+    if args.tenant is not None:
+        os.environ["TENANT_ID"] = str(args.tenant) # 이후 생성되는 OracleManager가 모두 이 테넌트의 데이터만 다룸
     try:
         if args.command == "setup-db":
             db = OracleManager()
             db.reset_database() # setup_tables 대신 reset_database 호출
             db.close()
+        elif args.command == "upgrade-db":
+            db = OracleManager()
+            db.upgrade_schema()
+            db.close()
+        elif args.command == "purge-cache":
+            db = OracleManager()
+            db.purge_answer_cache()
+            db.close()
+        elif args.command == "build-index":
+            db = OracleManager()
+            tenant_ids = [tenant_id for tenant_id, _ in db.list_tenants()] if args.all_tenants else [db.tenant_id]
+            for tenant_id in tenant_ids:
+                tenant_db = db.for_tenant(tenant_id)
+                tenant_db.build_vector_index()
+                if tenant_db.hybrid_search_candidates > 0:
+                    tenant_db.build_lexical_index()
+            db.close()
+        elif args.command == "migrate-vectors":
+            db = OracleManager()
+            db.migrate_vectors(batch_size=args.batch_size)
+            db.close()
         elif args.command == "onboard":
             onboard_command()
         elif args.command == "crawl":
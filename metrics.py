@@ -0,0 +1,186 @@
+# metrics.py
+import os
+import time
+import logging
+import functools
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+try:
+    import prometheus_client  # 선택 의존성: 없으면 /metrics 없이 프로세스 내 집계만 유지
+except ImportError:
+    prometheus_client = None
+
+try:
+    from opentelemetry import trace as otel_trace  # 선택 의존성: 설치되어 있고 OTEL_EXPORTER_OTLP_ENDPOINT가 있으면 span도 내보냄
+except ImportError:
+    otel_trace = None
+
+logger = logging.getLogger(__name__)
+
+# 단계 소요 시간 히스토그램 구간(초): 캐시 조회(수 ms)부터 LLM 호출/브라우저 크롤링(수십 초)까지
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+if prometheus_client is not None:
+    STAGE_SECONDS = prometheus_client.Histogram(
+        "bullroh_stage_seconds", "Duration of each pipeline stage", ["component", "stage"], buckets=STAGE_BUCKETS
+    )
+    STAGE_ERRORS = prometheus_client.Counter(
+        "bullroh_stage_errors_total", "Stages that raised an exception", ["component", "stage"]
+    )
+    ANSWERS = prometheus_client.Counter(
+        "bullroh_answers_total", "Answered questions by how the answer was produced", ["source"]
+    )
+    POOL_CONNECTIONS = prometheus_client.Gauge(
+        "bullroh_db_pool_connections", "Oracle connection pool connections", ["state"]
+    )
+
+
+class _StageStats:
+    """ 프로세스 내 단계별 집계 (prometheus_client 없이도 CLI 요약/벤치마크에서 사용) """
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+_stats: Dict[Tuple[str, str], _StageStats] = {}
+_stats_lock = threading.Lock()
+_tracer = None
+
+
+def configure_logging():
+    """ LOG_LEVEL(기본값 INFO)로 로깅을 설정. DEBUG이면 검색된 청크 본문 등 디버그 로그가 출력된다 """
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+
+def configure_tracing(service_name: str = "bullroh-chat") -> bool:
+    """
+    OpenTelemetry가 설치되어 있고 OTEL_EXPORTER_OTLP_ENDPOINT가 설정된 경우 OTLP로 span을 내보내도록 설정.
+    opentelemetry-instrument 등으로 이미 TracerProvider가 설정되어 있으면 그대로 사용한다. 설정되면 True
+    """
+    global _tracer
+    if otel_trace is None or not os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+        return False
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    except ImportError:
+        logger.warning("OTLP로 span을 내보내려면 opentelemetry-sdk와 opentelemetry-exporter-otlp-proto-http가 필요합니다.")
+        return False
+    if not isinstance(otel_trace.get_tracer_provider(), TracerProvider):
+        provider = TracerProvider(resource=Resource.create({"service.name": os.getenv("OTEL_SERVICE_NAME", service_name)}))
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        otel_trace.set_tracer_provider(provider)
+    _tracer = otel_trace.get_tracer("bullroh")
+    logger.info("OpenTelemetry span을 %s로 내보냅니다.", os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"))
+    return True
+
+
+def observe(component: str, stage: str, seconds: float, error: bool = False):
+    """ 이미 측정한 단계 소요 시간을 기록 (AnswerRun.lap처럼 구간을 직접 재는 곳에서 사용) """
+    with _stats_lock:
+        stats = _stats.get((component, stage))
+        if stats is None:
+            stats = _stats[(component, stage)] = _StageStats()
+        stats.count += 1
+        stats.total += seconds
+        stats.max = max(stats.max, seconds)
+        if error:
+            stats.errors += 1
+    if prometheus_client is not None:
+        STAGE_SECONDS.labels(component, stage).observe(seconds)
+        if error:
+            STAGE_ERRORS.labels(component, stage).inc()
+
+
+def record_span(component: str, stage: str, seconds: float, error: bool = False):
+    """ observe와 같고, 트레이싱이 켜져 있으면 방금 끝난 구간을 span으로도 남김 """
+    observe(component, stage, seconds, error)
+    if _tracer is not None:
+        end = time.time_ns()
+        otel_span = _tracer.start_span(f"{component}.{stage}", start_time=end - int(seconds * 1e9))
+        if error:
+            otel_span.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR))
+        otel_span.end(end_time=end)
+
+
+@contextmanager
+def span(component: str, stage: str) -> Iterator[None]:
+    """ with 블록의 소요 시간을 component/stage 히스토그램에 기록하고, 예외가 나면 오류 카운터도 증가 """
+    started = time.perf_counter()
+    error = False
+    try:
+        with _tracer.start_as_current_span(f"{component}.{stage}") if _tracer is not None else nullcontext():
+            yield
+    except BaseException:
+        error = True
+        raise
+    finally:
+        observe(component, stage, time.perf_counter() - started, error)
+
+
+def timed(component: str, stage: Optional[str] = None) -> Callable:
+    """ 함수 호출 전체를 span으로 감싸는 데코레이터 (stage 기본값: 함수 이름) """
+    def decorator(func: Callable) -> Callable:
+        name = stage or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(component, name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count_answer(source: str):
+    """ 답변 출처(exact/semantic 캐시, faq, llm 등)별 답변 수 """
+    if prometheus_client is not None:
+        ANSWERS.labels(source).inc()
+
+
+def register_pool(pool: Any):
+    """ 스크랩할 때마다 연결 풀의 사용 중/열린 연결 수를 읽도록 등록 (API 프로세스에서 한 번 호출) """
+    if prometheus_client is not None:
+        POOL_CONNECTIONS.labels("busy").set_function(lambda: pool.busy)
+        POOL_CONNECTIONS.labels("open").set_function(lambda: pool.opened)
+
+
+def get_stage_stats() -> Dict[str, Dict[str, Any]]:
+    """ "component.stage" → {count, errors, avg_ms, max_ms} """
+    with _stats_lock:
+        return {
+            f"{component}.{stage}": {
+                'count': stats.count, 'errors': stats.errors,
+                'avg_ms': round(stats.total / stats.count * 1000, 2), 'max_ms': round(stats.max * 1000, 2),
+            }
+            for (component, stage), stats in sorted(_stats.items())
+        }
+
+
+def reset_stage_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def format_stage_summary(component: Optional[str] = None) -> str:
+    """ CLI 작업 종료 시 출력할 단계별 요약 (component를 주면 해당 구성 요소만) """
+    lines = []
+    for name, stats in get_stage_stats().items():
+        if component and not name.startswith(component + "."):
+            continue
+        errors = f", 오류 {stats['errors']}회" if stats['errors'] else ""
+        lines.append(f"  - {name}: {stats['count']}회, 평균 {stats['avg_ms']}ms, 최대 {stats['max_ms']}ms{errors}")
+    return "\n".join(lines)
+
+
+def render_latest() -> Tuple[bytes, str]:
+    """ Prometheus 텍스트 형식의 현재 지표와 Content-Type. prometheus_client가 없으면 RuntimeError """
+    if prometheus_client is None:
+        raise RuntimeError("prometheus_client is not installed")
+    return prometheus_client.generate_latest(), prometheus_client.CONTENT_TYPE_LATEST
@@ -0,0 +1,6 @@
+# tests/conftest.py
+import os
+import sys
+
+# tests/ 디렉터리에서 실행하더라도 루트 모듈(database, chatbot_service 등)을 import 할 수 있도록 경로 추가
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,134 @@
+# tests/test_answer_thresholds.py
+import numpy as np
+import pytest
+from bench.fakes import FakeChatModel, FakeEmbedder, InMemoryOracleManager, hash_vector
+from chatbot_service import ChatbotService, FaqIndex, SemanticAnswerCache
+
+DIM = 32
+MARGIN = 0.005  # 임계값 바로 위/아래로 둘 간격
+
+
+def vector_with_similarity(base, similarity, seed):
+    """ base와의 코사인 유사도가 정확히 similarity인 단위 벡터 (seed 텍스트로 직교 성분의 방향을 정함) """
+    orthogonal = hash_vector(seed, DIM)
+    orthogonal = orthogonal - (orthogonal @ base) * base
+    orthogonal /= np.linalg.norm(orthogonal)
+    return (similarity * base + np.sqrt(1 - similarity ** 2) * orthogonal).astype(np.float32)
+
+
+class MappedEmbedder(FakeEmbedder):
+    """ vectors에 등록한 질문은 그 벡터로, 나머지는 hash_vector로 임베딩 """
+
+    def __init__(self):
+        super().__init__(dim=DIM)
+        self.vectors = {}
+
+    def embed_query(self, text):
+        return self.vectors[text] if text in self.vectors else super().embed_query(text)
+
+
+@pytest.fixture
+def db(tmp_path):
+    return InMemoryOracleManager(embedding_dim=DIM, index_dir=str(tmp_path), hybrid_search_candidates=0)
+
+
+@pytest.fixture
+def service(monkeypatch, db):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("BUSINESS_INFO_CACHE_SECONDS", "0")
+    embedder = MappedEmbedder()
+    db.save_business_info({'business_name': "불로카센터", 'chatbot_personality': None, 'faqs': [], 'marketing_info': None})
+    return ChatbotService(db, embedder, llm=FakeChatModel(latency_seconds=0.0))
+
+
+def test_semantic_lookup_just_above_and_below_threshold(db):
+    base = hash_vector("엔진오일 교체 비용이 얼마인가요?", DIM)
+    db.cache_answer("hash-1", "3만 원부터입니다.", question="엔진오일 교체 비용이 얼마인가요?", question_vector=base)
+    cache = SemanticAnswerCache(db, threshold=0.92, refresh_seconds=60)
+
+    match = cache.lookup(vector_with_similarity(base, 0.92 + MARGIN, "위"))
+    assert match[:2] == ("hash-1", "엔진오일 교체 비용이 얼마인가요?")
+    assert match[2] == pytest.approx(0.92 + MARGIN, abs=1e-4)
+    assert cache.lookup(vector_with_similarity(base, 0.92 - MARGIN, "아래")) is None
+
+
+def test_semantic_lookup_disabled_with_zero_threshold(db):
+    base = hash_vector("질문", DIM)
+    db.cache_answer("hash-1", "답변", question="질문", question_vector=base)
+    assert SemanticAnswerCache(db, threshold=0.0, refresh_seconds=60).lookup(base) is None
+
+
+def test_paraphrase_is_answered_from_semantic_cache_only_above_threshold(service):
+    question = "엔진오일 교체 비용이 얼마인가요?"
+    base = service.embedder.embed_query(question)
+    threshold = service.semantic_cache.threshold
+    service.embedder.vectors["엔진오일 갈려면 얼마예요?"] = vector_with_similarity(base, threshold + MARGIN, "위")
+    service.embedder.vectors["엔진오일 종류가 뭐가 있나요?"] = vector_with_similarity(base, threshold - MARGIN, "아래")
+
+    assert service.answer_question_with_details(question)['cache_type'] is None
+    above = service.answer_question_with_details("엔진오일 갈려면 얼마예요?")
+    assert (above['cache_type'], above['matched_question']) == ('semantic', question)
+    below = service.answer_question_with_details("엔진오일 종류가 뭐가 있나요?")
+    assert (below['cache_type'], below['matched_question']) == (None, None)
+
+
+def test_content_version_bump_invalidates_semantic_tier(service, db):
+    question = "엔진오일 교체 비용이 얼마인가요?"
+    paraphrase = "엔진오일 갈려면 얼마예요?"
+    base = service.embedder.embed_query(question)
+    service.embedder.vectors[paraphrase] = vector_with_similarity(base, 0.99, "위")
+    service.answer_question_with_details(question)
+    assert service.answer_question_with_details(paraphrase)['cache_type'] == 'semantic'
+
+    # 크롤링으로 콘텐츠가 바뀌면 content_version이 올라감. 메모리 인덱스에 이전 질문이 남아 있어도 답변은 재사용하지 않음
+    db.load_corpus([("https://blog.naver.com/test/1", "새 글", ["엔진오일 가격이 바뀌었습니다."], hash_vector("새 글", DIM)[None, :])])
+    assert question in service.semantic_cache.questions
+    after = service.answer_question_with_details(paraphrase)
+    assert (after['cache_type'], after['matched_question']) == (None, None)
+    assert service.answer_question_with_details(question)['cache_type'] is None
+
+
+@pytest.fixture
+def faq_service(service, db):
+    faqs = [{'q': "영업시간이 어떻게 되나요?", 'a': "평일 9시부터 18시까지입니다."}, {'q': "주차가 가능한가요?", 'a': "매장 앞에 주차할 수 있습니다."}]
+    db.save_business_info({'business_name': "불로카센터", 'chatbot_personality': None, 'faqs': faqs, 'marketing_info': None,
+                           'faq_vectors': np.vstack([hash_vector(faq['q'], DIM) for faq in faqs])})
+    return service
+
+
+def test_faq_search_keeps_matches_at_or_above_min_similarity():
+    faqs = [{'q': "영업시간", 'a': "9시"}, {'q': "주차", 'a': "가능"}]
+    base = hash_vector("영업시간", DIM)
+    index = FaqIndex(faqs, np.vstack([base, hash_vector("주차", DIM)]))
+
+    [(faq, similarity)] = index.search(vector_with_similarity(base, 0.5 + MARGIN, "위"), k=3, min_similarity=0.5)
+    assert faq is faqs[0] and similarity == pytest.approx(0.5 + MARGIN, abs=1e-4)
+    assert index.search(vector_with_similarity(base, 0.5 - MARGIN, "아래"), k=3, min_similarity=0.5) == []
+    assert FaqIndex([], None).search(base) == []
+
+
+def test_faq_answer_is_returned_directly_only_above_direct_threshold(faq_service):
+    base = hash_vector("영업시간이 어떻게 되나요?", DIM)
+    direct = faq_service.faq_direct_answer_threshold
+    faq_service.embedder.vectors["몇 시에 문 여나요?"] = vector_with_similarity(base, direct + MARGIN, "위")
+    faq_service.embedder.vectors["몇 시까지 하나요?"] = vector_with_similarity(base, direct - MARGIN, "아래")
+
+    above = faq_service.answer_question_with_details("몇 시에 문 여나요?")
+    assert (above['answer'], above['matched_question']) == ("평일 9시부터 18시까지입니다.", "영업시간이 어떻게 되나요?")
+    below = faq_service.answer_question_with_details("몇 시까지 하나요?")
+    assert below['answer'] == FakeChatModel().answer  # 직접 답변 대신 LLM 호출 (FAQ는 참고 자료로만 사용)
+    assert below['matched_question'] is None
+
+
+def test_faq_is_added_to_context_only_above_context_threshold(faq_service, monkeypatch):
+    base = hash_vector("주차가 가능한가요?", DIM)
+    context = faq_service.faq_context_threshold
+    faq_service.embedder.vectors["차 세울 곳 있어요?"] = vector_with_similarity(base, context + MARGIN, "위")
+    faq_service.embedder.vectors["근처에 공영주차장?"] = vector_with_similarity(base, context - MARGIN, "아래")
+    prompts = []
+    monkeypatch.setattr(faq_service, "_store_answer", lambda run, answer: prompts.append(run.llm_inputs['context']))
+
+    faq_service.answer_question_with_details("차 세울 곳 있어요?")
+    faq_service.answer_question_with_details("근처에 공영주차장?")
+    assert "매장 앞에 주차할 수 있습니다." in prompts[0]
+    assert "매장 앞에 주차할 수 있습니다." not in prompts[1]
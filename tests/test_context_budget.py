@@ -0,0 +1,82 @@
+# tests/test_context_budget.py
+from context_budget import ContextBudgeter, ContextItem, remove_overlaps
+
+
+class CharCounter:
+    """ tiktoken 없이 1글자 = 1토큰으로 세는 TokenCounter 대역 """
+
+    def count(self, text):
+        return len(text)
+
+    def truncate(self, text, max_tokens):
+        return text[:max_tokens]
+
+
+def blog(text, score=0.5):
+    return ContextItem('blog', text, score)
+
+
+def test_remove_overlaps_trims_chunk_overlap_with_neighbour():
+    shared = "타이어 교체 주기는 주행 거리 기준으로 안내합니다"
+    first = blog("엔진오일은 만 킬로마다 교체합니다. " + shared)
+    second = blog(shared + " 휠 얼라인먼트도 함께 점검합니다.")
+    kept = remove_overlaps([first, second])
+    assert [item.text for item in kept] == [first.text, "휠 얼라인먼트도 함께 점검합니다."]
+
+
+def test_remove_overlaps_trims_preceding_chunk_tail():
+    shared = "타이어 교체 주기는 주행 거리 기준으로 안내합니다"
+    later = blog(shared + " 휠 얼라인먼트도 함께 점검합니다.")
+    earlier = blog("엔진오일은 만 킬로마다 교체합니다. " + shared)
+    kept = remove_overlaps([later, earlier])
+    assert [item.text for item in kept] == [later.text, "엔진오일은 만 킬로마다 교체합니다."]
+
+
+def test_remove_overlaps_drops_contained_chunk_and_keeps_higher_score():
+    inner = blog("영업시간은 평일 9시부터 6시까지입니다.", score=0.9)
+    outer = blog("매장 안내: 영업시간은 평일 9시부터 6시까지입니다. 주말은 휴무입니다.", score=0.4)
+    kept = remove_overlaps([inner, outer])
+    assert kept == [outer]
+    assert outer.score == 0.9
+
+    inner = blog("영업시간은 평일 9시부터 6시까지입니다.", score=0.9)
+    outer = blog("매장 안내: 영업시간은 평일 9시부터 6시까지입니다. 주말은 휴무입니다.", score=0.4)
+    kept = remove_overlaps([outer, inner])
+    assert kept == [outer]
+    assert outer.score == 0.9
+
+
+def test_remove_overlaps_ignores_short_overlap_and_blank_chunks():
+    first = blog("가격은 35,000원입니다")
+    second = blog("입니다 그리고 배송은 무료입니다")
+    kept = remove_overlaps([first, blog("   "), second])
+    assert [item.text for item in kept] == [first.text, second.text]
+
+
+def test_fit_keeps_everything_within_budget_in_original_order():
+    items = [blog("a" * 10, 0.2), blog("b" * 10, 0.9)]
+    fitted = ContextBudgeter(CharCounter(), max_tokens=100).fit(items)
+    assert fitted == items
+    assert [item.tokens for item in fitted] == [10, 10]
+
+
+def test_fit_truncates_lowest_score_item_to_remaining_budget():
+    high, low = blog("a" * 60, 0.9), blog("b" * 80, 0.1)
+    fitted = ContextBudgeter(CharCounter(), max_tokens=120, min_partial_tokens=50).fit([low, high])
+    assert fitted == [low, high]
+    assert low.text == "b" * 60
+    assert low.tokens == 60
+
+
+def test_fit_skips_item_when_remainder_too_small_but_packs_smaller_ones():
+    high = blog("a" * 90, 0.9)
+    middle = blog("b" * 50, 0.5)
+    low = blog("c" * 8, 0.1)
+    fitted = ContextBudgeter(CharCounter(), max_tokens=100, min_partial_tokens=20).fit([high, middle, low])
+    assert fitted == [high, low]
+    assert middle.text == "b" * 50
+
+
+def test_fit_without_budget_returns_non_empty_items():
+    items = [blog("a" * 1000), blog("")]
+    assert ContextBudgeter(CharCounter(), max_tokens=0).fit(items) == items[:1]
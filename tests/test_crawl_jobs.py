@@ -0,0 +1,158 @@
+# tests/test_crawl_jobs.py
+import argparse
+import pytest
+import main
+from bench.fakes import FakeEmbedder, InMemoryOracleManager
+from crawl_jobs import CrawlJobTracker
+from crawl_scheduler import CrawlScheduler
+from crawler import HostRateLimiter, PostListError
+
+BLOG_URL = "https://blog.naver.com/tester"
+PAGE_SIZE = 3
+
+
+class FakeBlog:
+    """ 목록 API와 본문 수집을 흉내내는 BlogCrawler 대역. fail_page 페이지에서 PostListError, fail_urls 게시글은 본문 없음 """
+
+    def __init__(self, post_count=9, fail_page=None, fail_urls=()):
+        self.posts = [
+            {'url': f"{BLOG_URL}/{100 - i}", 'title': f"글 {i}", 'log_no': str(100 - i), 'add_date': "2026. 1. 1.", 'modify_date': "2026. 1. 2."}
+            for i in range(post_count)
+        ]
+        self.fail_page = fail_page
+        self.fail_urls = set(fail_urls)
+        self.listed_pages = []
+        self.fetched = []
+
+    def crawl_all_posts(self, blog_url, max_posts=None):
+        for start in range(0, len(self.posts), PAGE_SIZE):
+            page = start // PAGE_SIZE + 1
+            if page == self.fail_page:
+                raise PostListError(f"API request failed on page {page}: 500 Server Error")
+            self.listed_pages.append(page)
+            yield from (dict(post) for post in self.posts[start:start + PAGE_SIZE])
+
+    def crawl_post_content(self, post_url, validators=None):
+        self.fetched.append(post_url)
+        if post_url in self.fail_urls:
+            return {}
+        return {'title': post_url, 'content': f"{post_url} 본문입니다.", 'hashtags': [], 'writer': "불로", 'write_date': "2026. 1. 2."}
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = InMemoryOracleManager(embedding_dim=16, index_dir=str(tmp_path))
+    db.save_business_info({'business_name': "불로카센터", 'blog_url': BLOG_URL})
+    return db
+
+
+def run_crawl(monkeypatch, db, blog, **options):
+    monkeypatch.setattr(main, "OracleManager", lambda *args, **kwargs: db)
+    monkeypatch.setattr(main, "BlogCrawler", lambda *args, **kwargs: blog)
+    monkeypatch.setattr(main, "Embedder", lambda *args, **kwargs: FakeEmbedder(dim=16))
+    monkeypatch.setattr(main, "CrawlScheduler", lambda workers=None: CrawlScheduler(
+        lambda limiter: blog, workers=1, rate_limiter=HostRateLimiter(0.0)))
+    args = argparse.Namespace(max_posts=None, job_id=None, resume=False, revalidate='auto', workers=1, write_batch_size=2)
+    vars(args).update(options)
+    main.crawl_command(args)
+
+
+def job_states(db, job_id):
+    return {post_url: post['state'] for post_url, post in db._crawl_job_posts[job_id].items()}
+
+
+def test_record_listing_marks_listing_done_only_when_exhausted(db):
+    job_id = db.create_crawl_job(BLOG_URL)
+    tracker = CrawlJobTracker(db, job_id)
+    posts = list(tracker.record_listing(FakeBlog(post_count=5).crawl_all_posts(BLOG_URL), page_size=2))
+    assert len(posts) == 5
+    assert db.get_crawl_job(job_id)['listing_done'] is True
+    assert db.get_crawl_job(job_id)['post_states'] == {'listed': 5}
+
+
+def test_record_listing_keeps_partial_page_and_leaves_job_resumable(db):
+    job_id = db.create_crawl_job(BLOG_URL)
+    tracker = CrawlJobTracker(db, job_id)
+    yielded = []
+    with pytest.raises(PostListError):
+        for post in tracker.record_listing(FakeBlog(post_count=9, fail_page=2).crawl_all_posts(BLOG_URL), page_size=2):
+            yielded.append(post)
+    assert len(yielded) == 3  # 1페이지 게시글 3개 (기록 단위 2개 + 끊기기 전 남은 1개)
+    assert db.get_crawl_job(job_id)['post_states'] == {'listed': 3}
+    assert db.get_crawl_job(job_id)['listing_done'] is False
+
+
+def test_failed_listing_page_is_listed_again_on_resume(monkeypatch, db):
+    blog = FakeBlog(post_count=9, fail_page=2)
+    run_crawl(monkeypatch, db, blog)
+
+    job = db.get_crawl_job(1)
+    assert job['status'] == 'incomplete'
+    assert job['listing_done'] is False
+    assert job['post_states'] == {'stored': 3}
+    assert sorted(db._posts) == sorted(post['url'] for post in blog.posts[:3])
+
+    blog.fail_page = None
+    blog.listed_pages, blog.fetched = [], []
+    run_crawl(monkeypatch, db, blog, resume=True)
+
+    job = db.get_crawl_job(1)
+    assert blog.listed_pages == [1, 2, 3]  # 목록을 처음부터 다시 받아 끊겼던 2페이지 이후도 기록
+    assert sorted(blog.fetched) == sorted(post['url'] for post in blog.posts[3:])  # 이미 저장한 게시글은 다시 받지 않음
+    assert job['status'] == 'completed'
+    assert job['listing_done'] is True
+    assert job['post_states'] == {'stored': 9}
+    assert len(db._posts) == 9
+
+
+def test_resume_retries_only_posts_that_are_not_done(monkeypatch, db):
+    blog = FakeBlog(post_count=6, fail_urls={f"{BLOG_URL}/98", f"{BLOG_URL}/96"})
+    run_crawl(monkeypatch, db, blog)
+
+    job = db.get_crawl_job(1)
+    assert job['status'] == 'incomplete'
+    assert job['listing_done'] is True
+    assert job['post_states'] == {'stored': 4, 'failed': 2}
+
+    blog.fail_urls.clear()
+    blog.listed_pages, blog.fetched = [], []
+    run_crawl(monkeypatch, db, blog, resume=True)
+
+    assert blog.listed_pages == []  # 목록을 끝까지 기록했으므로 목록 API를 다시 부르지 않음
+    assert sorted(blog.fetched) == [f"{BLOG_URL}/96", f"{BLOG_URL}/98"]
+    assert db.get_crawl_job(1)['status'] == 'completed'
+    assert set(job_states(db, 1).values()) == {'stored'}
+
+
+def test_interrupted_job_resumes_from_checkpoint(monkeypatch, db):
+    blog = FakeBlog(post_count=6)
+    job_id = db.create_crawl_job(BLOG_URL)
+    db.add_crawl_job_posts(job_id, blog.posts)
+    db.set_crawl_job_post_states(job_id, [(post['url'], 'stored', None) for post in blog.posts[:2]] +
+                                 [(blog.posts[2]['url'], 'fetched', None)])  # 본문까지 받았지만 저장 전에 중단
+    db.update_crawl_job(job_id, status='interrupted', listing_done=True, last_error="사용자가 중단함")
+
+    run_crawl(monkeypatch, db, blog, job_id=job_id)
+
+    assert sorted(blog.fetched) == sorted(post['url'] for post in blog.posts[2:])
+    job = db.get_crawl_job(job_id)
+    assert job['status'] == 'completed'
+    assert job['last_error'] is None
+    assert job['post_states'] == {'stored': 6}
+
+
+def test_completed_job_is_not_run_again(monkeypatch, db):
+    blog = FakeBlog(post_count=3)
+    run_crawl(monkeypatch, db, blog)
+    assert db.get_crawl_job(1)['status'] == 'completed'
+    blog.listed_pages, blog.fetched = [], []
+
+    run_crawl(monkeypatch, db, blog, job_id=1)
+    assert (blog.listed_pages, blog.fetched) == ([], [])
+
+    run_crawl(monkeypatch, db, blog, resume=True)  # 이어서 할 작업이 없으면 새 작업
+    assert db.get_crawl_job(2)['status'] == 'completed'
+    assert blog.listed_pages == [1]
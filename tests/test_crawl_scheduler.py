@@ -0,0 +1,195 @@
+# tests/test_crawl_scheduler.py
+import time
+import threading
+import pytest
+from crawl_scheduler import CrawlScheduler
+from crawler import HostRateLimiter
+
+
+class FakeCrawler:
+    """ crawl_post_content/close만 가진 BlogCrawler 대역. 공유 limiter로 요청 간격을 지키고 호출 기록을 남김 """
+
+    def __init__(self, limiter, log, delay=0.0, fail_urls=()):
+        self.limiter = limiter
+        self.log = log
+        self.delay = delay
+        self.fail_urls = set(fail_urls)
+        self.closed = False
+        log.setdefault('crawlers', []).append(self)
+
+    def crawl_post_content(self, url, validators=None):
+        self.limiter.wait(url)
+        with self.log['lock']:
+            self.log['requests'].append((url, time.monotonic()))
+            self.log['active'] += 1
+            self.log['max_active'] = max(self.log['max_active'], self.log['active'])
+        try:
+            time.sleep(self.delay)
+            if url in self.fail_urls:
+                raise RuntimeError("본문을 찾을 수 없음")
+            return {'content': f"본문 {url}", 'validators': validators}
+        finally:
+            with self.log['lock']:
+                self.log['active'] -= 1
+
+    def close(self):
+        self.closed = True
+
+
+def new_log():
+    return {'lock': threading.Lock(), 'requests': [], 'active': 0, 'max_active': 0}
+
+
+def posts(count, host="blog.example"):
+    return [{'url': f"http://{host}/{i}", 'title': f"글 {i}"} for i in range(count)]
+
+
+def scheduler_for(log, workers=3, min_interval=0.0, **crawler_kwargs):
+    return CrawlScheduler(lambda limiter: FakeCrawler(limiter, log, **crawler_kwargs), workers=workers,
+                          rate_limiter=HostRateLimiter(min_interval))
+
+
+def crawl_threads():
+    return [thread for thread in threading.enumerate() if thread.name.startswith("crawl-")]
+
+
+def test_every_post_is_yielded_exactly_once():
+    log = new_log()
+    metas = posts(50)
+    results = list(scheduler_for(log, workers=4, delay=0.001).run(iter(metas)))
+
+    assert sorted(meta['url'] for meta, _ in results) == sorted(meta['url'] for meta in metas)
+    assert all(content['content'] == f"본문 {meta['url']}" for meta, content in results)
+    assert len(log['requests']) == 50
+    assert all(crawler.closed for crawler in log['crawlers'])
+    assert crawl_threads() == []
+
+
+def test_validators_are_passed_to_crawler():
+    log = new_log()
+    meta = {'url': "http://blog.example/1", 'title': "글", 'validators': {'etag': '"abc"'}}
+    [(_, content)] = list(scheduler_for(log, workers=1).run([meta]))
+    assert content['validators'] == {'etag': '"abc"'}
+
+
+def test_concurrency_is_bounded_by_worker_count():
+    log = new_log()
+    list(scheduler_for(log, workers=3, delay=0.02).run(posts(30)))
+    assert len(log['crawlers']) == 3
+    assert log['max_active'] == 3
+
+
+def test_requests_to_the_same_host_are_paced():
+    log = new_log()
+    min_interval = 0.05
+    interleaved = [meta for pair in zip(posts(6, "a.example"), posts(6, "b.example")) for meta in pair]
+    list(scheduler_for(log, workers=4, min_interval=min_interval).run(interleaved))
+
+    first = {}
+    for host in ("a.example", "b.example"):
+        times = sorted(at for url, at in log['requests'] if f"//{host}/" in url)
+        assert len(times) == 6
+        # limiter는 호스트마다 min_interval 간격의 시각을 예약하므로 i번째 요청은 첫 요청보다 i * min_interval 이상 늦다
+        assert all(at - times[0] >= i * min_interval - 0.005 for i, at in enumerate(times))
+        first[host] = times[0]
+    # 호스트별로 따로 제한하므로 두 호스트의 요청은 서로 기다리지 않는다
+    assert abs(first["a.example"] - first["b.example"]) < min_interval
+
+
+def test_host_rate_limiter_reserves_slots_across_threads():
+    limiter = HostRateLimiter(0.03)
+    times = []
+    lock = threading.Lock()
+
+    def request():
+        limiter.wait("http://blog.example/post")
+        with lock:
+            times.append(time.monotonic())
+
+    threads = [threading.Thread(target=request) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    times.sort()
+    assert all(at - times[0] >= i * 0.03 - 0.005 for i, at in enumerate(times))
+
+
+def test_failed_post_is_yielded_empty_and_other_posts_continue():
+    log = new_log()
+    metas = posts(10)
+    results = dict((meta['url'], content) for meta, content in
+                   scheduler_for(log, workers=2, fail_urls={metas[3]['url']}).run(metas))
+    assert len(results) == 10
+    assert results[metas[3]['url']] == {}
+    assert all(results[meta['url']] for meta in metas if meta is not metas[3])
+    assert all(crawler.closed for crawler in log['crawlers'])
+    assert crawl_threads() == []
+
+
+def test_worker_that_fails_to_start_does_not_block_the_others():
+    log = new_log()
+    started = []
+
+    def factory(limiter):
+        with log['lock']:
+            started.append(1)
+            if len(started) == 1:
+                raise RuntimeError("chromedriver 실행 실패")
+        return FakeCrawler(limiter, log)
+
+    results = list(CrawlScheduler(factory, workers=3, rate_limiter=HostRateLimiter(0.0)).run(posts(20)))
+    assert sorted(meta['url'] for meta, _ in results) == sorted(meta['url'] for meta in posts(20))
+    assert len(log['crawlers']) == 2
+    assert crawl_threads() == []
+
+
+def test_all_workers_failing_to_start_ends_the_run():
+    def factory(limiter):
+        raise RuntimeError("chromedriver 실행 실패")
+
+    assert list(CrawlScheduler(factory, workers=2, rate_limiter=HostRateLimiter(0.0), queue_size=1).run(posts(10))) == []
+    assert crawl_threads() == []
+
+
+def test_listing_error_keeps_already_collected_posts():
+    log = new_log()
+
+    def listing():
+        yield from posts(3)
+        raise RuntimeError("목록 API 오류")
+
+    results = list(scheduler_for(log, workers=2).run(listing()))
+    assert len(results) == 3
+    assert crawl_threads() == []
+
+
+def test_closing_the_generator_stops_workers_and_listing():
+    log = new_log()
+    listing_closed = threading.Event()
+
+    def listing():
+        try:
+            for i in range(10_000):
+                yield {'url': f"http://blog.example/{i}", 'title': f"글 {i}"}
+        finally:
+            listing_closed.set()
+
+    run = scheduler_for(log, workers=3, delay=0.005).run(listing())
+    for _ in range(5):
+        next(run)
+    run.close()
+
+    assert listing_closed.is_set()
+    assert all(crawler.closed for crawler in log['crawlers'])
+    assert crawl_threads() == []
+    assert len(log['requests']) < 100  # 결과 큐가 가득 차면 워커가 더 앞서 나가지 않는다
+
+
+def test_consumer_exception_shuts_down_cleanly():
+    log = new_log()
+    with pytest.raises(ValueError):
+        for _ in scheduler_for(log, workers=2).run(posts(50)):
+            raise ValueError("저장 실패")
+    assert all(crawler.closed for crawler in log['crawlers'])
+    assert crawl_threads() == []
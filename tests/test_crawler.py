@@ -0,0 +1,273 @@
+# tests/test_crawler.py
+import os
+import re
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import bs4
+import pytest
+import requests
+import crawler
+from crawler import BlogCrawler, HostRateLimiter
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+ETAG = '"v1"'
+LAST_MODIFIED = "Mon, 12 Jan 2026 01:30:00 GMT"
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURE_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+class PostViewHandler(BaseHTTPRequestHandler):
+    """ /<fixture 이름> 요청에 tests/fixtures의 PostView HTML을 ETag/Last-Modified와 함께 돌려주는 로컬 서버 """
+    requests_seen = []
+
+    def do_GET(self):
+        self.requests_seen.append((self.path, dict(self.headers)))
+        name = self.path.lstrip("/")
+        if name == "error":
+            self.send_error(500)
+            return
+        if not os.path.exists(os.path.join(FIXTURE_DIR, name)):
+            self.send_error(404)
+            return
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = read_fixture(name).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=UTF-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", ETAG)
+        self.send_header("Last-Modified", LAST_MODIFIED)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), PostViewHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def blog_crawler(monkeypatch):
+    PostViewHandler.requests_seen = []
+    instance = BlogCrawler(headless=True, rate_limiter=HostRateLimiter(0.0))
+    browser_calls = []
+
+    def fake_browser(post_url):
+        browser_calls.append(post_url)
+        return {'title': "브라우저", 'content': "브라우저로 수집한 본문", 'hashtags': [], 'writer': "Unknown", 'write_date': "Unknown"}
+
+    monkeypatch.setattr(instance, "crawl_post_content_with_browser", fake_browser)
+    instance.browser_calls = browser_calls
+    yield instance
+    instance.close()
+
+
+def test_parse_smart_editor_post():
+    data = BlogCrawler.parse_post_html(read_fixture("postview_smarteditor.html"))
+    assert data['title'] == "겨울철 타이어 관리 요령"
+    assert data['content'] == (
+        "기온이 7도 아래로 내려가면 여름용 타이어는 접지력이 크게 떨어집니다.\n"
+        "스노우 타이어 교체는 11월 말 전에 예약해 주세요.\n\n"
+        "교체 비용은 4짝 기준 35,000원부터이며, 예약 문의는 010-1234-5678로 연락주세요."
+    )
+    assert data['hashtags'] == ["스노우타이어", "타이어교체"]
+    assert data['writer'] == "불로카센터"
+    assert data['write_date'] == "2026. 1. 12. 10:30"
+
+
+def test_parse_legacy_editor_post():
+    data = BlogCrawler.parse_post_html(read_fixture("postview_legacy.html"))
+    assert data['title'] == "엔진오일 교체 주기"
+    assert data['content'] == "엔진오일은 보통 주행거리 1만 km마다 교체합니다.\n\n합성유를 쓰면\n교체 주기를 조금 늘릴 수 있습니다."
+    assert data['writer'] == "Unknown"
+    assert data['write_date'] == "2019. 5. 3. 9:00"
+
+
+def test_parse_returns_none_without_post_body():
+    assert BlogCrawler.parse_post_html(read_fixture("postview_no_body.html")) is None
+
+
+def test_parse_marks_body_without_text_as_failed():
+    data = BlogCrawler.parse_post_html(read_fixture("postview_empty_body.html"))
+    assert data['title'] == "사진만 있는 글"
+    assert data['content'] == "[컨텐츠 추출 실패]"
+
+
+def test_parse_falls_back_to_html_parser_without_lxml(monkeypatch):
+    real_soup = crawler.BeautifulSoup
+    features = []
+
+    def soup_without_lxml(markup, parser):
+        features.append(parser)
+        if parser == 'lxml':
+            raise bs4.FeatureNotFound("lxml is not installed")
+        return real_soup(markup, parser)
+
+    monkeypatch.setattr(crawler, "BeautifulSoup", soup_without_lxml)
+    data = BlogCrawler.parse_post_html(read_fixture("postview_smarteditor.html"))
+    assert features == ['lxml', 'html.parser']
+    assert data['title'] == "겨울철 타이어 관리 요령"
+    assert data['content'].startswith("기온이 7도 아래로")
+
+
+def test_fetch_returns_parsed_post_with_validators(server, blog_crawler):
+    data = blog_crawler.fetch_post_content(f"{server}/postview_smarteditor.html")
+    assert data['title'] == "겨울철 타이어 관리 요령"
+    assert data['http_validators'] == {'etag': ETAG, 'last_modified': LAST_MODIFIED}
+    _, headers = PostViewHandler.requests_seen[0]
+    assert headers["Referer"] == f"{server}/postview_smarteditor.html"
+    assert "If-None-Match" not in headers
+
+
+def test_fetch_sends_validators_and_reports_not_modified(server, blog_crawler):
+    data = blog_crawler.fetch_post_content(f"{server}/postview_smarteditor.html",
+                                           validators={'etag': ETAG, 'last_modified': LAST_MODIFIED})
+    assert data == {'not_modified': True}
+    _, headers = PostViewHandler.requests_seen[0]
+    assert headers["If-None-Match"] == ETAG
+    assert headers["If-Modified-Since"] == LAST_MODIFIED
+
+
+def test_fetch_returns_none_on_http_error(server, blog_crawler):
+    assert blog_crawler.fetch_post_content(f"{server}/error") is None
+    assert blog_crawler.fetch_post_content(f"{server}/missing.html") is None
+    assert blog_crawler.fetch_post_content(f"{server}/postview_no_body.html") is None
+
+
+def test_post_view_url_rewrites_naver_post_urls():
+    instance = BlogCrawler(rate_limiter=HostRateLimiter(0.0))
+    assert instance._post_view_url("https://blog.naver.com/kokos012/223456789") == (
+        "https://blog.naver.com/PostView.naver?blogId=kokos012&logNo=223456789&redirect=Dlog&widgetTypeCall=true"
+    )
+    assert instance._post_view_url("http://127.0.0.1:8000/post") == "http://127.0.0.1:8000/post"
+    instance.close()
+
+
+def test_crawl_uses_http_result_without_browser(server, blog_crawler):
+    data = blog_crawler.crawl_post_content(f"{server}/postview_legacy.html")
+    assert data['title'] == "엔진오일 교체 주기"
+    assert blog_crawler.browser_calls == []
+    assert blog_crawler._driver is None
+
+
+def test_crawl_returns_not_modified_without_browser(server, blog_crawler):
+    data = blog_crawler.crawl_post_content(f"{server}/postview_legacy.html", validators={'etag': ETAG})
+    assert data == {'not_modified': True}
+    assert blog_crawler.browser_calls == []
+
+
+@pytest.mark.parametrize("name", ["postview_no_body.html", "postview_empty_body.html", "error"])
+def test_crawl_falls_back_to_selenium_when_http_extraction_fails(server, blog_crawler, name):
+    url = f"{server}/{name}"
+    data = blog_crawler.crawl_post_content(url)
+    assert blog_crawler.browser_calls == [url]
+    assert data['content'] == "브라우저로 수집한 본문"
+
+
+def test_crawl_skips_http_when_disabled(server, blog_crawler):
+    blog_crawler.http_first = False
+    url = f"{server}/postview_smarteditor.html"
+    blog_crawler.crawl_post_content(url)
+    assert blog_crawler.browser_calls == [url]
+    assert PostViewHandler.requests_seen == []
+
+
+class FakeListResponse:
+    def __init__(self, status_code, text=""):
+        self.status_code = status_code
+        self.text = text
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error", response=self)
+
+
+class FakeListSession:
+    """ PostTitleListAsync 응답 대역. pages[page]는 응답 하나 또는 시도마다 차례로 돌려줄 응답 목록 """
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requested = []
+
+    def get(self, url, timeout=None):
+        page = int(re.search(r"currentPage=(\d+)", url).group(1))
+        self.requested.append(page)
+        responses = self.pages.get(page, FakeListResponse(200, json.dumps({'postList': []})))
+        if isinstance(responses, list):
+            return responses.pop(0) if len(responses) > 1 else responses[0]
+        return responses
+
+    def close(self):
+        pass
+
+
+def list_page(page, total_count, per_page=30):
+    first = (page - 1) * per_page
+    posts = [{'logNo': str(1000 - i), 'title': f"글 {i}", 'addDate': "2026. 1. 1.", 'modifyDate': ""}
+             for i in range(first, min(first + per_page, total_count))]
+    return FakeListResponse(200, json.dumps({'postList': posts, 'totalCount': str(total_count)}))
+
+
+def listing_crawler(pages):
+    instance = BlogCrawler(rate_limiter=HostRateLimiter(0.0))
+    instance.session = FakeListSession(pages)
+    instance.LIST_RETRY_BACKOFF = 0.0
+    return instance
+
+
+def test_crawl_all_posts_yields_every_page_in_order():
+    instance = listing_crawler({page: list_page(page, 75) for page in (1, 2, 3)})
+    posts = list(instance.crawl_all_posts("https://blog.naver.com/tester", page_workers=2))
+    assert [post['log_no'] for post in posts] == [str(1000 - i) for i in range(75)]
+    assert posts[0]['url'] == "https://blog.naver.com/tester/1000"
+    assert sorted(instance.session.requested) == [1, 2, 3]
+
+
+def test_crawl_all_posts_retries_server_errors():
+    instance = listing_crawler({1: list_page(1, 40), 2: [FakeListResponse(503), list_page(2, 40)]})
+    assert len(list(instance.crawl_all_posts("https://blog.naver.com/tester"))) == 40
+    assert instance.session.requested.count(2) == 2
+
+
+def test_crawl_all_posts_raises_on_failed_page_after_yielding_earlier_pages():
+    instance = listing_crawler({1: list_page(1, 100), 2: list_page(2, 100), 3: FakeListResponse(500), 4: list_page(4, 100)})
+    posts = []
+    with pytest.raises(crawler.PostListError, match="page 3"):
+        for post in instance.crawl_all_posts("https://blog.naver.com/tester", page_workers=2):
+            posts.append(post)
+    assert len(posts) == 60  # 실패한 3페이지 이후의 페이지는 내보내지 않음
+    assert instance.session.requested.count(3) == BlogCrawler.LIST_MAX_RETRIES + 1
+
+
+@pytest.mark.parametrize("response", [FakeListResponse(200, "<html>점검 중</html>"), FakeListResponse(404)])
+def test_crawl_all_posts_raises_when_first_page_fails(response):
+    instance = listing_crawler({1: response})
+    with pytest.raises(crawler.PostListError, match="page 1"):
+        list(instance.crawl_all_posts("https://blog.naver.com/tester"))
+    assert instance.session.requested == [1]  # 404는 재시도하지 않음, 파싱 오류도 마찬가지
+
+
+def test_crawl_all_posts_ends_normally_on_empty_blog_and_max_posts():
+    assert list(listing_crawler({1: list_page(1, 0)}).crawl_all_posts("https://blog.naver.com/tester")) == []
+    instance = listing_crawler({page: list_page(page, 90) for page in (1, 2, 3)})
+    assert len(list(instance.crawl_all_posts("https://blog.naver.com/tester", max_posts=35))) == 35
+    assert 3 not in instance.session.requested
+
+
+def test_crawl_all_posts_rejects_invalid_blog_url():
+    with pytest.raises(crawler.PostListError):
+        list(listing_crawler({}).crawl_all_posts("https://example.com/not-a-blog"))
@@ -0,0 +1,89 @@
+# tests/test_embedding_cache.py
+import numpy as np
+import pytest
+import embedding_cache
+from embedding_cache import EmbeddingCache
+
+
+def vector(i):
+    return np.full(4, i, dtype=np.float32)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """ last_access가 쓰기/조회마다 1초씩 늘어나도록 고정한 시계 """
+    now = [1000.0]
+
+    def tick():
+        now[0] += 1
+        return now[0]
+
+    monkeypatch.setattr(embedding_cache.time, "time", tick)
+    return now
+
+
+def open_cache(tmp_path, **options):
+    return EmbeddingCache("test-model", path=str(tmp_path / "cache.sqlite3"), **options)
+
+
+def test_memory_tier_evicts_least_recently_used(tmp_path):
+    cache = open_cache(tmp_path, memory_size=2)
+    cache.put_many(["가", "나"], [vector(1), vector(2)])
+    cache.get_many(["가"])  # 가를 최근에 사용 → 나가 가장 오래됨
+    cache.put_many(["다"], [vector(3)])
+
+    assert cache.get_stats()['memory_entries'] == 2
+    assert cache.get_many(["가", "다"])[1].tolist() == vector(3).tolist()
+    assert cache.get_stats()['disk_hits'] == 0
+    # 메모리에서 밀려난 나는 디스크에서 읽힘
+    assert cache.get_many(["나"])[0].tolist() == vector(2).tolist()
+    assert cache.get_stats()['disk_hits'] == 1
+
+
+def test_hit_and_miss_counters(tmp_path):
+    cache = open_cache(tmp_path)
+    cache.put_many(["가"], [vector(1)])
+    results = cache.get_many(["가", "나", "가"])
+    assert results[0].tolist() == results[2].tolist() == vector(1).tolist()
+    assert results[1] is None
+    assert cache.get_stats() == {'memory_hits': 2, 'disk_hits': 0, 'misses': 1, 'evictions': 0, 'memory_entries': 1}
+    cache.close()
+
+    # 같은 파일을 새로 열면 메모리 계층이 비어 있으므로 디스크 적중
+    reopened = open_cache(tmp_path)
+    assert reopened.get_many(["가", "가", "다"])[0].tolist() == vector(1).tolist()
+    stats = reopened.get_stats()
+    assert (stats['memory_hits'], stats['disk_hits'], stats['misses']) == (0, 2, 1)
+    assert reopened.get_many(["가"])[0] is not None
+    assert reopened.get_stats()['memory_hits'] == 1  # 디스크에서 읽은 항목은 메모리 계층에 올라감
+
+
+def test_get_many_handles_batches_larger_than_bind_limit(tmp_path):
+    cache = open_cache(tmp_path)
+    texts = [f"텍스트 {i}" for i in range(1200)]
+    cache.put_many(texts, [vector(i) for i in range(1200)])
+    cache.close()
+
+    reopened = open_cache(tmp_path)
+    results = reopened.get_many(texts + ["없는 텍스트"])
+    assert [result[0] for result in results[:-1]] == list(range(1200))
+    assert results[-1] is None
+    assert reopened.get_stats()['disk_hits'] == 1200
+
+
+def test_disk_tier_trims_to_max_entries_by_last_access(tmp_path, clock):
+    cache = open_cache(tmp_path, memory_size=1, max_entries=10)
+    texts = [f"텍스트 {i}" for i in range(11)]
+    for i, text in enumerate(texts[:10]):
+        cache.put_many([text], [vector(i)])
+    cache.get_many([texts[0]])  # 디스크에서 읽어 last_access 갱신 → 가장 오래된 항목은 1, 2번
+    assert cache.get_stats()['evictions'] == 0
+
+    cache.put_many([texts[10]], [vector(10)])  # 상한(10)을 넘으면 90%(9개)까지 줄임
+
+    assert cache.get_stats()['evictions'] == 2
+    assert cache._count_entries() == 9
+    cache.close()
+    reopened = open_cache(tmp_path)
+    results = reopened.get_many(texts)
+    assert [i for i, result in enumerate(results) if result is None] == [1, 2]
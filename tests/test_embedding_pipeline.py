@@ -0,0 +1,188 @@
+# tests/test_embedding_pipeline.py
+import threading
+import pytest
+import embedder
+from bench.fakes import FakeEmbedder, hash_vector
+from embedder import EmbeddingPipeline, TokenRateLimiter
+
+DIM = 16
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class RecordingEmbedder(FakeEmbedder):
+    """ 단어 수를 토큰 수로 세고 embed_uncached 호출(배치)을 기록하는 FakeEmbedder. errors에 넣은 예외를 차례로 던짐 """
+
+    def __init__(self, errors=(), fail_texts=()):
+        super().__init__(dim=DIM)
+        self.batches = []
+        self.errors = list(errors)
+        self.fail_texts = set(fail_texts)
+        self._calls_lock = threading.Lock()
+
+    def count_tokens(self, text):
+        return len(text.split())
+
+    def embed_uncached(self, texts):
+        with self._calls_lock:
+            self.batches.append(list(texts))
+            if self.errors:
+                raise self.errors.pop(0)
+        if self.fail_texts.intersection(texts):
+            raise ValueError("입력이 너무 깁니다")
+        return [hash_vector(text, DIM) for text in texts]
+
+
+def make_pipeline(fake, **options):
+    options = {'max_batch_tokens': 1000, 'max_batch_size': 100, 'concurrency': 1, 'tokens_per_minute': 0, **options}
+    return EmbeddingPipeline(fake, **options)
+
+
+def drain(pipeline):
+    """ close() 후 종료 신호(None)까지 output을 모두 꺼냄 """
+    pipeline.close()
+    results = []
+    while True:
+        result = pipeline.output.get(timeout=5)
+        if result is None:
+            return results
+        results.append(result)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(embedder.time, "sleep", delays.append)
+    monkeypatch.setattr(embedder.random, "uniform", lambda low, high: 0.0)
+    return delays
+
+
+def test_batches_split_at_max_batch_tokens():
+    fake = RecordingEmbedder()
+    pipeline = make_pipeline(fake, max_batch_tokens=5)
+    pipeline.submit("글 1", ["하나 둘", "셋 넷", "다섯 여섯"])  # 2 + 2 토큰 뒤 세 번째는 5를 넘으므로 새 배치
+    pipeline.submit("글 2", ["일 이 삼", "사 오"])
+    drain(pipeline)
+    assert fake.batches == [["하나 둘", "셋 넷"], ["다섯 여섯", "일 이 삼"], ["사 오"]]
+    assert all(sum(fake.count_tokens(text) for text in batch) <= 5 for batch in fake.batches)
+
+
+def test_batches_split_at_max_batch_size():
+    fake = RecordingEmbedder()
+    pipeline = make_pipeline(fake, max_batch_size=2)
+    pipeline.submit("글 1", [f"텍스트 {i}" for i in range(5)])
+    results = drain(pipeline)
+    assert [len(batch) for batch in fake.batches] == [2, 2, 1]
+    [(item, vectors, error)] = results
+    assert (item, error) == ("글 1", None)
+    assert [vector.tolist() for vector in vectors] == [hash_vector(f"텍스트 {i}", DIM).tolist() for i in range(5)]
+
+
+def test_repeated_text_is_requested_once_and_delivered_to_every_waiter():
+    fake = RecordingEmbedder()
+    pipeline = make_pipeline(fake)
+    pipeline.submit("글 1", ["영업시간 안내", "글 1 본문"])
+    pipeline.submit("글 2", ["영업시간 안내"])
+    pipeline.submit("글 3", ["글 3 본문", "영업시간 안내", "영업시간 안내"])
+    results = {item: (vectors, error) for item, vectors, error in drain(pipeline)}
+
+    requested = [text for batch in fake.batches for text in batch]
+    assert requested.count("영업시간 안내") == 1
+    assert sorted(results) == ["글 1", "글 2", "글 3"]
+    expected = hash_vector("영업시간 안내", DIM).tolist()
+    assert results["글 1"][0][0].tolist() == expected
+    assert results["글 2"][0][0].tolist() == expected
+    assert results["글 3"][0][1].tolist() == results["글 3"][0][2].tolist() == expected
+    assert pipeline.stats['texts'] == 6
+    assert pipeline.stats['requested'] == 3
+
+
+def test_cached_texts_are_not_requested():
+    fake = RecordingEmbedder()
+    fake.cache.put_many(["캐시된 텍스트"], [hash_vector("캐시된 텍스트", DIM)])
+    pipeline = make_pipeline(fake)
+    pipeline.submit("캐시만", ["캐시된 텍스트"])
+    pipeline.submit("섞임", ["캐시된 텍스트", "새 텍스트"])
+    results = drain(pipeline)
+    assert fake.batches == [["새 텍스트"]]
+    assert [item for item, _, _ in results] == ["캐시만", "섞임"]  # 캐시로 모두 채워진 항목은 submit에서 바로 나감
+    assert pipeline.stats['cached'] == 2
+
+
+def test_rate_limit_is_retried_with_backoff(sleeps):
+    fake = RecordingEmbedder(errors=[RateLimitError("429"), RateLimitError("429")])
+    pipeline = make_pipeline(fake)
+    pipeline.submit("글 1", ["한도 초과 후 성공"])
+    [(item, vectors, error)] = drain(pipeline)
+    assert error is None and vectors[0].tolist() == hash_vector("한도 초과 후 성공", DIM).tolist()
+    assert len(fake.batches) == 3
+    assert pipeline.stats['retries'] == 2
+    assert sleeps == [1.0, 2.0]  # 지수 백오프 (random.uniform은 0으로 고정)
+
+
+def test_rate_limit_gives_up_after_max_retries(sleeps):
+    fake = RecordingEmbedder(errors=[RateLimitError("429")] * 3)
+    pipeline = make_pipeline(fake, max_retries=2)
+    pipeline.submit("글 1", ["계속 한도 초과"])
+    [(item, vectors, error)] = drain(pipeline)
+    assert vectors is None and isinstance(error, RateLimitError)
+    assert pipeline.stats['retries'] == 2
+
+
+def test_other_errors_fail_only_the_items_in_that_batch(sleeps):
+    fake = RecordingEmbedder(fail_texts={"실패할 텍스트"})
+    pipeline = make_pipeline(fake, max_batch_size=1)
+    pipeline.submit("실패", ["실패할 텍스트"])
+    pipeline.submit("성공", ["정상 텍스트"])
+    results = {item: (vectors, error) for item, vectors, error in drain(pipeline)}
+
+    assert results["실패"][0] is None and isinstance(results["실패"][1], ValueError)
+    assert results["성공"][1] is None and results["성공"][0][0].tolist() == hash_vector("정상 텍스트", DIM).tolist()
+    assert pipeline.stats['retries'] == 0  # 429가 아닌 오류는 재시도하지 않음
+    assert sleeps == []
+
+
+def test_close_flushes_partial_batch_and_sends_trailing_none():
+    fake = RecordingEmbedder()
+    pipeline = make_pipeline(fake)
+    pipeline.submit("글 1", ["배치를 다 채우지 못한 텍스트"])
+    assert fake.batches == []  # 한도에 닿지 않으면 close 전까지 보내지 않음
+    pipeline.close()
+    assert fake.batches == [["배치를 다 채우지 못한 텍스트"]]
+    assert pipeline.output.get(timeout=5)[0] == "글 1"
+    assert pipeline.output.get(timeout=5) is None
+    assert pipeline.output.empty()
+
+
+def test_close_without_items_sends_only_none():
+    pipeline = make_pipeline(RecordingEmbedder())
+    assert drain(pipeline) == []
+
+
+def test_token_rate_limiter_waits_for_refill(monkeypatch):
+    now = [100.0]
+    delays = []
+
+    def fake_sleep(seconds):
+        delays.append(seconds)
+        now[0] += seconds
+
+    monkeypatch.setattr(embedder.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(embedder.time, "sleep", fake_sleep)
+    limiter = TokenRateLimiter(600)  # 초당 10토큰 충전
+
+    limiter.acquire(500)
+    assert delays == []
+    limiter.acquire(200)  # 100토큰 남음 → 100토큰 더 필요 → 10초 대기
+    assert delays == [pytest.approx(10.0)]
+    limiter.acquire(1000)  # 한도보다 큰 요청은 가득 찬 버킷 하나로 보냄
+    assert sum(delays) == pytest.approx(70.0)
+
+
+def test_token_rate_limiter_disabled_with_zero(monkeypatch):
+    monkeypatch.setattr(embedder.time, "sleep", lambda seconds: pytest.fail("대기하면 안 됨"))
+    limiter = TokenRateLimiter(0)
+    for _ in range(3):
+        limiter.acquire(10 ** 9)
@@ -0,0 +1,52 @@
+# tests/test_hybrid_search.py
+import numpy as np
+import pytest
+from bench.fakes import InMemoryOracleManager, hash_vector
+
+DIM = 32
+
+
+def make_db(tmp_path, hybrid_search_candidates=3):
+    db = InMemoryOracleManager(embedding_dim=DIM, hybrid_search_candidates=hybrid_search_candidates, index_dir=str(tmp_path))
+    texts = [f"블로그 글 {i}번째 청크: 정비 후기와 관리 팁" for i in range(10)]
+    texts.append("예약 문의는 010-1234-5678로 연락주세요")
+    vectors = np.vstack([hash_vector(text, DIM) for text in texts])
+    db.load_corpus([("https://blog.naver.com/test/1", "테스트", texts, vectors)])
+    return db, texts
+
+
+def test_search_chunks_returns_cosine_similarity_in_descending_order(tmp_path):
+    db, texts = make_db(tmp_path, hybrid_search_candidates=0)
+    hits = db.search_chunks(texts[4], hash_vector(texts[4], DIM), k=3)
+    assert hits[0][:2] == (5, texts[4])
+    assert hits[0][2] == pytest.approx(1.0, abs=1e-5)
+    scores = [score for _, _, score in hits]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_keyword_match_outside_vector_candidates_is_fused_in(tmp_path):
+    db, texts = make_db(tmp_path)
+    query = "010-1234-5678 번호로 예약 가능한가요"
+    query_vector = hash_vector(texts[0], DIM)  # 전화번호 청크와는 무관한 벡터
+    vector_ids = [chunk_id for chunk_id, _, _ in db.find_similar_chunks(query_vector, 3)]
+    assert 11 not in vector_ids
+
+    hits = db.search_chunks(query, query_vector, k=3)
+
+    assert 11 in [chunk_id for chunk_id, _, _ in hits]
+    similarities = {chunk_id: score for chunk_id, _, score in hits}
+    vector_similarities = [1.0 - d ** 2 / 2.0 for _, _, d in db.find_similar_chunks(query_vector, 3)]
+    assert similarities[11] == pytest.approx(min(vector_similarities))  # 키워드로만 찾은 청크는 벡터 후보의 최저 유사도
+    assert similarities[1] == pytest.approx(1.0, abs=1e-5)
+
+
+def test_lexical_index_follows_incremental_upserts(tmp_path):
+    db, _ = make_db(tmp_path)
+    db.get_lexical_index()
+    db.upsert_posts_with_chunks([{
+        'post_url': "https://blog.naver.com/test/2", 'title': "새 글", 'content_hash': "h",
+        'chunks': [{'chunk_text': "겨울용 스노우 타이어 입고", 'embedding': hash_vector("스노우", DIM)}],
+    }])
+    index = db.get_lexical_index()
+    assert index.signature == db.get_chunks_signature()
+    assert index.search("스노우 타이어", 1)[0][0] == 12
@@ -0,0 +1,90 @@
+# tests/test_lexical_index.py
+import pytest
+from lexical_index import LexicalIndex, reciprocal_rank_fusion, tokenize
+
+
+def test_tokenize_splits_hangul_into_syllable_bigrams():
+    assert tokenize("타이어는") == ["타이", "이어", "어는"]
+    assert tokenize("차 수리") == ["차", "수리"]
+
+
+def test_tokenize_lowercases_words_and_strips_thousand_separators():
+    assert tokenize("GV80 가격 35,000원, 배기량 2.0") == ["gv80", "가격", "35000", "원", "배기", "기량", "2.0"]
+
+
+def test_tokenize_indexes_phone_numbers_without_hyphens():
+    tokens = tokenize("문의: 010-1234-5678")
+    assert "01012345678" in tokens
+    assert tokens[:4] == ["문의", "010", "1234", "5678"]
+
+
+def test_tokenize_empty():
+    assert tokenize("") == []
+    assert tokenize(None) == []
+
+
+def build_index():
+    index = LexicalIndex()
+    index.add(1, 10, "타이어 교체 비용은 매장마다 다릅니다")
+    index.add(2, 10, "엔진오일 교체 주기 안내")
+    index.add(3, 20, "예약 문의는 010-1234-5678로 연락주세요")
+    return index
+
+
+def test_search_ranks_matching_chunks_by_bm25():
+    index = build_index()
+    hits = index.search("타이어 교체", 3)
+    assert [chunk_id for chunk_id, _ in hits] == [1, 2]
+    assert hits[0][1] > hits[1][1] > 0
+
+
+def test_search_finds_phone_number_with_or_without_hyphens():
+    index = build_index()
+    assert index.search("01012345678", 5)[0][0] == 3
+    assert index.search("010-1234-5678", 5)[0][0] == 3
+
+
+def test_search_edge_cases():
+    index = build_index()
+    assert index.search("", 5) == []
+    assert index.search("타이어", 0) == []
+    assert LexicalIndex().search("타이어", 5) == []
+
+
+def test_remove_and_remove_post_update_postings():
+    index = build_index()
+    index.remove([1])
+    assert [chunk_id for chunk_id, _ in index.search("타이어 교체", 3)] == [2]
+    index.remove_post(10)
+    assert len(index) == 1
+    assert index.search("교체", 3) == []
+    index.add(3, 20, "주차 안내")  # 같은 chunk_id를 다시 추가하면 이전 본문은 색인에서 빠진다
+    assert index.search("010-1234-5678", 3) == []
+    assert index.search("주차", 3)[0][0] == 3
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = build_index()
+    index.signature = "3:3"
+    index.save(str(tmp_path), "tenant")
+    loaded = LexicalIndex.load(str(tmp_path), "tenant")
+    assert loaded.signature == "3:3"
+    assert len(loaded) == 3
+    assert loaded.search("타이어 교체", 3) == index.search("타이어 교체", 3)
+    loaded.remove_post(20)
+    assert len(loaded) == 2
+    assert LexicalIndex.load(str(tmp_path), "missing") is None
+
+
+def test_reciprocal_rank_fusion_sums_reciprocal_ranks():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1]], k=60)
+    assert [chunk_id for chunk_id, _ in fused] == [1, 3, 2]
+    scores = dict(fused)
+    assert scores[1] == pytest.approx(1 / 61 + 1 / 62)
+    assert scores[3] == pytest.approx(1 / 63 + 1 / 61)
+    assert scores[2] == pytest.approx(1 / 62)
+
+
+def test_reciprocal_rank_fusion_with_empty_ranking():
+    assert reciprocal_rank_fusion([[], []]) == []
+    assert [chunk_id for chunk_id, _ in reciprocal_rank_fusion([[5, 4], []])] == [5, 4]
@@ -0,0 +1,111 @@
+# tests/test_oracle_vector_search.py
+import array
+import numpy as np
+import oracledb
+import pytest
+from bench.fakes import InMemoryOracleManager, hash_vector
+from vector_index import l2_to_similarity
+
+DIM = 16
+
+
+class FakeCursor:
+    """ execute에 넘긴 SQL/바인드를 기록하고 정해둔 행을 돌려주는 oracledb 커서 대역 """
+
+    def __init__(self, rows, error=None):
+        self.rows = rows
+        self.error = error
+        self.executed = []
+        self.input_sizes = {}
+        self.outputtypehandler = None
+
+    def setinputsizes(self, **sizes):
+        self.input_sizes.update(sizes)
+
+    def execute(self, sql, binds):
+        self.executed.append((sql, binds))
+        if self.error is not None:
+            raise self.error
+
+    def fetchall(self):
+        return self.rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self):
+        return self._cursor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class OracleBackendManager(InMemoryOracleManager):
+    """ VECTOR_SEARCH_BACKEND=oracle로 설정하고 DB 연결만 FakeCursor로 바꾼 InMemoryOracleManager """
+
+    def __init__(self, cursor, **kwargs):
+        super().__init__(embedding_dim=DIM, hybrid_search_candidates=0, **kwargs)
+        self.vector_search_backend = "oracle"
+        self.vector_index_backend = "numpy"
+        self.vector_storage = "vector"
+        self.cursor = cursor
+
+    def _acquire(self):
+        return FakeConnection(self.cursor)
+
+
+def test_vector_distance_query_and_binds(tmp_path):
+    cursor = FakeCursor([(7, "청크 7", 0.0), (3, "청크 3", 0.5)])
+    db = OracleBackendManager(cursor, index_dir=str(tmp_path), tenant_id=4)
+    query_vector = hash_vector("질문", DIM)
+
+    db.find_similar_chunks(query_vector, k=2)
+
+    [(sql, binds)] = cursor.executed
+    normalized = " ".join(sql.split())
+    assert "VECTOR_DISTANCE(chunk_embedding, :query_vector, COSINE)" in normalized
+    assert "WHERE tenant_id = :tenant_id AND chunk_embedding IS NOT NULL" in normalized
+    assert "ORDER BY distance FETCH APPROX FIRST :k ROWS ONLY" in normalized
+    assert binds['tenant_id'] == 4
+    assert binds['k'] == 2
+    assert isinstance(binds['query_vector'], array.array) and binds['query_vector'].typecode == 'f'
+    np.testing.assert_allclose(np.asarray(binds['query_vector']), query_vector)
+    assert cursor.input_sizes == {'query_vector': oracledb.DB_TYPE_VECTOR}
+
+
+def test_cosine_distance_is_converted_to_l2(tmp_path):
+    cursor = FakeCursor([(7, "청크 7", 0.0), (3, "청크 3", 0.5), (9, "청크 9", 1.0), (1, "청크 1", -1e-7)])
+    db = OracleBackendManager(cursor, index_dir=str(tmp_path))
+
+    hits = db.find_similar_chunks(hash_vector("질문", DIM), k=4)
+
+    assert [(chunk_id, text) for chunk_id, text, _ in hits] == [(7, "청크 7"), (3, "청크 3"), (9, "청크 9"), (1, "청크 1")]
+    distances = [distance for _, _, distance in hits]
+    assert distances == pytest.approx([0.0, 1.0, np.sqrt(2.0), 0.0])
+    # 다른 백엔드와 같은 척도: L2 거리를 다시 유사도로 바꾸면 1 - COSINE 거리
+    assert [l2_to_similarity(distance) for distance in distances[:3]] == pytest.approx([1.0, 0.5, 0.0])
+
+
+def test_falls_back_to_in_process_index_when_vector_distance_fails(tmp_path):
+    cursor = FakeCursor([], error=oracledb.Error("ORA-51805: VECTOR_DISTANCE 실패"))
+    db = OracleBackendManager(cursor, index_dir=str(tmp_path))
+    texts = [f"청크 {i}" for i in range(5)]
+    db.load_corpus([("https://blog.naver.com/test/1", "테스트", texts, np.vstack([hash_vector(t, DIM) for t in texts]))])
+
+    hits = db.find_similar_chunks(hash_vector("청크 2", DIM), k=2)
+
+    assert len(cursor.executed) == 1
+    assert hits[0][:2] == (3, "청크 2")
+    assert hits[0][2] == pytest.approx(0.0, abs=1e-3)
+    assert db.get_vector_index().backend == "numpy"
@@ -0,0 +1,51 @@
+# tests/test_plan_chunk_changes.py
+from database import chunk_hash
+from main import plan_chunk_changes
+
+
+def stored(*texts, start_id=1):
+    chunk_ids_by_hash = {}
+    for chunk_id, text in enumerate(texts, start=start_id):
+        chunk_ids_by_hash.setdefault(chunk_hash(text), []).append(chunk_id)
+    return chunk_ids_by_hash
+
+
+def test_unchanged_post_reuses_every_chunk():
+    assert plan_chunk_changes(["가", "나", "다"], stored("가", "나", "다")) == (3, [], [])
+
+
+def test_edited_chunk_is_embedded_and_old_one_deleted():
+    reused, added, stale_ids = plan_chunk_changes(["가", "나 (수정)", "다"], stored("가", "나", "다"))
+    assert reused == 2
+    assert added == [("나 (수정)", chunk_hash("나 (수정)"))]
+    assert stale_ids == [2]
+
+
+def test_new_post_embeds_all_chunks():
+    reused, added, stale_ids = plan_chunk_changes(["가", "나"], {})
+    assert (reused, stale_ids) == (0, [])
+    assert [text for text, _ in added] == ["가", "나"]
+
+
+def test_duplicate_chunks_are_matched_one_to_one():
+    reused, added, stale_ids = plan_chunk_changes(["반복", "반복", "반복"], stored("반복", "반복"))
+    assert reused == 2
+    assert added == [("반복", chunk_hash("반복"))]
+    assert stale_ids == []
+
+    reused, added, stale_ids = plan_chunk_changes(["반복"], stored("반복", "반복"))
+    assert (reused, added, len(stale_ids)) == (1, [], 1)
+
+
+def test_legacy_chunks_without_hash_are_deleted():
+    chunk_ids_by_hash = {None: [7, 8], **stored("가", start_id=9)}
+    reused, added, stale_ids = plan_chunk_changes(["가", "나"], chunk_ids_by_hash)
+    assert reused == 1
+    assert [text for text, _ in added] == ["나"]
+    assert sorted(stale_ids) == [7, 8]
+
+
+def test_stored_mapping_is_not_mutated():
+    chunk_ids_by_hash = stored("가", "나")
+    plan_chunk_changes(["가"], chunk_ids_by_hash)
+    assert chunk_ids_by_hash == stored("가", "나")
@@ -0,0 +1,65 @@
+# tests/test_plan_post_fetches.py
+import pytest
+from main import plan_post_fetches
+
+URL = "https://blog.naver.com/tester/100"
+LISTED = {'url': URL, 'title': "타이어 교체", 'log_no': "100", 'add_date': "2026. 1. 1.", 'modify_date': "2026. 1. 5."}
+VALIDATORS = {'etag': '"v1"', 'last_modified': "Mon, 05 Jan 2026 00:00:00 GMT"}
+
+
+def stored_state(**changes):
+    state = {'title': "타이어 교체", 'content_hash': "hash", 'log_no': "100", 'add_date': "2026. 1. 1.",
+             'modify_date': "2026. 1. 5.", 'etag': None, 'last_modified': None}
+    return {**state, **changes}
+
+
+class FakeTracker:
+    def __init__(self):
+        self.marked = []
+
+    def mark(self, post_url, state, error=None):
+        self.marked.append((post_url, state))
+
+
+# (설명, 목록 메타데이터, 저장된 상태, 모드별 결과) - 결과: fetch(본문 받기) | revalidate(조건부 요청) | skip
+CASES = [
+    ("새 게시글", LISTED, None, {'auto': 'fetch', 'all': 'fetch', 'never': 'fetch'}),
+    ("제목 변경", {**LISTED, 'title': "타이어 교체 (수정)"}, stored_state(), {'auto': 'fetch', 'all': 'fetch', 'never': 'fetch'}),
+    ("수정일 변경", {**LISTED, 'modify_date': "2026. 2. 1."}, stored_state(), {'auto': 'fetch', 'all': 'fetch', 'never': 'fetch'}),
+    ("본문 해시 없음", LISTED, stored_state(content_hash=None), {'auto': 'fetch', 'all': 'fetch', 'never': 'fetch'}),
+    ("목록 그대로, 검증자 있음", LISTED, stored_state(**VALIDATORS), {'auto': 'skip', 'all': 'revalidate', 'never': 'skip'}),
+    ("목록 그대로, 검증자 없음", LISTED, stored_state(), {'auto': 'skip', 'all': 'fetch', 'never': 'skip'}),
+    # 목록에 수정일이 없으면 본문이 바뀌어도 목록으로는 알 수 없으므로 auto에서도 확인
+    ("수정일 없음, 검증자 있음", {**LISTED, 'modify_date': ""}, stored_state(modify_date=None, **VALIDATORS),
+     {'auto': 'revalidate', 'all': 'revalidate', 'never': 'skip'}),
+    ("수정일 없음, 검증자 없음", {**LISTED, 'modify_date': ""}, stored_state(modify_date=None),
+     {'auto': 'fetch', 'all': 'fetch', 'never': 'skip'}),
+]
+
+
+@pytest.mark.parametrize("revalidate", ['auto', 'all', 'never'])
+@pytest.mark.parametrize("name, post_meta, stored, expected", CASES, ids=[case[0] for case in CASES])
+def test_plan_post_fetches_modes(name, post_meta, stored, expected, revalidate):
+    stats = {'listed': 0, 'skipped': 0}
+    tracker = FakeTracker()
+    crawl_states = {URL: stored} if stored else {}
+
+    planned = list(plan_post_fetches([post_meta], crawl_states, stats, revalidate=revalidate, tracker=tracker))
+
+    outcome = expected[revalidate]
+    assert stats == {'listed': 1, 'skipped': 1 if outcome == 'skip' else 0}
+    if outcome == 'skip':
+        assert planned == []
+        assert tracker.marked == [(URL, 'skipped')]
+        return
+    [planned_post] = planned
+    assert tracker.marked == []
+    if outcome == 'revalidate':
+        assert planned_post == {**post_meta, 'validators': VALIDATORS}
+    else:
+        assert planned_post == post_meta
+
+
+def test_plan_post_fetches_rejects_unknown_mode():
+    with pytest.raises(ValueError):
+        list(plan_post_fetches([LISTED], {}, {'listed': 0, 'skipped': 0}, revalidate='sometimes'))
@@ -0,0 +1,153 @@
+# tests/test_single_flight.py
+import time
+import asyncio
+import threading
+import pytest
+from chatbot_service import SingleFlight
+
+
+def test_run_coalesces_concurrent_calls():
+    flight = SingleFlight()
+    started = threading.Event()
+    followers_ready = threading.Barrier(4)  # 팔로워 셋 + 메인 스레드
+    release = threading.Event()
+    calls, results = [], []
+
+    def generate():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "답변"
+
+    def worker():
+        results.append(flight.run("q", generate))
+
+    def follower():
+        followers_ready.wait(5)
+        worker()
+
+    leader = threading.Thread(target=worker)
+    leader.start()
+    assert started.wait(5)
+    followers = [threading.Thread(target=follower) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    followers_ready.wait(5)
+    time.sleep(0.05)  # 배리어를 지난 팔로워가 run에 들어가 리더를 기다리기 시작할 시간
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert sorted(results) == [("답변", False)] + [("답변", True)] * 3
+    assert flight.run("q", lambda: "새 답변") == ("새 답변", False)  # 끝난 키는 다시 실행된다
+
+
+def test_run_propagates_leader_error_and_frees_key():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError("LLM 오류")
+
+    with pytest.raises(ValueError):
+        flight.run("q", fail)
+    assert flight.run("q", lambda: "다시 생성") == ("다시 생성", False)
+
+
+def test_join_and_end_share_streamed_result():
+    flight = SingleFlight()
+    call, _ = flight.join("q")
+    assert call is not None
+    shared = []
+    follower = threading.Thread(target=lambda: shared.append(flight.join("q")))
+    follower.start()
+    flight.end("q", call, "스트리밍 답변")
+    flight.end("q", call, "무시됨")
+    follower.join(5)
+    assert shared == [(None, "스트리밍 답변")]
+
+
+def test_abandoned_leader_hands_over_to_waiting_caller():
+    flight = SingleFlight()
+    call, _ = flight.join("q")
+    joined = []
+    follower = threading.Thread(target=lambda: joined.append(flight.join("q")))
+    follower.start()
+    flight.end("q", call, error=GeneratorExit())  # 스트리밍 클라이언트 연결이 끊긴 리더
+    follower.join(5)
+    new_call, result = joined[0]
+    assert new_call is not None and new_call is not call
+    assert result is None
+    flight.end("q", new_call, "새 리더의 답변")
+    assert flight.join("q")[0] is not None  # 끝난 키는 다시 리더가 된다
+
+
+def test_run_async_coalesces_tasks():
+    async def scenario():
+        flight = SingleFlight()
+        calls = []
+
+        async def generate():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "답변"
+
+        results = await asyncio.gather(*(flight.run_async("q", generate) for _ in range(4)))
+        return calls, results, flight._tasks
+
+    calls, results, tasks = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert sorted(results) == [("답변", False)] + [("답변", True)] * 3
+    assert tasks == {}
+
+
+def test_run_async_keeps_running_when_first_caller_is_cancelled():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def generate():
+            await asyncio.sleep(0.05)
+            return "답변"
+
+        first = asyncio.ensure_future(flight.run_async("q", generate))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(flight.run_async("q", generate))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return first, await second
+
+    first, second = asyncio.run(scenario())
+    assert first.cancelled()
+    assert second == ("답변", True)
+
+
+def test_join_async_waiter_takes_over_abandoned_stream():
+    async def scenario():
+        flight = SingleFlight()
+        future, _ = await flight.join_async("q")
+        waiter = asyncio.ensure_future(flight.join_async("q"))
+        await asyncio.sleep(0)
+        SingleFlight.end_async(future, error=GeneratorExit())
+        new_future, result = await waiter
+        assert new_future is not None and result is None
+        follower = asyncio.ensure_future(flight.join_async("q"))
+        await asyncio.sleep(0)
+        SingleFlight.end_async(new_future, "새 리더의 답변")
+        return await follower
+
+    assert asyncio.run(scenario()) == (None, "새 리더의 답변")
+
+
+def test_join_async_waiter_cancellation_propagates():
+    async def scenario():
+        flight = SingleFlight()
+        future, _ = await flight.join_async("q")
+        waiter = asyncio.ensure_future(flight.join_async("q"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert not future.done()  # 기다리던 요청이 끊겨도 리더는 계속 진행
+        SingleFlight.end_async(future, "답변")
+
+    asyncio.run(scenario())
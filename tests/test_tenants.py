@@ -0,0 +1,96 @@
+# tests/test_tenants.py
+import numpy as np
+import pytest
+from bench.fakes import FakeChatModel, FakeEmbedder, InMemoryOracleManager, hash_vector
+from chatbot_service import TenantChatbots
+
+DIM = 16
+
+
+@pytest.fixture
+def db(tmp_path):
+    return InMemoryOracleManager(embedding_dim=DIM, index_dir=str(tmp_path), hybrid_search_candidates=0)
+
+
+@pytest.fixture
+def chatbots(monkeypatch, db):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    chatbots = TenantChatbots(db, FakeEmbedder(dim=DIM), max_tenants=2)
+    chatbots.llm = FakeChatModel(latency_seconds=0.0)
+    return chatbots
+
+
+def onboard(db, tenant_id, name=None):
+    db.for_tenant(tenant_id).save_business_info({'business_name': name or f"업체 {tenant_id}", 'chatbot_personality': None,
+                                                 'faqs': [], 'marketing_info': None})
+
+
+def load_chunks(db, tenant_id, texts):
+    vectors = np.vstack([hash_vector(text, DIM) for text in texts])
+    db.for_tenant(tenant_id).load_corpus([(f"https://blog.naver.com/tenant{tenant_id}/1", "글", texts, vectors)])
+
+
+def test_least_recently_used_tenant_is_evicted(db, chatbots):
+    for tenant_id in (1, 2, 3):
+        onboard(db, tenant_id)
+    first = chatbots.get(1)
+    second = chatbots.get(2)
+    assert chatbots.get(1) is first  # 1을 다시 사용 → 가장 오래 쓰지 않은 테넌트는 2
+    chatbots.get(3)
+
+    assert list(chatbots._services) == [1, 3]
+    assert chatbots.get(1) is first
+    recreated = chatbots.get(2)
+    assert recreated is not second and recreated.db_manager is db.for_tenant(2)
+    assert list(chatbots._services) == [1, 2]  # get(1)로 1이 최근이 되어 3이 밀려남
+
+
+def test_unknown_tenant_is_not_created_or_kept(db, chatbots):
+    onboard(db, 1)
+    assert chatbots.get(99) is None
+    assert 99 not in chatbots._services
+    onboard(db, 99)  # /onboard 이후에는 서비스가 만들어짐
+    assert chatbots.get(99).db_manager.tenant_id == 99
+
+
+def test_tenants_do_not_see_each_others_chunks(db):
+    load_chunks(db, 1, ["1번 업체 엔진오일 교체", "1번 업체 타이어"])
+    load_chunks(db, 2, ["2번 업체 판금 도색"])
+
+    tenant1, tenant2 = db.for_tenant(1), db.for_tenant(2)
+    assert tenant1.vector_index_key != tenant2.vector_index_key  # 인덱스 캐시/파일도 테넌트별
+    texts1 = {text for _, text, _ in tenant1.find_similar_chunks(hash_vector("2번 업체 판금 도색", DIM), k=5)}
+    texts2 = {text for _, text, _ in tenant2.find_similar_chunks(hash_vector("2번 업체 판금 도색", DIM), k=5)}
+    assert texts1 == {"1번 업체 엔진오일 교체", "1번 업체 타이어"}
+    assert texts2 == {"2번 업체 판금 도색"}
+
+
+def test_answer_cache_is_kept_per_tenant(db, chatbots):
+    onboard(db, 1)
+    onboard(db, 2)
+    question = "엔진오일 교체 비용이 얼마인가요?"
+
+    assert chatbots.get(1).answer_question_with_details(question)['cache_type'] is None
+    assert chatbots.get(1).answer_question_with_details(question)['cache_type'] == 'exact'
+    # 같은 질문이라도 다른 테넌트는 1번 업체의 답변 캐시를 쓰지 않음 (정확/의미 캐시 모두)
+    assert chatbots.get(2).answer_question_with_details(question)['cache_type'] is None
+    assert len(db.for_tenant(1)._qa_cache) == len(db.for_tenant(2)._qa_cache) == 1
+
+
+def test_ask_returns_404_for_unknown_tenant(db, chatbots):
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+    from api import main as api_main
+
+    onboard(db, 1)
+    api_main.app.state.chatbots = chatbots
+    client = TestClient(api_main.app)  # with 블록 없이 만들어 lifespan(실제 Oracle/OpenAI 연결)을 건너뜀
+
+    response = client.get("/ask", params={'query': "영업시간이 어떻게 되나요?", 'tenant_id': 42})
+    assert response.status_code == 404
+    assert response.json()['detail'] == "Tenant 42 not found. Call /onboard first."
+    assert 42 not in chatbots._services
+
+    response = client.get("/ask", params={'query': "영업시간이 어떻게 되나요?", 'tenant_id': 1})
+    assert response.status_code == 200
+    assert response.json()['answer'] == FakeChatModel().answer
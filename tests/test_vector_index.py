@@ -0,0 +1,69 @@
+# tests/test_vector_index.py
+import numpy as np
+import pytest
+from vector_index import NumpyVectorIndex, l2_to_similarity, normalize_vectors
+
+
+def random_vectors(count, dim, seed=0):
+    return np.random.default_rng(seed).standard_normal((count, dim)).astype(np.float32)
+
+
+def test_normalize_vectors_leaves_zero_rows():
+    matrix = normalize_vectors(np.array([[3.0, 4.0], [0.0, 0.0]]))
+    assert matrix.dtype == np.float32
+    np.testing.assert_allclose(matrix, [[0.6, 0.8], [0.0, 0.0]])
+    assert normalize_vectors([1.0, 0.0]).shape == (1, 2)
+
+
+def test_search_matches_brute_force_ranking():
+    vectors = random_vectors(200, 16)
+    ids = np.arange(1000, 1200)
+    index = NumpyVectorIndex(16)
+    index.build(ids, vectors, signature="200:1199")
+    query = random_vectors(1, 16, seed=1)[0]
+
+    hits = index.search(query, 10)
+
+    similarities = normalize_vectors(vectors) @ normalize_vectors(query)[0]
+    expected = np.argsort(-similarities)[:10]
+    assert [chunk_id for chunk_id, _ in hits] == [int(ids[i]) for i in expected]
+    distances = [distance for _, distance in hits]
+    assert distances == sorted(distances)
+    for (_, distance), i in zip(hits, expected):
+        assert l2_to_similarity(distance) == pytest.approx(similarities[i], abs=1e-5)
+
+
+def test_search_returns_exact_match_first_with_zero_distance():
+    vectors = random_vectors(5, 8)
+    index = NumpyVectorIndex(8)
+    index.build(np.arange(5), vectors)
+    chunk_id, distance = index.search(vectors[3] * 10, 1)[0]
+    assert chunk_id == 3
+    assert distance == pytest.approx(0.0, abs=1e-3)
+    assert l2_to_similarity(distance) == pytest.approx(1.0, abs=1e-5)
+
+
+def test_search_edge_cases():
+    index = NumpyVectorIndex(4)
+    assert index.search([1, 0, 0, 0], 5) == []
+    index.build(np.arange(3), random_vectors(3, 4))
+    assert index.search([1, 0, 0, 0], 0) == []
+    assert len(index.search([1, 0, 0, 0], 10)) == 3
+
+
+def test_l2_to_similarity_bounds():
+    assert l2_to_similarity(0.0) == 1.0
+    assert l2_to_similarity(np.sqrt(2.0)) == pytest.approx(0.0)
+    assert l2_to_similarity(2.0) == pytest.approx(-1.0)
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = NumpyVectorIndex(8)
+    index.build(np.arange(10), random_vectors(10, 8), signature="10:9")
+    index.save(str(tmp_path), "tenant")
+    loaded = NumpyVectorIndex.load(str(tmp_path), "tenant", 8)
+    assert loaded.signature == "10:9"
+    query = random_vectors(1, 8, seed=3)[0]
+    assert loaded.search(query, 3) == index.search(query, 3)
+    assert NumpyVectorIndex.load(str(tmp_path), "tenant", 16) is None  # 임베딩 차원이 바뀌면 재구축
+    assert NumpyVectorIndex.load(str(tmp_path), "missing", 8) is None
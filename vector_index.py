@@ -0,0 +1,255 @@
+# vector_index.py
+import os
+import json
+import threading
+import numpy as np
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Tuple, Optional
+
+try:
+    import faiss  # 선택 의존성: 설치되어 있을 때만 HNSW 백엔드 사용 가능
+except ImportError:
+    faiss = None
+
+DEFAULT_INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "faiss_indexes")
+# 프로세스에 올려둘 인덱스 메모리 상한(MB). 테넌트가 많아 넘치면 가장 오래 쓰지 않은 인덱스부터 내림 (디스크 파일은 유지)
+INDEX_CACHE_MAX_BYTES = int(float(os.getenv("VECTOR_INDEX_CACHE_MAX_MB", "1024")) * 1024 * 1024)
+
+
+def normalize_vectors(vectors: np.ndarray) -> np.ndarray:
+    """ 행 단위로 L2 정규화한 float32 행렬을 반환 (0 벡터는 그대로 둠) """
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _similarity_to_l2(similarities: np.ndarray) -> np.ndarray:
+    # 정규화된 벡터 사이의 L2 거리 = sqrt(2 - 2 * cos). 기존 find_similar_chunks와 같은 '작을수록 유사' 척도 유지
+    return np.sqrt(np.clip(2.0 - 2.0 * similarities, 0.0, None))
+
+
+def l2_to_similarity(distance: float) -> float:
+    """ _similarity_to_l2의 역변환: 정규화된 벡터 사이의 L2 거리를 코사인 유사도(클수록 유사)로 바꿈 """
+    return 1.0 - float(distance) ** 2 / 2.0
+
+
+class VectorIndex(ABC):
+    """ 청크 벡터 인덱스의 공통 인터페이스. search는 (chunk_id, L2 거리)를 거리 오름차순으로 반환 """
+    backend = "base"
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.signature: Optional[str] = None  # 인덱스를 만든 시점의 chunks 테이블 상태 (get_chunks_signature)
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    @property
+    @abstractmethod
+    def nbytes(self) -> int:
+        """ 인덱스가 차지하는 대략적인 메모리 (프로세스 캐시의 LRU 상한 계산용) """
+
+    @abstractmethod
+    def build(self, ids: np.ndarray, vectors: np.ndarray, signature: Optional[str] = None):
+        ...
+
+    @abstractmethod
+    def search(self, query_vector, k: int) -> List[Tuple[int, float]]:
+        ...
+
+    @abstractmethod
+    def save(self, index_dir: str, index_key: str):
+        ...
+
+    @classmethod
+    @abstractmethod
+    def load(cls, index_dir: str, index_key: str, dim: int) -> Optional["VectorIndex"]:
+        ...
+
+
+class NumpyVectorIndex(VectorIndex):
+    """ 정규화된 float32 행렬에 대한 내적 + argpartition 기반 top-k (완전 탐색, 외부 의존성 없음) """
+    backend = "numpy"
+
+    def __init__(self, dim: int):
+        super().__init__(dim)
+        self.ids = np.empty(0, dtype=np.int64)
+        self.matrix = np.empty((0, dim), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.ids.nbytes + self.matrix.nbytes)
+
+    def build(self, ids: np.ndarray, vectors: np.ndarray, signature: Optional[str] = None):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.matrix = normalize_vectors(vectors) if len(self.ids) else np.empty((0, self.dim), dtype=np.float32)
+        self.signature = signature
+
+    def search(self, query_vector, k: int) -> List[Tuple[int, float]]:
+        if len(self.ids) == 0 or k <= 0:
+            return []
+        query = normalize_vectors(query_vector)[0]
+        similarities = self.matrix @ query
+        k = min(k, len(similarities))
+        # 전체 정렬 대신 argpartition으로 상위 k개만 골라낸 뒤 그 k개만 정렬
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+        distances = _similarity_to_l2(similarities[top])
+        return [(int(self.ids[i]), float(d)) for i, d in zip(top, distances)]
+
+    @staticmethod
+    def _path(index_dir: str, index_key: str) -> str:
+        return os.path.join(index_dir, f"vector_index_{index_key}.npz")
+
+    def save(self, index_dir: str, index_key: str):
+        os.makedirs(index_dir, exist_ok=True)
+        path = self._path(index_dir, index_key)
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, ids=self.ids, matrix=self.matrix, signature=np.array(self.signature or ""))
+        os.replace(tmp_path, path)  # 다른 프로세스가 반쯤 쓰인 파일을 읽지 않도록 원자적으로 교체
+
+    @classmethod
+    def load(cls, index_dir: str, index_key: str, dim: int) -> Optional["NumpyVectorIndex"]:
+        path = cls._path(index_dir, index_key)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            index = cls(dim)
+            index.ids = data["ids"]
+            index.matrix = data["matrix"]
+            index.signature = str(data["signature"]) or None
+        if index.matrix.shape[1:] != (dim,):
+            return None
+        return index
+
+
+class FaissVectorIndex(VectorIndex):
+    """ FAISS HNSW(내적) 근사 탐색 인덱스. IndexIDMap으로 chunk id를 인덱스 안에 함께 저장 """
+    backend = "faiss"
+
+    def __init__(self, dim: int, hnsw_m: int = 32, ef_search: int = 64):
+        if faiss is None:
+            raise ImportError("FAISS 백엔드를 사용하려면 'faiss-cpu' 패키지를 설치해주세요.")
+        super().__init__(dim)
+        self.hnsw_m = hnsw_m
+        self.ef_search = ef_search
+        self.index = self._new_index()
+
+    def _new_index(self):
+        hnsw = faiss.IndexHNSWFlat(self.dim, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        hnsw.hnsw.efSearch = self.ef_search
+        return faiss.IndexIDMap(hnsw)
+
+    def __len__(self) -> int:
+        return int(self.index.ntotal)
+
+    @property
+    def nbytes(self) -> int:
+        # 벡터(float32) + 청크 id + HNSW 이웃 목록(0층 기준 노드당 2*M개)
+        return int(self.index.ntotal) * (self.dim * 4 + 8 + self.hnsw_m * 2 * 4)
+
+    def build(self, ids: np.ndarray, vectors: np.ndarray, signature: Optional[str] = None):
+        self.index = self._new_index()
+        if len(ids):
+            self.index.add_with_ids(normalize_vectors(vectors), np.asarray(ids, dtype=np.int64))
+        self.signature = signature
+
+    def search(self, query_vector, k: int) -> List[Tuple[int, float]]:
+        if self.index.ntotal == 0 or k <= 0:
+            return []
+        scores, ids = self.index.search(normalize_vectors(query_vector), min(k, int(self.index.ntotal)))
+        if self.index.metric_type == faiss.METRIC_INNER_PRODUCT:
+            distances = _similarity_to_l2(scores[0])
+        else:
+            distances = np.sqrt(np.clip(scores[0], 0.0, None))  # METRIC_L2는 제곱 거리를 반환
+        return [(int(i), float(d)) for i, d in zip(ids[0], distances) if i != -1]
+
+    @staticmethod
+    def _paths(index_dir: str, index_key: str) -> Tuple[str, str]:
+        # 저장소에 커밋된 faiss_index_1.bin(기존 파일)과 겹치지 않도록 vector_index_ 접두사와 .faiss 확장자 사용
+        base = os.path.join(index_dir, f"vector_index_{index_key}.faiss")
+        return base, base + ".meta.json"
+
+    def save(self, index_dir: str, index_key: str):
+        os.makedirs(index_dir, exist_ok=True)
+        index_path, meta_path = self._paths(index_dir, index_key)
+        faiss.write_index(self.index, index_path + ".tmp")
+        os.replace(index_path + ".tmp", index_path)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"signature": self.signature, "dim": self.dim}, f)
+
+    @classmethod
+    def load(cls, index_dir: str, index_key: str, dim: int) -> Optional["FaissVectorIndex"]:
+        index_path, meta_path = cls._paths(index_dir, index_key)
+        if faiss is None or not os.path.exists(index_path):
+            return None
+        raw_index = faiss.read_index(index_path)
+        if raw_index.d != dim:
+            return None
+        index = cls(dim)
+        index.index = raw_index
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                index.signature = json.load(f).get("signature")
+        return index
+
+
+VECTOR_INDEX_BACKENDS = {
+    NumpyVectorIndex.backend: NumpyVectorIndex,
+    FaissVectorIndex.backend: FaissVectorIndex,
+}
+
+# 프로세스 단위 인덱스 캐시: (backend, index_key) -> VectorIndex. 최근 사용 순서(LRU)로 INDEX_CACHE_MAX_BYTES까지 유지
+_loaded_indexes: "OrderedDict[Tuple[str, str], VectorIndex]" = OrderedDict()
+_loaded_lock = threading.Lock()
+
+
+def get_index_class(backend: str):
+    if backend not in VECTOR_INDEX_BACKENDS:
+        raise ValueError(f"지원하지 않는 벡터 인덱스 백엔드입니다: {backend} (사용 가능: {', '.join(VECTOR_INDEX_BACKENDS)})")
+    return VECTOR_INDEX_BACKENDS[backend]
+
+
+def get_cached_index(backend: str, index_key: str) -> Optional[VectorIndex]:
+    with _loaded_lock:
+        index = _loaded_indexes.get((backend, index_key))
+        if index is not None:
+            _loaded_indexes.move_to_end((backend, index_key))
+        return index
+
+
+def set_cached_index(backend: str, index_key: str, index: VectorIndex):
+    """ 인덱스를 프로세스 캐시에 등록하고, 메모리 상한을 넘으면 오래 쓰지 않은 다른 인덱스부터 내림 """
+    with _loaded_lock:
+        _loaded_indexes[(backend, index_key)] = index
+        _loaded_indexes.move_to_end((backend, index_key))
+        total = sum(cached.nbytes for cached in _loaded_indexes.values())
+        while total > INDEX_CACHE_MAX_BYTES and len(_loaded_indexes) > 1:
+            _, evicted = _loaded_indexes.popitem(last=False)
+            total -= evicted.nbytes
+
+
+def evict_cached_index(backend: str, index_key: str):
+    with _loaded_lock:
+        _loaded_indexes.pop((backend, index_key), None)
+
+
+def get_cache_stats() -> Dict[str, int]:
+    with _loaded_lock:
+        return {'indexes': len(_loaded_indexes), 'bytes': sum(index.nbytes for index in _loaded_indexes.values())}
+
+
+def load_index(backend: str, index_key: str, dim: int, index_dir: Optional[str] = None) -> Optional[VectorIndex]:
+    """ 디스크에 저장된 인덱스를 읽어 프로세스 캐시에 등록. 파일이 없거나 차원이 다르면 None """
+    index = get_index_class(backend).load(index_dir or DEFAULT_INDEX_DIR, index_key, dim)
+    if index is not None:
+        set_cached_index(backend, index_key, index)
+    return index